@@ -0,0 +1,104 @@
+import asyncio
+import atexit
+import threading
+import logging
+import concurrent.futures
+from typing import Any, Awaitable, Callable, Coroutine, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Background event loop shared by long-lived async resources (MCP sessions, HTTP clients, caches)
+# and by the queries themselves. Streamlit runs each script in its own thread, so these resources
+# cannot live on a per-request loop.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_lock = threading.Lock()
+_shutdown_hooks: List[Callable[[], Awaitable[Any]]] = []
+
+def _run_loop(loop: asyncio.AbstractEventLoop) -> None:
+    """
+    Thread target: run the background event loop until it is stopped
+    """
+    asyncio.set_event_loop(loop)
+    loop.run_forever()
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """
+    Return the shared background event loop, starting its thread on first use
+    """
+    global _loop, _thread
+
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(target=_run_loop, args=(_loop,), name="jetzy-event-loop", daemon=True)
+            _thread.start()
+            logger.info("Started background event loop")
+
+    return _loop
+
+def submit(coro: Coroutine[Any, Any, Any]) -> concurrent.futures.Future:
+    """
+    Schedule a coroutine on the background loop from a synchronous thread.
+    Returns a concurrent future the caller can wait on.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+async def run_on_loop(coro: Awaitable[Any]) -> Any:
+    """
+    Await a coroutine on the background loop from any event loop.
+    Runs it directly if the caller is already on the background loop.
+    """
+    loop = get_loop()
+
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+
+    if running is loop:
+        return await coro
+
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+def register_shutdown(hook: Callable[[], Awaitable[Any]]) -> None:
+    """
+    Register a coroutine function to be awaited on the background loop at interpreter exit
+    """
+    _shutdown_hooks.append(hook)
+
+def shutdown(timeout: float = 10.0) -> None:
+    """
+    Run the shutdown hooks and stop the background loop
+    """
+    global _loop, _thread
+
+    loop, thread = _loop, _thread
+    if loop is None or loop.is_closed():
+        return
+
+    async def _run_hooks():
+        for hook in reversed(_shutdown_hooks):
+            try:
+                await hook()
+            except Exception as e:
+                logger.error(f"Error in shutdown hook {hook}: {e}")
+
+    try:
+        # Hooks run while the loop is still registered so they can use run_on_loop
+        asyncio.run_coroutine_threadsafe(_run_hooks(), loop).result(timeout)
+    except Exception as e:
+        logger.error(f"Error shutting down background event loop: {e}")
+    finally:
+        with _lock:
+            _loop, _thread = None, None
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout)
+        if not loop.is_running():
+            loop.close()
+
+    _shutdown_hooks.clear()
+
+# Make sure child processes and connections are cleaned up when Streamlit exits
+atexit.register(shutdown)
@@ -0,0 +1,101 @@
+"""
+Micro-benchmark: catalog load time and indexed lookup latency on a large synthetic catalog.
+
+    python benchmarks/bench_catalog.py                  # 5000 cities, 60000 hotels, 60000 restaurants
+    python benchmarks/bench_catalog.py --cities 20000
+
+Exits with status 1 if any lookup's p99 is over a millisecond.
+"""
+import os
+import sys
+import time
+import random
+import string
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import Attraction, Catalog, City, Hotel, Restaurant
+from benchmarks.bench_e2e import percentile
+
+CUISINES = ["italian", "japanese", "french", "indian", "thai", "mexican", "american", "chinese"]
+BUDGETS = ["low", "medium", "high"]
+
+def synthetic_catalog(cities, per_city, seed=7):
+    """
+    Generate a catalog of made-up cities, each with per_city hotels, restaurants and attractions
+    """
+    rng = random.Random(seed)
+
+    def name():
+        return rng.choice(string.ascii_uppercase) + "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10)))
+
+    city_names = list(dict.fromkeys(name() for _ in range(cities * 2)))[:cities]
+    tables = {"cities": [], "hotels": [], "restaurants": [], "attractions": []}
+    for i, city in enumerate(city_names):
+        tables["cities"].append(City(city, "Country", f"X{i:05d}", rng.uniform(-60, 70), rng.uniform(-180, 180)))
+        for j in range(per_city):
+            tables["hotels"].append(Hotel(f"{name()} Hotel {i}-{j}", city, rng.choice(BUDGETS),
+                                          rng.randint(30, 600), round(rng.uniform(3.0, 5.0), 1)))
+            tables["restaurants"].append(Restaurant(f"{name()} Kitchen {i}-{j}", city, rng.choice(CUISINES),
+                                                    round(rng.uniform(3.0, 5.0), 1)))
+        tables["attractions"].append(Attraction(f"{city} Old Town", city))
+    return Catalog(tables), city_names
+
+def bench(label, func, keys, repeat=5):
+    """
+    Time func once per key, repeat times, and print the per-call latency percentiles
+    """
+    latencies = []
+    for _ in range(repeat):
+        for key in keys:
+            start = time.perf_counter()
+            func(key)
+            latencies.append(time.perf_counter() - start)
+
+    p50, p99 = percentile(latencies, 50) * 1e6, percentile(latencies, 99) * 1e6
+    print(f"{label:<40} {p50:>10.2f} us {p99:>10.2f} us")
+    return p99
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cities", type=int, default=5000, help="number of synthetic cities")
+    parser.add_argument("--per-city", type=int, default=12, help="hotels and restaurants per city")
+    args = parser.parse_args()
+
+    catalog, city_names = synthetic_catalog(args.cities, args.per_city)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "catalog.sqlite3")
+        catalog.to_sqlite(path)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+
+        start = time.perf_counter()
+        catalog = Catalog.load(path)
+        load_seconds = time.perf_counter() - start
+
+    print(f"{len(catalog)} rows, {size_mb:.1f} MB on disk, loaded and indexed in {load_seconds * 1000:.0f} ms\n")
+
+    rng = random.Random(1)
+    cities = [rng.choice(city_names) for _ in range(2000)]
+    names = [hotel.name.upper() for hotel in rng.sample(catalog.tables["hotels"], 2000)]
+
+    print(f"{'lookup':<40} {'p50':>13} {'p99':>13}")
+    worst = max(
+        bench("city by name", lambda city: catalog.city(city.lower()), cities),
+        bench("hotels by city and budget", lambda city: catalog.hotels(city, "medium")[:5], cities),
+        bench("restaurants by city and cuisine", lambda city: catalog.restaurants(city, "italian")[:5], cities),
+        bench("restaurants by city", lambda city: catalog.restaurants(city)[:5], cities),
+        bench("attractions by city", catalog.attractions, cities),
+        bench("place by case-folded name", catalog.find, names),
+        bench("missing city", lambda city: catalog.hotels(city + "x", "low"), cities)
+    )
+
+    if worst > 1000:
+        print(f"\nSlowest lookup p99 is {worst:.0f} us, over the 1 ms target")
+        sys.exit(1)
+    print(f"\nSlowest lookup p99 is {worst:.2f} us, under the 1 ms target")
+
+if __name__ == "__main__":
+    main()
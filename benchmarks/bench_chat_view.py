@@ -0,0 +1,80 @@
+"""
+Micro-benchmark: time to build the chat history HTML on a rerun, for the paged, memoized chat view
+against rendering every message afresh.
+
+    python benchmarks/bench_chat_view.py                # 500 messages
+    python benchmarks/bench_chat_view.py --messages 2000 --page-size 40
+
+Exits with status 1 if a warm rerun's p99 is over the target.
+"""
+import os
+import sys
+import time
+import html
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_view import chat_html, render_message, visible_range
+from benchmarks.bench_e2e import percentile
+
+# Most a warm rerun may spend building the chat HTML
+RERUN_TARGET_MS = 2.0
+
+WORDS = "flight hotel Rome Paris Tokyo price night rating booking option departure arrival budget museum".split()
+
+def synthetic_history(count, seed=3):
+    rng = random.Random(seed)
+    messages = []
+    for i in range(count):
+        if i % 2 == 0:
+            messages.append({"role": "user", "content": " ".join(rng.choices(WORDS, k=12)) + "?"})
+        else:
+            lines = [f"• {' '.join(rng.choices(WORDS, k=8))} https://mockhotels.com/book/h{i}-{j}" for j in range(8)]
+            messages.append({"role": "assistant", "content": "\n".join(lines)})
+    return messages
+
+def render_everything(messages):
+    """
+    What every rerun did before: escape and wrap all messages
+    """
+    return "".join(f"<div class='{m['role']}-message'>{html.escape(m['content'])}</div>" for m in messages)
+
+def bench(label, func, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(func())
+        latencies.append(time.perf_counter() - start)
+    p50, p99 = percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000
+    print(f"{label:<36} {p50:>8.3f} ms {p99:>8.3f} ms {size / 1024:>9.1f} KB")
+    return p99
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500, help="messages in the chat history")
+    parser.add_argument("--page-size", type=int, default=20, help="messages shown per page")
+    parser.add_argument("--repeat", type=int, default=200, help="reruns timed per case")
+    args = parser.parse_args()
+
+    messages = synthetic_history(args.messages)
+    window = lambda: chat_html(messages[visible_range(len(messages), args.page_size).start:])
+
+    def cold():
+        render_message.cache_clear()
+        return window()
+
+    print(f"{args.messages} messages, {args.page_size} per page\n")
+    print(f"{'rerun':<36} {'p50':>11} {'p99':>11} {'payload':>12}")
+    bench("all messages, rendered afresh", lambda: render_everything(messages), args.repeat)
+    bench("last page, cold cache", cold, args.repeat)
+    warm = bench("last page, memoized", window, args.repeat)
+
+    if warm > RERUN_TARGET_MS:
+        print(f"\nWarm rerun p99 is {warm:.3f} ms, over the {RERUN_TARGET_MS} ms target")
+        sys.exit(1)
+    print(f"\nWarm rerun p99 is {warm:.3f} ms, under the {RERUN_TARGET_MS} ms target")
+
+if __name__ == "__main__":
+    main()
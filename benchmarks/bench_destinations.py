@@ -0,0 +1,77 @@
+"""
+Micro-benchmark: compiled destination matcher vs the original per-destination re.search loop.
+
+    python benchmarks/bench_destinations.py
+"""
+import os
+import re
+import sys
+import random
+import string
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractors import DestinationMatcher, destination_matcher
+
+def legacy_extract_destinations(text, destinations, aliases):
+    """
+    The original implementation: one re.search per destination and alias
+    """
+    found_destinations = []
+    for destination in destinations:
+        if re.search(r'\b' + re.escape(destination) + r'\b', text, re.IGNORECASE):
+            found_destinations.append(destination)
+    for alias, full_name in aliases.items():
+        if re.search(r'\b' + re.escape(alias) + r'\b', text, re.IGNORECASE):
+            found_destinations.append(full_name)
+    return list(dict.fromkeys(found_destinations))
+
+def synthetic_gazetteer(size, seed=7):
+    """
+    Generate a large gazetteer of made-up city names
+    """
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < size:
+        words = [rng.choice(string.ascii_uppercase) + "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
+                 for _ in range(rng.randint(1, 2))]
+        names.add(" ".join(words))
+    return sorted(names)
+
+def bench(label, func, number):
+    seconds = timeit.timeit(func, number=number) / number
+    print(f"{label:<48} {seconds * 1e6:>12.1f} us")
+    return seconds
+
+def main():
+    query = "Find flights from New York to Paris from 2025-05-01 to 2025-05-14"
+    # Roughly a 1000-token assistant response full of place names
+    response = (
+        "Flights from London to Rome usually take two and a half hours. Many travellers combine Rome with "
+        "Venice and Milan, or continue to Athens and the Greek islands. From New York, direct options reach "
+        "Paris, Barcelona and Amsterdam in about seven hours. "
+    ) * 20
+
+    destinations = list(destination_matcher._insensitive.values())
+    aliases = {"NYC": "New York", "LA": "Los Angeles", "SF": "San Francisco", "Vegas": "Las Vegas",
+               "UK": "United Kingdom", "US": "United States", "USA": "United States"}
+
+    large = synthetic_gazetteer(5000)
+    large_matcher = DestinationMatcher(large + destinations, aliases)
+    large_text = response + " " + " ".join(random.Random(1).sample(large, 20))
+
+    print(f"{'case':<48} {'per call':>15}")
+    for label, text, number in (("query", query, 2000), ("1000-token response", response, 200)):
+        legacy = bench(f"legacy, 33 names, {label}", lambda: legacy_extract_destinations(text, destinations, aliases), number)
+        compiled = bench(f"compiled, 33 names, {label}", lambda: destination_matcher.extract(text), number)
+        print(f"{'speedup':<48} {legacy / compiled:>14.1f}x")
+
+    legacy = bench("legacy, 5000 names, 1000-token response", lambda: legacy_extract_destinations(large_text, large, aliases), 3)
+    compiled = bench("compiled, 5000 names, 1000-token response", lambda: large_matcher.extract(large_text), 50)
+    print(f"{'speedup':<48} {legacy / compiled:>14.1f}x")
+
+    assert set(legacy_extract_destinations(response, destinations, aliases)) == set(destination_matcher.extract(response))
+
+if __name__ == "__main__":
+    main()
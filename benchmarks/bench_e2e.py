@@ -0,0 +1,270 @@
+"""
+Offline end-to-end benchmark: the client against a local fake OpenAI endpoint and the real MCP server.
+
+    python benchmarks/bench_e2e.py                      # run, write results and compare with the baseline
+    python benchmarks/bench_e2e.py --save-baseline      # run and save the results as the new baseline
+    python benchmarks/bench_e2e.py --latency 0.3 --iterations 50 --fail-on-regression
+
+Cold runs start from a closed session pool, a new OpenAI client and empty caches.
+Warm runs reuse the pool and client; caches are cleared before each iteration unless the scenario is "cached".
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import datetime
+import concurrent.futures
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_openai import FakeOpenAIServer
+
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baseline.json")
+RESULTS_PATH = os.path.join(ROOT, "benchmarks", "results", "latest.json")
+
+# Handled by the local intent router, so no LLM call
+ROUTED_QUERY = "Find flights from London to Paris from 2025-05-01 to 2025-05-08"
+# Needs the LLM to pick the tool; the fake endpoint answers with canned tool-selection JSON
+LLM_TOOL_QUERY = "I'd love some ideas for my days in Tokyo"
+# Answered directly by the LLM
+CHAT_QUERY = "Tell me a travel joke"
+
+CANNED_REPLIES = [
+    (f"User's Question: {LLM_TOOL_QUERY}", json.dumps({"tool": "recommend_attractions", "arguments": {"location": "Tokyo"}})),
+    (f"User's Question: {CHAT_QUERY}", "Why did the suitcase stay home? It had too much baggage.")
+]
+
+TOOL_ARGUMENTS = {
+    "search_flights": {"from_location": "London", "to_location": "Paris", "date_range": "2025-05-01 to 2025-05-08"},
+    "recommend_hotels": {"location": "Rome", "budget": "medium"},
+    "recommend_attractions": {"location": "Rome"},
+    "recommend_restaurants": {"location": "Tokyo", "cuisine": "japanese"},
+    "transport_options": {"from_location": "London", "to_location": "Paris"},
+    "seasonal_travel_advice": {"destination": "Japan"}
+}
+
+def percentile(values, q):
+    """
+    Linear-interpolated percentile of a list of numbers, q in [0, 100]
+    """
+    values = sorted(values)
+    if not values:
+        return 0.0
+    position = (len(values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+def peak_rss_mb(who=None):
+    """
+    Peak resident set size in MB of this process, or of its reaped children
+    """
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who is None else who)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(usage.ru_maxrss / divisor, 1)
+
+def measure(func, iterations, setup=None, concurrency=1):
+    """
+    Run func iterations times and return its latency percentiles and throughput.
+    setup runs untimed before each sequential iteration.
+    """
+    latencies = []
+
+    def timed(i):
+        start = time.perf_counter()
+        func(i)
+        return time.perf_counter() - start
+
+    if concurrency == 1:
+        for i in range(iterations):
+            if setup:
+                setup()
+            latencies.append(timed(i))
+        wall = sum(latencies)
+    else:
+        if setup:
+            setup()
+        start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(concurrency) as executor:
+            latencies = list(executor.map(timed, range(iterations)))
+        wall = time.perf_counter() - start
+
+    return {
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+        "throughput_per_s": round(iterations / wall, 2) if wall else None,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+def run_benchmarks(iterations, cold_iterations, concurrency):
+    # Imported here so the environment points at the fake endpoint first
+    import logging
+    import session_pool
+    from async_runtime import submit
+    from llm import close_openai_client
+    from tool_cache import tool_cache
+    from response_cache import response_cache
+    from mcp_client import run_async, run_tool_query, server_params
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    def clear_caches():
+        tool_cache.backend.clear()
+        response_cache.clear()
+
+    def reset():
+        """
+        Start from nothing: no MCP server processes, no OpenAI connections, empty caches
+        """
+        if session_pool._pool is not None:
+            submit(session_pool._pool.close()).result()
+        submit(close_openai_client()).result()
+        clear_caches()
+
+    async def call_tool(tool, arguments):
+        pool = await session_pool.get_session_pool(server_params)
+        async with pool.session() as session:
+            return await session.call_tool(tool, arguments=arguments)
+
+    def check(response, expected):
+        if expected not in response:
+            raise RuntimeError(f"Unexpected response: {response[:200]}")
+
+    scenarios = {}
+
+    scenarios["run_async cold (routed)"] = measure(
+        lambda i: check(run_async(ROUTED_QUERY), "flights from London to Paris"), cold_iterations, setup=reset)
+    scenarios["run_tool_query cold (routed)"] = measure(
+        lambda i: check(submit(run_tool_query(ROUTED_QUERY)).result(), "flights from London to Paris"), cold_iterations, setup=reset)
+
+    # Warm the pool and client once before the warm scenarios
+    run_async(ROUTED_QUERY)
+
+    for tool, arguments in TOOL_ARGUMENTS.items():
+        scenarios[f"tool {tool} warm"] = measure(
+            lambda i, tool=tool, arguments=arguments: submit(call_tool(tool, arguments)).result(), iterations)
+
+    scenarios["run_tool_query warm (routed)"] = measure(
+        lambda i: check(submit(run_tool_query(ROUTED_QUERY)).result(), "flights from London to Paris"), iterations, setup=clear_caches)
+    scenarios["run_tool_query warm (LLM tool selection)"] = measure(
+        lambda i: check(submit(run_tool_query(LLM_TOOL_QUERY)).result(), "attractions in Tokyo"), iterations, setup=clear_caches)
+    scenarios["run_async warm (LLM answer)"] = measure(
+        lambda i: check(run_async(CHAT_QUERY), "baggage"), iterations, setup=clear_caches)
+    scenarios["run_async warm (cached)"] = measure(
+        lambda i: check(run_async(LLM_TOOL_QUERY), "attractions in Tokyo"), iterations)
+    # Distinct numbers keep every question out of the response cache
+    scenarios[f"run_async concurrent x{concurrency} (LLM answer)"] = measure(
+        lambda i: check(run_async(f"{CHAT_QUERY} number {i}"), "baggage"), iterations, setup=clear_caches, concurrency=concurrency)
+
+    reset()
+    return scenarios
+
+def compare(results, baseline, tolerance, noise_ms=1.0):
+    """
+    Print current vs baseline p50/p95 and return the scenarios that got slower than the tolerance allows
+    """
+    regressions = []
+    print(f"\n{'scenario':<50} {'p50 ms':>10} {'base':>10} {'p95 ms':>10} {'base':>10}")
+
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            print(f"{name:<50} {current['p50_ms']:>10} {'-':>10} {current['p95_ms']:>10} {'-':>10}")
+            continue
+
+        flags = []
+        for metric in ("p50_ms", "p95_ms"):
+            if current[metric] > previous[metric] * (1 + tolerance) and current[metric] - previous[metric] > noise_ms:
+                flags.append(metric)
+
+        marker = "  REGRESSION " + ",".join(flags) if flags else ""
+        print(f"{name:<50} {current['p50_ms']:>10} {previous['p50_ms']:>10} "
+              f"{current['p95_ms']:>10} {previous['p95_ms']:>10}{marker}")
+        if flags:
+            regressions.append(name)
+
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=30, help="iterations per warm scenario")
+    parser.add_argument("--cold-iterations", type=int, default=3, help="iterations per cold scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="threads for the concurrent scenario")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds the fake OpenAI endpoint waits before answering")
+    parser.add_argument("--output", default=RESULTS_PATH, help="where to write the JSON results")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="save these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a scenario counts as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 if any scenario regressed")
+    args = parser.parse_args()
+
+    # The MCP server is started as "python mcp_server.py" relative to the working directory
+    os.chdir(ROOT)
+    server = FakeOpenAIServer(latency=args.latency, rules=CANNED_REPLIES).start()
+    os.environ.update({"OPENAI_API_KEY": "bench-key", "OPENAI_BASE_URL": server.base_url, "OPENAI_MAX_RETRIES": "0"})
+
+    try:
+        scenarios = run_benchmarks(args.iterations, args.cold_iterations, args.concurrency)
+    finally:
+        server.stop()
+
+    results = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "fake_llm_latency_s": args.latency,
+            "peak_rss_mb": peak_rss_mb(),
+            "peak_rss_mcp_servers_mb": peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None
+        },
+        "scenarios": scenarios
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    print(f"\n{'scenario':<50} {'p50':>9} {'p95':>9} {'p99':>9} {'req/s':>9} {'rss MB':>8}")
+    for name, stats in scenarios.items():
+        print(f"{name:<50} {stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9} "
+              f"{stats['throughput_per_s']:>9} {stats['peak_rss_mb']:>8}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} scenario(s) regressed by more than {args.tolerance:.0%}")
+        if args.fail_on_regression:
+            sys.exit(1)
+    else:
+        print("\nNo regressions against the baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Micro-benchmark: flight schedule build time and itinerary search latency on a large synthetic route graph.
+
+    python benchmarks/bench_flights.py                  # 1000 airports, 31-day window
+    python benchmarks/bench_flights.py --airports 3000 --days 60
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flight_search import FlightSchedule
+from benchmarks.bench_e2e import percentile
+from benchmarks.bench_catalog import synthetic_catalog
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--airports", type=int, default=1000, help="number of synthetic airports")
+    parser.add_argument("--days", type=int, default=31, help="width of the departure window")
+    parser.add_argument("--searches", type=int, default=100, help="random origin/destination pairs per sort order")
+    args = parser.parse_args()
+
+    catalog, _ = synthetic_catalog(args.airports, per_city=0)
+
+    start = time.perf_counter()
+    schedule = FlightSchedule.from_catalog(catalog)
+    build_seconds = time.perf_counter() - start
+    services = sum(len(group) for routes in schedule.routes.values() for group in routes.values())
+    print(f"{len(schedule.airports)} airports, {schedule.route_count} routes, {services} daily services, "
+          f"built in {build_seconds * 1000:.0f} ms\n")
+
+    rng = random.Random(1)
+    codes = sorted(schedule.airports)
+    pairs = [tuple(rng.sample(codes, 2)) for _ in range(args.searches)]
+    first_day = datetime.date(2025, 5, 1)
+    last_day = first_day + datetime.timedelta(days=args.days - 1)
+
+    print(f"{'search':<28} {'p50':>10} {'p95':>10} {'p99':>10} {'found':>7} {'with stops':>11}")
+    for sort_by in ("price", "duration"):
+        latencies, found, with_stops = [], 0, 0
+        for origin, destination in pairs:
+            start = time.perf_counter()
+            itineraries = schedule.search(origin, destination, first_day, last_day, sort_by=sort_by)
+            latencies.append(time.perf_counter() - start)
+            found += bool(itineraries)
+            with_stops += any(len(itinerary.legs) > 1 for itinerary in itineraries)
+
+        p50, p95, p99 = (percentile(latencies, q) * 1000 for q in (50, 95, 99))
+        print(f"{'top 5 by ' + sort_by:<28} {p50:>7.1f} ms {p95:>7.1f} ms {p99:>7.1f} ms "
+              f"{found:>7} {with_stops:>11}")
+
+if __name__ == "__main__":
+    main()
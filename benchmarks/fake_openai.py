@@ -0,0 +1,152 @@
+import json
+import time
+import threading
+from typing import List, Optional, Tuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeOpenAIServer:
+    def __init__(self, reply: str = "Hello from the fake endpoint", latency: float = 0.0, chunk_latency: float = 0.0,
+                 rules: Optional[List[Tuple[str, str]]] = None):
+        """
+        Minimal OpenAI-compatible chat completions endpoint for tests and benchmarks.
+        Records every request body and the client ports it was received on.
+
+        Args:
+            reply (str): Default reply content
+            latency (float): Seconds to wait before answering, to simulate model time to first token
+            chunk_latency (float): Seconds between streamed chunks
+            rules (list, optional): (substring, reply) pairs; the first substring found in the last message picks the reply,
+                                    e.g. canned tool-selection JSON for a question. When the request offers tools,
+                                    a reply that is a {"tool": ..., "arguments": ...} object or a list of them
+                                    is sent as native tool calls; string arguments are sent as is.
+        """
+        self.reply = reply
+        self.latency = latency
+        self.chunk_latency = chunk_latency
+        self.rules = list(rules or [])
+        self.requests = []
+        self.client_ports = set()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reply_for(self, request) -> str:
+        """
+        Pick the reply for a request body using the rules, falling back to the default reply
+        """
+        messages = request.get("messages") or [{}]
+        content = messages[-1].get("content") or ""
+        return next((reply for substring, reply in self.rules if substring in content), self.reply)
+
+    @staticmethod
+    def tool_calls_for(request, reply) -> Optional[list]:
+        """
+        Turn a canned tool-selection reply into OpenAI tool_calls if the request offered tools
+        """
+        if not request.get("tools"):
+            return None
+        try:
+            calls = json.loads(reply)
+        except json.JSONDecodeError:
+            return None
+        calls = calls if isinstance(calls, list) else [calls]
+        if not calls or not all(isinstance(call, dict) and "tool" in call for call in calls):
+            return None
+
+        return [{
+            "id": f"call_{i}",
+            "type": "function",
+            "function": {
+                "name": call["tool"],
+                "arguments": call.get("arguments") if isinstance(call.get("arguments"), str) else json.dumps(call.get("arguments", {}))
+            }
+        } for i, call in enumerate(calls)]
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1 so the client can keep connections alive
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                fake.requests.append(request)
+                fake.client_ports.add(self.client_address[1])
+                reply = fake.reply_for(request)
+
+                if fake.latency:
+                    time.sleep(fake.latency)
+
+                if request.get("stream"):
+                    self._stream_reply(reply)
+                    return
+
+                tool_calls = fake.tool_calls_for(request, reply)
+                if tool_calls:
+                    message = {"role": "assistant", "content": None, "tool_calls": tool_calls}
+                else:
+                    message = {"role": "assistant", "content": reply}
+
+                body = json.dumps({
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": "gpt-3.5-turbo",
+                    "choices": [{
+                        "index": 0,
+                        "message": message,
+                        "finish_reason": "tool_calls" if tool_calls else "stop"
+                    }],
+                    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+                }).encode()
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream_reply(self, reply):
+                # Server-sent events, one word per chunk, terminated by [DONE]
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                for i, word in enumerate(reply.split(" ")):
+                    if i and fake.chunk_latency:
+                        time.sleep(fake.chunk_latency)
+                    chunk = {
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion.chunk",
+                        "created": 0,
+                        "model": "gpt-3.5-turbo",
+                        "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]
+                    }
+                    self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+
+                self._write_chunk(b"data: [DONE]\n\n")
+                self._write_chunk(b"")
+
+            def _write_chunk(self, data):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,202 @@
+import os
+import sys
+import json
+import sqlite3
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Travel catalog backing the MCP server tools, loaded once at server startup.
+# A .json file holds the bundled seed data; a .sqlite3/.db file can hold a much larger catalog.
+CATALOG_PATH = os.getenv("CATALOG_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "catalog.json"))
+
+# Rows whose city is GENERIC apply to any city the catalog has no rows for
+GENERIC = ""
+
+class City(NamedTuple):
+    name: str
+    country: str
+    airport_code: str
+    latitude: float
+    longitude: float
+
+class Country(NamedTuple):
+    name: str
+    gateway_city: str
+
+class Hotel(NamedTuple):
+    name: str
+    city: str
+    budget: str
+    price_per_night_usd: float
+    rating: float
+
+class Restaurant(NamedTuple):
+    name: str
+    city: str
+    cuisine: str
+    rating: float
+
+class Attraction(NamedTuple):
+    name: str
+    city: str
+
+class SeasonalAdvice(NamedTuple):
+    destination: str
+    advice: str
+
+# Table name -> record type; columns are the record fields in order
+TABLES = {
+    "cities": City,
+    "countries": Country,
+    "hotels": Hotel,
+    "restaurants": Restaurant,
+    "attractions": Attraction,
+    "seasonal_advice": SeasonalAdvice
+}
+
+_SQL_TYPES = {str: "TEXT", float: "REAL"}
+
+def _key(name: str) -> str:
+    return name.strip().casefold()
+
+def _index(rows: Iterable[NamedTuple], *fields: str) -> Dict[Tuple[str, ...], Tuple[NamedTuple, ...]]:
+    """
+    Group rows by the case-folded values of the fields. Groups are tuples so lookups hand out no copies.
+    """
+    groups = defaultdict(list)
+    for row in rows:
+        groups[tuple(_key(getattr(row, field)) for field in fields)].append(row)
+    return {key: tuple(group) for key, group in groups.items()}
+
+class Catalog:
+    def __init__(self, tables: Dict[str, Iterable[NamedTuple]]):
+        """
+        In-memory travel catalog with hash indexes by city, case-folded name, budget tier and cuisine.
+        Every lookup is a dict access, so its cost doesn't grow with the number of rows.
+        """
+        self.tables = {name: tuple(tables.get(name, ())) for name in TABLES}
+
+        self._cities = {_key(city.name): city for city in self.tables["cities"]}
+        self._airports = {_key(city.airport_code): city for city in self.tables["cities"] if city.airport_code}
+        self._countries = {_key(country.name): country for country in self.tables["countries"]}
+        # Best rated first, ties by name, so callers can take the top few without sorting and pages stay stable
+        hotels = sorted(self.tables["hotels"], key=lambda hotel: (-hotel.rating, hotel.name))
+        restaurants = sorted(self.tables["restaurants"], key=lambda restaurant: (-restaurant.rating, restaurant.name))
+        self._hotels_by_city = _index(hotels, "city")
+        self._hotels_by_budget = _index(hotels, "city", "budget")
+        self._restaurants_by_city = _index(restaurants, "city")
+        self._restaurants_by_cuisine = _index(restaurants, "city", "cuisine")
+        self._attractions_by_city = _index(self.tables["attractions"], "city")
+        self._advice = {_key(row.destination): row.advice for row in self.tables["seasonal_advice"]}
+        self._names = _index([*self.tables["hotels"], *self.tables["restaurants"], *self.tables["attractions"]], "name")
+
+    def __len__(self) -> int:
+        return sum(len(rows) for rows in self.tables.values())
+
+    @classmethod
+    def from_json(cls, path: str) -> "Catalog":
+        """
+        Load a JSON catalog with a {"columns": [...], "rows": [[...], ...]} object per table
+        """
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        tables = {}
+        for name, record in TABLES.items():
+            table = data.get(name) or {"columns": list(record._fields), "rows": []}
+            columns = table["columns"]
+            tables[name] = [record(**dict(zip(columns, row))) for row in table["rows"]]
+        return cls(tables)
+
+    @classmethod
+    def from_sqlite(cls, path: str) -> "Catalog":
+        """
+        Load every table of a SQLite catalog written by to_sqlite
+        """
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            tables = {}
+            for name, record in TABLES.items():
+                columns = ", ".join(record._fields)
+                tables[name] = [record._make(row) for row in connection.execute(f"SELECT {columns} FROM {name}")]
+        finally:
+            connection.close()
+        return cls(tables)
+
+    @classmethod
+    def load(cls, path: str) -> "Catalog":
+        """
+        Load a catalog file, picking the format from its extension
+        """
+        if path.endswith((".sqlite3", ".sqlite", ".db")):
+            catalog = cls.from_sqlite(path)
+        else:
+            catalog = cls.from_json(path)
+        logger.info(f"Loaded {len(catalog)} catalog rows from {path}")
+        return catalog
+
+    def to_sqlite(self, path: str) -> None:
+        """
+        Write the catalog to a SQLite file, replacing its tables
+        """
+        connection = sqlite3.connect(path)
+        try:
+            with connection:
+                for name, record in TABLES.items():
+                    columns = ", ".join(f"{field} {_SQL_TYPES[record.__annotations__[field]]}" for field in record._fields)
+                    connection.execute(f"DROP TABLE IF EXISTS {name}")
+                    connection.execute(f"CREATE TABLE {name} ({columns})")
+                    placeholders = ", ".join("?" * len(record._fields))
+                    connection.executemany(f"INSERT INTO {name} VALUES ({placeholders})", self.tables[name])
+        finally:
+            connection.close()
+
+    def city(self, name: str) -> Optional[City]:
+        """
+        Look up a city by name or airport code. A country resolves to its gateway city.
+        """
+        key = _key(name)
+        city = self._cities.get(key) or self._airports.get(key)
+        if city is None and key in self._countries:
+            city = self._cities.get(_key(self._countries[key].gateway_city))
+        return city
+
+    def hotels(self, city: str, budget: Optional[str] = None) -> Tuple[Hotel, ...]:
+        """
+        Hotels in a city, best rated first, optionally only those in one budget tier
+        """
+        if budget is None:
+            return self._hotels_by_city.get((_key(city),), ())
+        return self._hotels_by_budget.get((_key(city), _key(budget)), ())
+
+    def restaurants(self, city: str, cuisine: Optional[str] = None) -> Tuple[Restaurant, ...]:
+        """
+        Restaurants in a city, best rated first, optionally only those serving one cuisine
+        """
+        if cuisine is None:
+            return self._restaurants_by_city.get((_key(city),), ())
+        return self._restaurants_by_cuisine.get((_key(city), _key(cuisine)), ())
+
+    def attractions(self, city: str) -> Tuple[Attraction, ...]:
+        return self._attractions_by_city.get((_key(city),), ())
+
+    def seasonal_advice(self, destination: str) -> Optional[str]:
+        return self._advice.get(_key(destination))
+
+    def find(self, name: str) -> Tuple[NamedTuple, ...]:
+        """
+        Hotels, restaurants and attractions with exactly this name, ignoring case
+        """
+        return self._names.get((_key(name),), ())
+
+def load_catalog(path: str = CATALOG_PATH) -> Catalog:
+    return Catalog.load(path)
+
+if __name__ == "__main__":
+    # Compile a JSON catalog into SQLite: python catalog.py data/catalog.json catalog.sqlite3
+    if len(sys.argv) != 3:
+        sys.exit("usage: python catalog.py SOURCE DESTINATION")
+    Catalog.load(sys.argv[1]).to_sqlite(sys.argv[2])
@@ -0,0 +1,65 @@
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, MutableMapping, Sequence
+
+import streamlit as st
+from markdown_it import MarkdownIt
+
+# Messages shown at first and added by each "load earlier" click
+CHAT_PAGE_SIZE = int(os.getenv("CHAT_PAGE_SIZE", "20"))
+
+# A bare URL, outside markdown links and code, without trailing punctuation or a closing parenthesis
+_URL = re.compile(r"(?<!\]\()(?<![<\[`])https?://[^\s<>\"'()\[\]`]*[^\s<>\"'()\[\]`.,;:!?]")
+
+# CommonMark with raw HTML escaped rather than passed through, and single newlines kept as line breaks
+_markdown = MarkdownIt("commonmark", {"html": False, "breaks": True})
+
+def _open_in_new_tab(self, tokens, idx, options, env):
+    tokens[idx].attrSet("target", "_blank")
+    return self.renderToken(tokens, idx, options, env)
+
+_markdown.add_render_rule("link_open", _open_in_new_tab)
+
+@lru_cache(maxsize=4096)
+def render_message(role: str, content: str) -> str:
+    """
+    HTML of one chat message, rendered from its markdown. Raw HTML in the content is escaped, so it can't
+    inject markup, and bare URLs become links. Memoized: a message is rendered once, not on every rerun.
+    """
+    body = _markdown.render(_URL.sub(lambda match: f"<{match.group(0)}>", content))
+    css_class = "user-message" if role == "user" else "assistant-message"
+    # No raw newlines: a blank line would end the HTML block st.markdown passes through
+    return f"<div class='{css_class}'>{body.rstrip(chr(10)).replace(chr(10), '&#10;')}</div>"
+
+def chat_html(messages: Sequence[Dict[str, Any]]) -> str:
+    """
+    One HTML block for the messages, so the page gets a single element however many are shown
+    """
+    return "".join(["<div class='chat-container'>", *(render_message(m["role"], str(m["content"])) for m in messages), "</div>"])
+
+def visible_range(total: int, shown: int) -> range:
+    """
+    Indexes of the last shown messages of a history of total messages
+    """
+    return range(max(0, total - shown), total)
+
+def render_chat(messages: List[Dict[str, Any]], page_size: int = CHAT_PAGE_SIZE,
+                state: MutableMapping[str, Any] = st.session_state) -> None:
+    """
+    Show the last page_size messages, with a button that pages in earlier ones. Only the visible
+    messages are sent to the browser, so a rerun costs the same however long the conversation is.
+    """
+    shown = max(state.get("chat_shown", page_size), page_size)
+    earlier = visible_range(len(messages), shown).start
+    if earlier and st.button(f"Load {min(page_size, earlier)} earlier messages ({earlier} hidden)", key="load_earlier"):
+        shown += page_size
+        state["chat_shown"] = shown
+
+    st.markdown(chat_html(messages[visible_range(len(messages), shown).start:]), unsafe_allow_html=True)
+
+def reset_chat(state: MutableMapping[str, Any] = st.session_state) -> None:
+    """
+    Go back to showing only the latest page, as after clearing the conversation
+    """
+    state.pop("chat_shown", None)
@@ -1,31 +1,72 @@
 import streamlit as st
-from typing import Dict, Any, List, Optional, Set
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Set
+import os
 import datetime
 import json
+import uuid
 import re
+from contextlib import contextmanager
+
+import extractors
+from context_store import SESSION_ID_PATTERN, ContextStore, context_store, deserialize_context, serialize_context
+
+# What updates the context: "user" turns, "tools" (the structured arguments of the tool calls that answered a turn)
+# and "assistant" responses, whose prose mentions many places the user never asked about
+EXTRACT_FROM = frozenset(source.strip() for source in os.getenv("CONTEXT_EXTRACT_FROM", "user,tools").split(",") if source.strip())
+
+# URL query parameter carrying the session ID, so whichever replica serves a script run loads the same context
+SESSION_PARAM = "session"
+
+def current_session_id() -> str:
+    """
+    Session ID from the URL, or a new one added to the URL for the rest of the session
+    """
+    session_id = st.query_params.get(SESSION_PARAM, "")
+    if not SESSION_ID_PATTERN.match(session_id):
+        session_id = uuid.uuid4().hex
+        st.query_params[SESSION_PARAM] = session_id
+    return session_id
+
+def new_context() -> Dict[str, Any]:
+    return {
+        "conversation_id": uuid.uuid4().hex,  # Keys per-conversation state such as pending result pages
+        "location": None,  # User's current location
+        "preferences": {},  # User preferences
+        "recent_searches": [],  # Recent search history
+        "mentioned_destinations": set(),  # Destinations mentioned in conversation
+        "current_trip": {
+            # Information about currently discussed trip
+            "origin": None,
+            "destination": None,
+            "date_range": None,
+            "budget": None
+        },
+        "last_updated": datetime.datetime.now().isoformat()
+    }
 
 class ContextManager:
-    def __init__(self):
+    def __init__(self, store: Optional[ContextStore] = None, session_id: Optional[str] = None,
+                 extract_from: Optional[Iterable[str]] = None):
         """
         Initialize the context manager for tracking user preferences and conversation context.
-        Uses Streamlit's session_state for persistence during the session.
-        """
-        # Initialize context in session state if it doesn't exist
-        if "user_context" not in st.session_state:
-            st.session_state.user_context = {
-                "location": None,  # User's current location
-                "preferences": {},  # User preferences
-                "recent_searches": [],  # Recent search history
-                "mentioned_destinations": set(),  # Destinations mentioned in conversation
-                "current_trip": {  
-                    # Information about currently discussed trip
-                    "origin": None,
-                    "destination": None,
-                    "date_range": None,
-                    "budget": None
-                },
-                "last_updated": datetime.datetime.now().isoformat()
-            }
+        The context lives in a ContextStore keyed by session ID; st.session_state caches it for the
+        script runs of this browser session, and save() writes it back once per run if it changed.
+        """
+        self.store = store or context_store
+        self.session_id = session_id or current_session_id()
+        self.extract_from = EXTRACT_FROM if extract_from is None else frozenset(extract_from)
+        # Fields changed inside the open batch() blocks, and how deeply they are nested
+        self._pending: Set[str] = set()
+        self._batch_depth = 0
+
+        # Read through the session_state cache to the store, then fall back to a fresh context
+        if st.session_state.get("user_context_session") != self.session_id or "user_context" not in st.session_state:
+            data = self.store.load(self.session_id)
+            st.session_state.user_context = deserialize_context(data) if data else new_context()
+            st.session_state.user_context_session = self.session_id
+            self._reset_tracking()
+        elif "user_context_changed" not in st.session_state:
+            self._reset_tracking()
     
     def get_user_context(self) -> Dict[str, Any]:
         """
@@ -37,8 +78,9 @@ class ContextManager:
         """
         Set the user's current location
         """
-        st.session_state.user_context["location"] = location
-        self._update_timestamp()
+        if st.session_state.user_context["location"] != location:
+            st.session_state.user_context["location"] = location
+            self._mark_changed("location")
     
     def set_preferences(self, preferences: Dict[str, Any]) -> None:
         """
@@ -46,169 +88,77 @@ class ContextManager:
         """
         # Only update non-empty values
         for key, value in preferences.items():
-            if value:  
+            if value and st.session_state.user_context["preferences"].get(key) != value:
                 st.session_state.user_context["preferences"][key] = value
-        
-        self._update_timestamp()
+                self._mark_changed("preferences")
     
     def add_search(self, search_query: str) -> None:
         """
         Add a search query to recent searches
         """
-        # Keep only unique and non-empty searches
-        if search_query and search_query.strip():
+        # Keep only unique and non-empty searches; searching the latest query again changes nothing
+        recent_searches = st.session_state.user_context["recent_searches"]
+        if search_query and search_query.strip() and recent_searches[:1] != [search_query]:
 
-            # Remove existing duplicate
-            if search_query in st.session_state.user_context["recent_searches"]:
-                st.session_state.user_context["recent_searches"].remove(search_query)
-
-            # Add to the beginning of the list
-            st.session_state.user_context["recent_searches"].insert(0, search_query)
-            # Keep only the 5 most recent searches
-            st.session_state.user_context["recent_searches"] = st.session_state.user_context["recent_searches"][:10]
-        
-        self._update_timestamp()
+            # Move an existing duplicate to the beginning of the list, keeping the 10 most recent searches
+            st.session_state.user_context["recent_searches"] = ([search_query] + [s for s in recent_searches if s != search_query])[:10]
+            self._mark_changed("recent_searches")
     
     def add_mentioned_destination(self, destination: str) -> None:
         """
         Add a destination mentioned in the conversation
         """
-        if destination:
+        if destination and destination not in st.session_state.user_context["mentioned_destinations"]:
             st.session_state.user_context["mentioned_destinations"].add(destination)
-        
-        self._update_timestamp()
+            self._mark_changed("mentioned_destinations")
     
     def update_current_trip(self, origin=None, destination=None, date_range=None, budget=None) -> None:
         """
         Update information about the current trip being discussed
         """
         current_trip = st.session_state.user_context["current_trip"]
-        
-        if origin:
-            current_trip["origin"] = origin
-        if destination:
-            current_trip["destination"] = destination
+
+        with self.batch():
+            for field, value in (("origin", origin), ("destination", destination), ("date_range", date_range), ("budget", budget)):
+                if value and current_trip[field] != value:
+                    current_trip[field] = value
+                    self._mark_changed("current_trip")
+
             # Also add to mentioned destinations
-            self.add_mentioned_destination(destination)
-        if date_range:
-            current_trip["date_range"] = date_range
-        if budget:
-            current_trip["budget"] = budget
-        
-        self._update_timestamp()
+            if destination:
+                self.add_mentioned_destination(destination)
     
     def clear_context(self) -> None:
         """
         Clear the user context
         """
-        st.session_state.user_context = {
-            "location": None,
-            "preferences": {},
-            "recent_searches": [],
-            "mentioned_destinations": set(),
-            "current_trip": {
-                "origin": None,
-                "destination": None,
-                "date_range": None,
-                "budget": None
-            },
-            "last_updated": datetime.datetime.now().isoformat()
-        }
+        st.session_state.user_context = new_context()
+        self._mark_changed(*st.session_state.user_context)
     
     def extract_destinations(self, text: str) -> List[str]:
         """
         Extract potential destination names from text
         """
-        common_destinations = [
-            "New York", "Paris", "London", "Rome", "Tokyo", "Dubai", "Bangkok",
-            "Greece", "Italy", "France", "Egypt", "Spain", "Japan", "Thailand",
-            "Berlin", "Amsterdam", "Vienna", "Venice", "Milan", "Barcelona",
-            "Hong Kong", "Singapore", "Sydney", "Cairo", "Istanbul", "Athens"
-        ]
-
-        # Add common destination aliases
-        destination_aliases = {
-            "NYC": "New York",
-            "LA": "Los Angeles",
-            "SF": "San Francisco",
-            "Vegas": "Las Vegas",
-            "UK": "United Kingdom",
-            "US": "United States",
-            "USA": "United States"
-        }
-        
-        found_destinations = []
-
-        for destination in common_destinations:
-            # Look for the destination as a whole word
-            if re.search(r'\b' + re.escape(destination) + r'\b', text, re.IGNORECASE):
-                found_destinations.append(destination)
-
-        # Check for aliases
-        for alias, full_name in destination_aliases.items():
-            if re.search(r'\b' + re.escape(alias) + r'\b', text, re.IGNORECASE):
-                found_destinations.append(full_name)
-        
-        return list(dict.fromkeys(found_destinations))
+        return extractors.extract_destinations(text)
     
-    def extract_date_ranges(self, text: str) -> List[str]:
+    def extract_date_ranges(self, text: str) -> List[extractors.DateRange]:
         """
-        Extract date ranges from text using regex patterns
+        Extract date ranges from text, resolved to calendar dates
         """
-        date_ranges = []
-    
-        # Standard format: YYYY-MM-DD to YYYY-MM-DD
-        standard_format = re.findall(r'\d{4}-\d{2}-\d{2}\s+to\s+\d{4}-\d{2}-\d{2}', text)
-        date_ranges.extend(standard_format)
-        
-        # Month year format: May 2025
-        month_year_pattern = r'(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{4}'
-        month_year_matches = re.findall(month_year_pattern, text, re.IGNORECASE)
-        date_ranges.extend(month_year_matches)
-        
-        # Date with ordinals: 21st May, 3rd June, etc.
-        ordinal_date = r'\d{1,2}(?:st|nd|rd|th)?\s+(?:January|February|March|April|May|June|July|August|September|October|November|December)(?:\s+\d{4})?'
-        ordinal_matches = re.findall(ordinal_date, text, re.IGNORECASE)
-        
-        # Convert dates into standard format where possible
-        for date_str in ordinal_matches:
-            date_ranges.append(date_str)
-        
-        # Look for "next week", "next month", etc.
-        relative_dates = {
-            r'\bnext\s+week\b': 'within a week',
-            r'\bnext\s+month\b': 'within a month', 
-            r'\bin\s+\d+\s+days\b': 'upcoming days',
-            r'\bin\s+\d+\s+weeks\b': 'upcoming weeks'
-        }
-        
-        for pattern, replacement in relative_dates.items():
-            if re.search(pattern, text, re.IGNORECASE):
-                date_ranges.append(replacement)
-                
-        return date_ranges
+        return extractors.extract_date_ranges(text)
     
     def extract_budget(self, text: str) -> Optional[str]:
         """
         Extract budget information from text
         """
-        budget_terms = {
-            "low": ["low", "budget", "cheap", "inexpensive", "affordable"],
-            "medium": ["medium", "moderate", "standard", "average"],
-            "high": ["high", "luxury", "expensive", "premium", "upscale"]
-        }
-        
-        for budget_level, terms in budget_terms.items():
-            for term in terms:
-                if re.search(r'\b' + re.escape(term) + r'\b', text, re.IGNORECASE):
-                    return budget_level
-        
-        return None
+        return extractors.extract_budget(text)
     
     def update_context_from_text(self, text: str) -> None:
-            """
-            Update context by extracting information from text
-            """
+        """
+        Update context by extracting information from text
+        """
+        # One change set and timestamp for everything the text mentions
+        with self.batch():
             # Extract destinations
             destinations = self.extract_destinations(text)
             for dest in destinations:
@@ -253,58 +203,148 @@ class ContextManager:
                         if self.get_user_context()["location"] and not self.get_user_context()["current_trip"]["origin"]:
                             self.update_current_trip(origin=self.get_user_context()["location"])
             
-            # Extract date ranges
-            date_ranges = self.extract_date_ranges(text)
-            if date_ranges:
-                self.update_current_trip(date_range=date_ranges[0])
+            # Extract date ranges and budget in one pass
+            details = extractors.extract_travel_details(text)
+            if details.date_ranges:
+                # Stored in the canonical "YYYY-MM-DD to YYYY-MM-DD" form the flight tool accepts
+                self.update_current_trip(date_range=str(details.date_ranges[0]))
             
-            # Extract budget
-            budget = self.extract_budget(text)
-            if budget:
-                self.update_current_trip(budget=budget)
+            if details.budget:
+                self.update_current_trip(budget=details.budget)
 
     def update_context(self, message: Dict[str, str]) -> None:
         """
-        Update the context based on a message
+        Update the context based on a message, if its role is one of the sources in extract_from
         """
         content = message.get("content", "")
-        
-        # Update context based on text content (message)
-        self.update_context_from_text(content)
-        self._update_timestamp()
+        role = message.get("role", "user")
+        if role not in self.extract_from:
+            return
+
+        if role == "assistant":
+            extractor = extractors.IncrementalExtractor()
+            extractor.feed(content)
+            self._apply_extracted(extractor)
+        else:
+            # Update context based on text content (message)
+            self.update_context_from_text(content)
+
+    def extract_stream(self, chunks: Iterable[str]) -> Iterator[str]:
+        """
+        Pass a streamed response through, extracting from each chunk as it arrives when assistant
+        responses are a source. The context is updated once the stream ends.
+        """
+        if "assistant" not in self.extract_from:
+            yield from chunks
+            return
+
+        extractor = extractors.IncrementalExtractor()
+        for chunk in chunks:
+            extractor.feed(chunk)
+            yield chunk
+        self._apply_extracted(extractor)
+
+    def update_from_tool_calls(self, tool_calls: Iterable[Dict[str, Any]]) -> None:
+        """
+        Update the current trip from the arguments of the tool calls that answered a turn
+        """
+        if "tools" not in self.extract_from:
+            return
+
+        with self.batch():
+            for tool_call in tool_calls:
+                arguments = tool_call.get("arguments", {})
+                date_range = extractors.parse_date_range(arguments.get("date_range") or "")
+                self.update_current_trip(
+                    origin=arguments.get("from_location"),
+                    destination=arguments.get("to_location") or arguments.get("location") or arguments.get("destination"),
+                    date_range=str(date_range) if date_range else None,
+                    budget=extractors.extract_budget(arguments.get("budget") or "")
+                )
+
+    def _apply_extracted(self, extractor: extractors.IncrementalExtractor) -> None:
+        extractor.finish()
+        with self.batch():
+            for destination in extractor.destinations:
+                self.add_mentioned_destination(destination)
+            if extractor.date_ranges:
+                self.update_current_trip(date_range=str(extractor.date_ranges[0]))
+            if extractor.budget:
+                self.update_current_trip(budget=extractor.budget)
     
-    def _update_timestamp(self) -> None:
+    @contextmanager
+    def batch(self) -> Iterator["ContextManager"]:
+        """
+        Apply several mutations as one update, such as everything learned from one turn.
+        The fields they change get a single last_updated timestamp when the outermost batch ends.
         """
-        Update the last_updated timestamp
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._pending:
+                self._commit()
+
+    def changed_fields(self) -> Set[str]:
         """
+        Top-level context fields changed since the context was loaded or last saved
+        """
+        return set(st.session_state.user_context_changed)
+
+    def _mark_changed(self, *fields: str) -> None:
+        """
+        Record that fields changed. The cached serialized forms are stale from here on.
+        """
+        self._pending.update(fields)
+        st.session_state.user_context_json = None
+        st.session_state.user_context_dict = None
+        if not self._batch_depth:
+            self._commit()
+
+    def _commit(self) -> None:
         st.session_state.user_context["last_updated"] = datetime.datetime.now().isoformat()
+        # Kept in session_state so changes from a run interrupted before save() are written by the next one
+        st.session_state.user_context_changed.update(self._pending, ("last_updated",))
+        st.session_state.user_context_json = None
+        st.session_state.user_context_dict = None
+        self._pending.clear()
+
+    def _reset_tracking(self) -> None:
+        st.session_state.user_context_changed = set()
+        st.session_state.user_context_json = None
+        st.session_state.user_context_dict = None
+
+    def serialized(self) -> str:
+        """
+        Compact JSON form of the context, computed once per change
+        """
+        if st.session_state.get("user_context_json") is None:
+            st.session_state.user_context_json = serialize_context(self.get_user_context())
+        return st.session_state.user_context_json
+
+    def save(self) -> None:
+        """
+        Write the context to the store if it changed since it was loaded or last saved.
+        Called once at the end of a script run, however many setters ran.
+        """
+        if st.session_state.user_context_changed:
+            self.store.save(self.session_id, self.serialized())
+            st.session_state.user_context_changed = set()
     
     def to_dict(self) -> Dict[str, Any]:
         """
         Make the user context dictionary safe for JSON serialization. This is useful for saving, logging, sending to an API, or displaying in the UI.
+        Sets become sorted lists and other unserializable values strings. The result is cached until the next change,
+        so each call returns a shallow copy of it.
         """
-        try:
-         
-            context_dict = self.get_user_context().copy()
+        if st.session_state.get("user_context_dict") is None:
+            try:
+                st.session_state.user_context_dict = json.loads(self.serialized())
+            except Exception as e:
+                return {"error": "Context serialization failed", "last_updated": datetime.datetime.now().isoformat()}
+        return dict(st.session_state.user_context_dict)
 
-            # Convert sets to lists because sets are not JSON serializable
-            if isinstance(context_dict.get("mentioned_destinations"), set):
-                context_dict["mentioned_destinations"] = list(context_dict["mentioned_destinations"])
-            
-            # Ensure all values in the context are JSON serializable
-            for key, value in list(context_dict.items()):
-                try:
-                    # Test if the value can be serialized to JSON
-                    json.dumps({key: value})
-                except (TypeError, OverflowError):
-                    # If not, convert it to a string
-                    context_dict[key] = str(value)
-                    
-            return context_dict
-        except Exception as e:
-            return {"error": "Context serialization failed", "last_updated": datetime.datetime.now().isoformat()}
-
-    
     def from_dict(self, context_dict: Dict[str, Any]) -> None:
         """
         Load context from a dictionary
@@ -313,4 +353,4 @@ class ContextManager:
             context_dict["mentioned_destinations"] = set(context_dict["mentioned_destinations"])
         
         st.session_state.user_context = context_dict
-        self._update_timestamp()
\ No newline at end of file
+        self._mark_changed(*context_dict)
\ No newline at end of file
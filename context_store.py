@@ -0,0 +1,190 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Session contexts untouched for this many seconds are dropped
+DEFAULT_CONTEXT_TTL = 30 * 86400
+
+# Session IDs are generated by uuid4().hex; anything else is rejected before it reaches a file name
+SESSION_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+def serialize_context(context: Dict[str, Any]) -> str:
+    """
+    Compact JSON form of a user context; sets become sorted lists
+    """
+    return json.dumps(context, separators=(",", ":"), ensure_ascii=False,
+                      default=lambda value: sorted(value) if isinstance(value, (set, frozenset)) else str(value))
+
+def deserialize_context(data: str) -> Dict[str, Any]:
+    context = json.loads(data)
+    if isinstance(context.get("mentioned_destinations"), list):
+        context["mentioned_destinations"] = set(context["mentioned_destinations"])
+    return context
+
+class ContextStore(ABC):
+    """
+    Where user contexts live between script runs, keyed by session ID
+    """
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def save(self, session_id: str, data: str) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+class InMemoryContextStore(ContextStore):
+    def __init__(self, max_sessions: int = 10000):
+        """
+        Process-local store, bounded by evicting the least recently used sessions. Sessions are only
+        visible to the replica that created them, so it needs sticky sessions behind a load balancer.
+        """
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str) -> Optional[str]:
+        with self._lock:
+            data = self._sessions.get(session_id)
+            if data is not None:
+                self._sessions.move_to_end(session_id)
+            return data
+
+    def save(self, session_id: str, data: str) -> None:
+        with self._lock:
+            self._sessions[session_id] = data
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+
+class SQLiteContextStore(ContextStore):
+    def __init__(self, path: str, ttl: float = DEFAULT_CONTEXT_TTL):
+        """
+        On-disk store in WAL mode, so replicas sharing the file read while another writes
+        """
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS user_context (session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS user_context_updated_at ON user_context (updated_at)")
+        self._conn.commit()
+
+    def load(self, session_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM user_context WHERE session_id = ? AND updated_at > ?", (session_id, time.time() - self.ttl)
+            ).fetchone()
+        return row[0] if row else None
+
+    def save(self, session_id: str, data: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO user_context (session_id, data, updated_at) VALUES (?, ?, ?)", (session_id, data, now)
+            )
+            self._conn.execute("DELETE FROM user_context WHERE updated_at <= ?", (now - self.ttl,))
+            self._conn.commit()
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM user_context WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM user_context")
+            self._conn.commit()
+
+class FileContextStore(ContextStore):
+    def __init__(self, directory: str, ttl: float = DEFAULT_CONTEXT_TTL):
+        """
+        One JSON file per session in a directory the replicas share, such as a mounted volume.
+        Files are replaced atomically, so a reader never sees a partial write.
+        """
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id: str) -> str:
+        if not SESSION_ID_PATTERN.match(session_id):
+            raise ValueError(f"invalid session ID: {session_id!r}")
+        return os.path.join(self.directory, f"{session_id}.json")
+
+    def load(self, session_id: str) -> Optional[str]:
+        path = self._path(session_id)
+        try:
+            if os.path.getmtime(path) <= time.time() - self.ttl:
+                return None
+            with open(path, encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def save(self, session_id: str, data: str) -> None:
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(temporary, self._path(session_id))
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def delete(self, session_id: str) -> None:
+        try:
+            os.remove(self._path(session_id))
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                os.remove(os.path.join(self.directory, name))
+
+def _build_store() -> ContextStore:
+    """
+    Pick the context store from CONTEXT_STORE_BACKEND ("memory", "sqlite" or "file")
+    """
+    backend = os.getenv("CONTEXT_STORE_BACKEND", "memory").lower()
+    ttl = float(os.getenv("CONTEXT_STORE_TTL", str(DEFAULT_CONTEXT_TTL)))
+
+    if backend == "sqlite":
+        return SQLiteContextStore(os.getenv("CONTEXT_STORE_PATH", "context.sqlite3"), ttl=ttl)
+    if backend == "file":
+        return FileContextStore(os.getenv("CONTEXT_STORE_PATH", "contexts"), ttl=ttl)
+
+    return InMemoryContextStore(max_sessions=int(os.getenv("CONTEXT_STORE_MAX_SESSIONS", "10000")))
+
+# Shared store used by every ContextManager in this process
+context_store = _build_store()
@@ -0,0 +1,101 @@
+import os
+import re
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+from prompts import count_tokens
+
+# Tokens of recent turns sent verbatim with every LLM call, and of the summary of the turns before them
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "800"))
+SUMMARY_TOKEN_BUDGET = int(os.getenv("HISTORY_SUMMARY_TOKENS", "200"))
+
+# Words of each turn kept in its summary line
+SUMMARY_WORDS_PER_TURN = 24
+
+SUMMARY_HEADER = "Summary of the earlier conversation:\n"
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s|\n")
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut text down to at most max_tokens, keeping its beginning
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    # Shrink by the overshoot ratio until it fits; converges in a step or two
+    while text and count_tokens(text + " …") > max_tokens:
+        text = text[:int(len(text) * max_tokens / count_tokens(text + " …") * 0.95)]
+    return text.rstrip() + " …"
+
+def summarize_turns(summary: str, turns: List[Dict[str, str]], max_tokens: int) -> str:
+    """
+    Fold turns that left the window into the running summary: one line per turn, from its first sentence.
+    The oldest lines are dropped when the summary outgrows max_tokens.
+    """
+    lines = summary.splitlines() if summary else []
+    for turn in turns:
+        first_sentence = _SENTENCE_END.split(turn["content"].strip(), 1)[0]
+        words = first_sentence.split()
+        line = " ".join(words[:SUMMARY_WORDS_PER_TURN]) + (" …" if len(words) > SUMMARY_WORDS_PER_TURN else "")
+        lines.append(f"- {'User' if turn['role'] == 'user' else 'Assistant'}: {line}")
+
+    while lines and count_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+class ConversationHistory:
+    def __init__(self, window_tokens: int = HISTORY_TOKEN_BUDGET, summary_tokens: int = SUMMARY_TOKEN_BUDGET,
+                 summarize: Callable[[str, List[Dict[str, str]], int], str] = summarize_turns):
+        """
+        Rolling, token-bounded history of a conversation for multi-turn LLM calls.
+        The most recent turns are kept verbatim within window_tokens; turns that roll out of the window are
+        folded into a running summary of at most summary_tokens. The summary is only recomputed when the
+        window rolls over, so the prompt cost of the history stays constant however long the session runs.
+
+        Args:
+            summarize: Folds evicted turns into the previous summary within a token budget
+        """
+        self.window_tokens = window_tokens
+        self.summary_tokens = summary_tokens
+        self.summarize = summarize
+        self.summary = ""
+        self._turns: Deque[Dict[str, str]] = deque()
+        self._turn_tokens: Deque[int] = deque()
+        self._window_total = 0
+        self._messages: Optional[List[Dict[str, str]]] = None
+
+    def add(self, role: str, content: str) -> None:
+        """
+        Append a turn. A turn longer than half the window is truncated so it can't push out everything else.
+        """
+        content = truncate_to_tokens(content, self.window_tokens // 2)
+        self._turns.append({"role": role, "content": content})
+        self._turn_tokens.append(count_tokens(content))
+        self._window_total += self._turn_tokens[-1]
+        self._messages = None
+
+        evicted = []
+        while self._window_total > self.window_tokens:
+            evicted.append(self._turns.popleft())
+            self._window_total -= self._turn_tokens.popleft()
+        if evicted:
+            self.summary = self.summarize(self.summary, evicted, self.summary_tokens)
+
+    def messages(self) -> List[Dict[str, str]]:
+        """
+        Chat messages to put between the system message and the new user message: the summary, then the window
+        """
+        if self._messages is None:
+            summary = [{"role": "system", "content": SUMMARY_HEADER + self.summary}] if self.summary else []
+            self._messages = summary + list(self._turns)
+        return list(self._messages)
+
+    def clear(self) -> None:
+        self.summary = ""
+        self._turns.clear()
+        self._turn_tokens.clear()
+        self._window_total = 0
+        self._messages = None
+
+    def __len__(self) -> int:
+        return len(self._turns)
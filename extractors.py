@@ -0,0 +1,351 @@
+import os
+import re
+import json
+import calendar
+import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Gazetteer of known destinations and their aliases, loaded once at import time
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "gazetteer.json"))
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    Build a regex alternation for the words, factored through a character trie.
+    Shared prefixes are matched once, so the regex stays fast with thousands of names,
+    and optional suffixes are greedy, so the longest name wins.
+    """
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def _pattern(node: Dict[str, Any]) -> str:
+        is_end = "" in node
+        branches = [re.escape(char) + _pattern(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not is_end:
+            return branches[0]
+        group = "(?:" + "|".join(branches) + ")"
+        return group + "?" if is_end else group
+
+    return _pattern(trie)
+
+class DestinationMatcher:
+    def __init__(self, destinations: Iterable[str], aliases: Optional[Dict[str, str]] = None):
+        """
+        Compiled single-pass matcher for destination names and aliases.
+        Names and mixed-case aliases match case-insensitively. All-caps aliases (NYC, US) match
+        case-sensitively so that ordinary words like "us" are not read as destinations.
+        """
+        self._insensitive: Dict[str, str] = {}
+        self._sensitive: Dict[str, str] = {}
+
+        for destination in destinations:
+            self._insensitive[destination.lower()] = destination
+
+        for alias, full_name in (aliases or {}).items():
+            if alias.isupper():
+                self._sensitive[alias] = full_name
+            else:
+                self._insensitive.setdefault(alias.lower(), full_name)
+
+        branches = []
+        if self._insensitive:
+            branches.append("(?i:" + _trie_pattern(self._insensitive) + ")")
+        if self._sensitive:
+            branches.append(_trie_pattern(self._sensitive))
+
+        self._pattern = re.compile(r'\b(?:' + "|".join(branches) + r')\b') if branches else None
+        self.longest_name = max(map(len, [*self._insensitive, *self._sensitive]), default=0)
+
+    @classmethod
+    def from_file(cls, path: str) -> "DestinationMatcher":
+        """
+        Load a gazetteer file with "destinations" and "aliases" keys
+        """
+        with open(path, encoding="utf-8") as f:
+            gazetteer = json.load(f)
+        return cls(gazetteer.get("destinations", []), gazetteer.get("aliases", {}))
+
+    def find(self, text: str) -> List[Tuple[str, int, int]]:
+        """
+        Return (destination, start, end) for every match, in order of appearance
+        """
+        if self._pattern is None:
+            return []
+
+        matches = []
+        for match in self._pattern.finditer(text):
+            name = match.group(0)
+            destination = self._insensitive.get(name.lower()) or self._sensitive.get(name)
+            matches.append((destination, match.start(), match.end()))
+        return matches
+
+    def extract(self, text: str) -> List[str]:
+        """
+        Return the distinct destinations in the text, in order of first appearance
+        """
+        return list(dict.fromkeys(destination for destination, _, _ in self.find(text)))
+
+destination_matcher = DestinationMatcher.from_file(GAZETTEER_PATH)
+
+def extract_destinations(text: str) -> List[str]:
+    """
+    Extract potential destination names from text, in order of appearance
+    """
+    return destination_matcher.extract(text)
+
+def find_destinations(text: str) -> List[Tuple[str, int, int]]:
+    """
+    Extract destination names from text with their character offsets
+    """
+    return destination_matcher.find(text)
+
+MONTHS = {
+    "january": 1, "february": 2, "march": 3, "april": 4, "may": 5, "june": 6, "july": 7,
+    "august": 8, "september": 9, "october": 10, "november": 11, "december": 12,
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "jun": 6, "jul": 7, "aug": 8,
+    "sep": 9, "sept": 9, "oct": 10, "nov": 11, "dec": 12
+}
+
+BUDGET_TERMS = {
+    "low": ["low", "budget", "cheap", "inexpensive", "affordable"],
+    "medium": ["medium", "moderate", "standard", "average", "mid-range", "midrange"],
+    "high": ["high", "luxury", "expensive", "premium", "upscale"]
+}
+_BUDGET_LEVELS = {term: level for level, terms in BUDGET_TERMS.items() for term in terms}
+
+class DateRange(NamedTuple):
+    """
+    A travel date range resolved to calendar dates. Single days have start == end.
+    """
+    start: datetime.date
+    end: datetime.date
+    text: str
+
+    def __str__(self) -> str:
+        return f"{self.start.isoformat()} to {self.end.isoformat()}"
+
+class TravelDetails(NamedTuple):
+    """
+    Structured dates and budget extracted from one piece of text
+    """
+    date_ranges: List[DateRange]
+    budget: Optional[str]
+
+# Every date and budget form in one compiled pattern, so the text is scanned once.
+# Alternatives are tried in order at each position, most specific first.
+_MONTH = "(?:" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\.?"
+_ORDINAL_DAY = r"\d{1,2}(?:st|nd|rd|th)?"
+_TRAVEL_PATTERN = re.compile(
+    r"\b(?P<iso>(?P<iso_start>\d{4}-\d{2}-\d{2})\s+to\s+(?P<iso_end>\d{4}-\d{2}-\d{2}))"
+    r"|\b(?P<ordinal>(?P<ord_day>\d{1,2})(?:st|nd|rd|th)?\s+(?P<ord_month>" + _MONTH + r")(?:\s+(?P<ord_year>\d{4}))?"
+    r"(?:\s*(?:to|until|through|-)\s*(?P<ord_day2>\d{1,2})(?:st|nd|rd|th)?\s+(?P<ord_month2>" + _MONTH + r")(?:\s+(?P<ord_year2>\d{4}))?)?)\b"
+    r"|\b(?P<month_year>(?P<my_month>" + _MONTH + r")\s+(?P<my_year>\d{4}))"
+    r"|\b(?:in|during|for|around)\s+(?P<bare_month>" + _MONTH + r")\b(?!\s*\d)"
+    r"|\b(?P<next_week>next\s+week)\b"
+    r"|\b(?P<next_month>next\s+month)\b"
+    r"|\b(?P<in_n>in\s+(?P<in_n_count>\d+)\s+(?P<in_n_unit>days?|weeks?))\b"
+    r"|\b(?P<budget>" + "|".join(re.escape(term) for term in sorted(_BUDGET_LEVELS, key=len, reverse=True)) + r")\b",
+    re.IGNORECASE
+)
+
+def _month_number(name: str) -> int:
+    return MONTHS[name.lower().rstrip(".")]
+
+def _month_range(year: int, month: int) -> Tuple[datetime.date, datetime.date]:
+    return datetime.date(year, month, 1), datetime.date(year, month, calendar.monthrange(year, month)[1])
+
+def _next_year_for(month: int, day: int, today: datetime.date) -> int:
+    """
+    Year of the next occurrence of the month and day on or after today
+    """
+    return today.year if (month, day) >= (today.month, today.day) else today.year + 1
+
+def _resolve(match: "re.Match", today: datetime.date) -> Optional[DateRange]:
+    """
+    Turn a date match into a DateRange resolved against the reference date
+    """
+    text = match.group(0).strip()
+
+    if match.group("iso"):
+        start = datetime.date.fromisoformat(match.group("iso_start"))
+        end = datetime.date.fromisoformat(match.group("iso_end"))
+        return DateRange(start, end, text)
+
+    if match.group("ordinal"):
+        month, day = _month_number(match.group("ord_month")), int(match.group("ord_day"))
+        year = int(match.group("ord_year") or _next_year_for(month, day, today))
+        start = datetime.date(year, month, day)
+        end = start
+
+        if match.group("ord_day2"):
+            month2, day2 = _month_number(match.group("ord_month2")), int(match.group("ord_day2"))
+            year2 = int(match.group("ord_year2") or (year if (month2, day2) >= (month, day) else year + 1))
+            end = datetime.date(year2, month2, day2)
+        return DateRange(start, end, text)
+
+    if match.group("month_year"):
+        start, end = _month_range(int(match.group("my_year")), _month_number(match.group("my_month")))
+        return DateRange(start, end, text)
+
+    if match.group("bare_month"):
+        month = _month_number(match.group("bare_month"))
+        year = today.year if month >= today.month else today.year + 1
+        start, end = _month_range(year, month)
+        return DateRange(max(start, today), end, text)
+
+    if match.group("next_week"):
+        start = today + datetime.timedelta(days=7 - today.weekday())
+        return DateRange(start, start + datetime.timedelta(days=6), text)
+
+    if match.group("next_month"):
+        year, month = (today.year + 1, 1) if today.month == 12 else (today.year, today.month + 1)
+        start, end = _month_range(year, month)
+        return DateRange(start, end, text)
+
+    if match.group("in_n"):
+        count = int(match.group("in_n_count"))
+        if match.group("in_n_unit").lower().startswith("week"):
+            start = today + datetime.timedelta(weeks=count)
+            return DateRange(start, start + datetime.timedelta(days=6), text)
+        start = today + datetime.timedelta(days=count)
+        return DateRange(start, start, text)
+
+    return None
+
+def extract_travel_details(text: str, today: Optional[datetime.date] = None) -> TravelDetails:
+    """
+    Extract date ranges and the budget tier from text in a single pass.
+    Relative and year-less dates are resolved against today (or the given reference date).
+    """
+    today = today or datetime.date.today()
+    date_ranges = []
+    budget = None
+
+    for match in _TRAVEL_PATTERN.finditer(text):
+        if match.group("budget"):
+            # The first budget word in the text decides the tier
+            if budget is None:
+                budget = _BUDGET_LEVELS[match.group("budget").lower()]
+            continue
+
+        try:
+            date_range = _resolve(match, today)
+        except ValueError:
+            # Impossible calendar dates such as 2025-02-30
+            continue
+
+        if date_range is not None and date_range.start <= date_range.end:
+            date_ranges.append(date_range)
+
+    return TravelDetails(date_ranges, budget)
+
+# Characters held back from each chunk until more text arrives; longer than any date phrase,
+# so a match that a chunk boundary cuts in two is completed by the next chunk
+MIN_CARRY_OVER = 64
+
+class IncrementalExtractor:
+    def __init__(self, today: Optional[datetime.date] = None, matcher: Optional[DestinationMatcher] = None):
+        """
+        Extract destinations, date ranges and the budget from text that arrives in chunks, such as a
+        streamed response. Text is dropped once no longer match can use it, and only a short tail is
+        scanned again with the next chunk, so a long response costs about one pass however it is split.
+        """
+        self.today = today or datetime.date.today()
+        self.matcher = matcher or destination_matcher
+        self.carry_over = max(MIN_CARRY_OVER, self.matcher.longest_name + 1)
+        self.destinations: List[str] = []
+        self.date_ranges: List[DateRange] = []
+        self.budget: Optional[str] = None
+        self._buffer = ""
+        # Position of the buffer in the whole text, and where each pattern's last accepted match ended
+        self._offset = 0
+        self._destinations_end = 0
+        self._details_end = 0
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        Scan the next chunk. Returns the destinations found for the first time.
+        """
+        self._buffer += chunk
+        return self._scan(final=False)
+
+    def finish(self) -> List[str]:
+        """
+        Scan what is left at the end of the text. Returns the destinations found for the first time.
+        """
+        return self._scan(final=True)
+
+    def details(self) -> TravelDetails:
+        return TravelDetails(self.date_ranges, self.budget)
+
+    def _scan(self, final: bool) -> List[str]:
+        text = self._buffer
+        # Matches ending after the limit could still grow with the next chunk
+        limit = len(text) if final else len(text) - self.carry_over
+        if limit <= 0:
+            return []
+        pending = len(text)
+        found = []
+
+        for destination, start, end in self.matcher.find(text):
+            if self._offset + start < self._destinations_end:
+                continue
+            if end > limit:
+                pending = min(pending, start)
+                break
+            self._destinations_end = self._offset + end
+            if destination not in self.destinations:
+                self.destinations.append(destination)
+                found.append(destination)
+
+        for match in _TRAVEL_PATTERN.finditer(text):
+            if self._offset + match.start() < self._details_end:
+                continue
+            if match.end() > limit:
+                pending = min(pending, match.start())
+                break
+            self._details_end = self._offset + match.end()
+
+            if match.group("budget"):
+                # The first budget word in the text decides the tier
+                self.budget = self.budget or _BUDGET_LEVELS[match.group("budget").lower()]
+                continue
+            try:
+                date_range = _resolve(match, self.today)
+            except ValueError:
+                continue
+            if date_range is not None and date_range.start <= date_range.end:
+                self.date_ranges.append(date_range)
+
+        # Keep the text from the last word break before the limit, so the next scan starts on a word
+        # boundary, or from the first pending match. Text without a break in the last carry_over characters
+        # (Chinese, Japanese) is cut at the limit, else it would all be kept and rescanned with every chunk.
+        word_break = max(text.rfind(char, 0, limit) for char in " \n\t") + 1
+        cut = min(word_break if word_break and word_break > limit - self.carry_over else limit, pending)
+        self._buffer = text[cut:]
+        self._offset += cut
+        return found
+
+def extract_date_ranges(text: str, today: Optional[datetime.date] = None) -> List[DateRange]:
+    """
+    Extract date ranges from text, resolved to calendar dates
+    """
+    return extract_travel_details(text, today).date_ranges
+
+def extract_budget(text: str) -> Optional[str]:
+    """
+    Extract budget information from text
+    """
+    return extract_travel_details(text).budget
+
+def parse_date_range(text: str, today: Optional[datetime.date] = None) -> Optional[DateRange]:
+    """
+    Parse a date range argument such as "2025-05-01 to 2025-05-07" or "May 2025"
+    """
+    date_ranges = extract_date_ranges(text, today)
+    return date_ranges[0] if date_ranges else None
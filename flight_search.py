@@ -0,0 +1,289 @@
+import os
+import math
+import heapq
+import bisect
+import zlib
+import random
+import datetime
+import itertools
+from typing import Any, Dict, Iterable, List, NamedTuple, Tuple
+
+from catalog import City
+from tool_records import FlightOption
+
+# Seed of the synthetic schedule; the same catalog and seed always give the same flights
+SCHEDULE_SEED = int(os.getenv("FLIGHT_SCHEDULE_SEED", "42"))
+
+AIRLINES = {
+    "Delta": "DL", "United": "UA", "Air France": "AF", "Qatar Airways": "QR", "Lufthansa": "LH",
+    "British Airways": "BA", "Emirates": "EK", "KLM": "KL", "Turkish Airlines": "TK", "ANA": "NH"
+}
+
+# Each airport gets routes to its nearest neighbours and nearest hubs; there is
+# one hub per AIRPORTS_PER_HUB airports, and at least HUB_COUNT
+NEAREST_ROUTES = 6
+HUB_COUNT = 4
+AIRPORTS_PER_HUB = 50
+HUBS_PER_AIRPORT = 2
+MAX_DAILY_SERVICES = 3
+
+CRUISE_KMH = 800
+TAXI_MINUTES = 30
+BASE_FARE_USD = 40
+FARE_PER_KM = (0.07, 0.12)
+# Day-to-day fare swing around a service's base price
+DAY_FACTOR = (0.8, 1.4)
+
+MIN_CONNECTION = datetime.timedelta(minutes=45)
+# Connections that go this much further than the direct distance are not explored
+MAX_DETOUR = 1.6
+DETOUR_SLACK_KM = 300
+
+SORT_KEYS = ("price", "duration")
+
+class Service(NamedTuple):
+    """
+    A flight operated every day at the same time
+    """
+    flight_number: str
+    airline: str
+    origin: str
+    destination: str
+    departure_minute: int
+    duration_minutes: int
+    base_price: float
+
+class Leg(NamedTuple):
+    service: Service
+    departure: datetime.datetime
+    arrival: datetime.datetime
+    price: float
+
+class Itinerary(NamedTuple):
+    legs: Tuple[Leg, ...]
+    price: float
+
+    @property
+    def duration(self) -> datetime.timedelta:
+        return self.legs[-1].arrival - self.legs[0].departure
+
+    def to_option(self, from_location: str, to_location: str) -> FlightOption:
+        first, last = self.legs[0], self.legs[-1]
+        airlines = list(dict.fromkeys(leg.service.airline for leg in self.legs))
+        hours, minutes = divmod(int(self.duration.total_seconds()) // 60, 60)
+        return FlightOption(
+            airline=" + ".join(airlines),
+            flight_numbers=", ".join(leg.service.flight_number for leg in self.legs),
+            price_usd=round(self.price, 2),
+            origin=f"{from_location} ({first.service.origin})",
+            destination=f"{to_location} ({last.service.destination})",
+            departure_date=first.departure.strftime("%Y-%m-%d"),
+            departure_time=first.departure.strftime("%H:%M"),
+            arrival=last.arrival.strftime("%Y-%m-%d %H:%M"),
+            duration=f"{hours}h {minutes:02d}m",
+            stops=len(self.legs) - 1,
+            airports=" → ".join([first.service.origin] + [leg.service.destination for leg in self.legs]),
+            mock_booking_link=f"https://mockflights.com/book/{airlines[0].lower().replace(' ', '')}"
+        )
+
+def distance_km(a: City, b: City) -> float:
+    """
+    Great-circle distance between two airports
+    """
+    lat1, lon1, lat2, lon2 = map(math.radians, (a.latitude, a.longitude, b.latitude, b.longitude))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371 * math.asin(math.sqrt(h))
+
+class FlightSchedule:
+    def __init__(self, airports: Iterable[City], seed: int = SCHEDULE_SEED):
+        """
+        Synthetic, deterministic daily flight schedule over a hub-and-spoke route graph between the airports.
+        Every airport links to its nearest neighbours and nearest hubs, and the hubs link to each other.
+        Each route gets one to MAX_DAILY_SERVICES daily services with a fixed time, duration and base fare.
+        """
+        self.airports: Dict[str, City] = {city.airport_code: city for city in airports if city.airport_code}
+        rng = random.Random(seed)
+        codes = sorted(self.airports)
+
+        # Unit vectors: their squared chord distance orders airports like the great-circle distance, but is cheaper
+        points = {}
+        for code in codes:
+            lat, lon = math.radians(self.airports[code].latitude), math.radians(self.airports[code].longitude)
+            points[code] = (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+        def nearest(code: str, candidates: List[str], count: int) -> List[str]:
+            x, y, z = points[code]
+            return heapq.nsmallest(count, (other for other in candidates if other != code), key=lambda other: (
+                (points[other][0] - x) ** 2 + (points[other][1] - y) ** 2 + (points[other][2] - z) ** 2))
+
+        hubs = sorted(rng.sample(codes, min(max(HUB_COUNT, len(codes) // AIRPORTS_PER_HUB), len(codes))))
+        routes = {(a, b) for a in hubs for b in hubs if a != b}
+        for code in codes:
+            for other in nearest(code, codes, NEAREST_ROUTES) + nearest(code, hubs, HUBS_PER_AIRPORT):
+                routes.add((code, other))
+                routes.add((other, code))
+
+        services: Dict[str, Dict[str, List[Service]]] = {code: {} for code in codes}
+        numbers = itertools.count(100)
+        for origin, destination in sorted(routes):
+            km = distance_km(self.airports[origin], self.airports[destination])
+            for _ in range(rng.randint(1, MAX_DAILY_SERVICES)):
+                airline = rng.choice(sorted(AIRLINES))
+                services[origin].setdefault(destination, []).append(Service(
+                    flight_number=f"{AIRLINES[airline]}{next(numbers)}",
+                    airline=airline,
+                    origin=origin,
+                    destination=destination,
+                    departure_minute=rng.randrange(6 * 60, 23 * 60, 5),
+                    duration_minutes=int(km / CRUISE_KMH * 60) + TAXI_MINUTES,
+                    base_price=BASE_FARE_USD + km * rng.uniform(*FARE_PER_KM)
+                ))
+
+        # Outgoing services grouped by destination, and the airports with a direct route into each airport
+        self.routes: Dict[str, Dict[str, Tuple[Service, ...]]] = {
+            code: {destination: tuple(group) for destination, group in by_destination.items()}
+            for code, by_destination in services.items()
+        }
+        inbound: Dict[str, set] = {code: set() for code in codes}
+        for origin, destination in routes:
+            inbound[destination].add(origin)
+        self.inbound: Dict[str, frozenset] = {code: frozenset(origins) for code, origins in inbound.items()}
+        # Distinct departure minutes of each airport's outbound services: an arrival's onward connections
+        # only depend on how many of them it is too late for
+        self.departure_minutes: Dict[str, Tuple[int, ...]] = {
+            code: tuple(sorted({service.departure_minute for group in self.routes[code].values() for service in group}))
+            for code in codes
+        }
+        self.hubs = tuple(hubs)
+        self.route_count = len(routes)
+
+    @classmethod
+    def from_catalog(cls, catalog, seed: int = SCHEDULE_SEED) -> "FlightSchedule":
+        return cls(catalog.tables["cities"], seed)
+
+    @staticmethod
+    def _fare(service: Service, date: datetime.date) -> float:
+        # Stable across runs and processes, unlike hash()
+        swing = zlib.crc32(f"{service.flight_number}:{date.toordinal()}".encode()) / 0xFFFFFFFF
+        return service.base_price * (DAY_FACTOR[0] + (DAY_FACTOR[1] - DAY_FACTOR[0]) * swing)
+
+    def _leg(self, service: Service, date: datetime.date) -> Leg:
+        departure = datetime.datetime.combine(date, datetime.time()) + datetime.timedelta(minutes=service.departure_minute)
+        return Leg(service, departure, departure + datetime.timedelta(minutes=service.duration_minutes), self._fare(service, date))
+
+    def _connection(self, service: Service, arrival: datetime.datetime) -> Leg:
+        """
+        The first departure of a daily service that leaves at least MIN_CONNECTION after arrival
+        """
+        ready = arrival + MIN_CONNECTION
+        leg = self._leg(service, ready.date())
+        return leg if leg.departure >= ready else self._leg(service, ready.date() + datetime.timedelta(days=1))
+
+    def search(self, origin: str, destination: str, start: datetime.date, end: datetime.date,
+               sort_by: str = "price", max_stops: int = 2, limit: int = 5) -> List[Itinerary]:
+        """
+        Find the best itineraries whose first flight leaves between start and end, with up to max_stops connections.
+
+        A best-first (A*) search over partial itineraries ordered by cost so far plus a lower bound on the
+        rest of the trip, so itineraries reach the destination in cost order and the search stops after limit
+        of them. Ties are broken by the legs' departures and flight numbers, so the order doesn't depend on limit.
+        It skips revisited airports, long detours and airports from which the destination is more stops away
+        than allowed. A partial itinerary is dropped when limit others, popped before it, reached the same
+        airport with as many legs, the same airports still open and the same onward connections (by price:
+        the same departures still catchable; by duration: the same arrival time). Each of its completions is
+        then the same completion of those at a cost no lower, so it can't be among the best limit itineraries.
+
+        Args:
+            origin (str): Departure airport code
+            destination (str): Arrival airport code
+            sort_by (str): "price" (total fare) or "duration" (first departure to last arrival)
+
+        Returns:
+            list: Up to limit itineraries, best first
+        """
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"sort_by must be one of {', '.join(SORT_KEYS)}")
+        if origin not in self.airports or destination not in self.airports or origin == destination:
+            return []
+
+        source, target = self.airports[origin], self.airports[destination]
+        max_km = distance_km(source, target) * MAX_DETOUR + DETOUR_SLACK_KM
+        by_price = sort_by == "price"
+
+        # reach[n]: airports that can get to the destination in at most n more legs
+        reach = [frozenset([destination])]
+        for _ in range(max_stops):
+            reach.append(reach[-1].union(*(self.inbound[code] for code in reach[-1])))
+
+        detour_km: Dict[str, float] = {}
+        to_target: Dict[str, float] = {}
+
+        def within_detour(code: str) -> bool:
+            if code not in detour_km:
+                city = self.airports[code]
+                to_target[code] = distance_km(city, target)
+                detour_km[code] = distance_km(source, city) + to_target[code]
+            return detour_km[code] <= max_km
+
+        def priority(legs: Tuple[Leg, ...], cost: float) -> float:
+            # Admissible bound on the rest of the trip: every route is at least as long as the great circle,
+            # flown no faster than CRUISE_KMH and priced no lower than this per km
+            km = to_target.get(legs[-1].service.destination, 0.0)
+            return cost + (km * FARE_PER_KM[0] * DAY_FACTOR[0] if by_price else km / CRUISE_KMH * 60)
+
+        def cost(legs: Tuple[Leg, ...], previous: float) -> float:
+            if by_price:
+                return previous + legs[-1].price
+            return (legs[-1].arrival - legs[0].departure).total_seconds() / 60
+
+        queue = []
+
+        def push(legs: Tuple[Leg, ...], previous: float = 0.0) -> None:
+            total = cost(legs, previous)
+            order = tuple((leg.departure, leg.service.flight_number) for leg in legs)
+            heapq.heappush(queue, (priority(legs, total), total, order, legs))
+
+        first_legs = [(next_airport, group) for next_airport, group in self.routes[origin].items()
+                      if next_airport in reach[max_stops] and within_detour(next_airport)]
+        for day in range((end - start).days + 1):
+            date = start + datetime.timedelta(days=day)
+            for _, group in first_legs:
+                for service in group:
+                    push((self._leg(service, date),))
+
+        results: List[Itinerary] = []
+        settled: Dict[Tuple[Any, ...], int] = {}
+        while queue and len(results) < limit:
+            _, total, _, legs = heapq.heappop(queue)
+            airport = legs[-1].service.destination
+
+            if airport == destination:
+                results.append(Itinerary(legs, sum(leg.price for leg in legs)))
+                continue
+
+            # Legs still allowed after the next one
+            remaining = max_stops - len(legs)
+            visited = {origin, *(leg.service.destination for leg in legs)}
+            arrival = legs[-1].arrival
+
+            if by_price:
+                # Fares are additive, so only the onward departures this arrival still makes matter
+                ready = arrival + MIN_CONNECTION
+                connections = (ready.date(), bisect.bisect_left(self.departure_minutes[airport], ready.hour * 60 + ready.minute))
+            else:
+                # The trip's duration runs from its first departure, which differs between prefixes; only
+                # prefixes arriving at the same moment are ordered the same way as their completions
+                connections = arrival
+            key = (airport, len(legs), connections, frozenset(visited) if remaining else None)
+            count = settled.get(key, 0)
+            if count >= limit:
+                continue
+            settled[key] = count + 1
+
+            for next_airport, group in self.routes[airport].items():
+                if next_airport in visited or next_airport not in reach[remaining] or not within_detour(next_airport):
+                    continue
+                for service in group:
+                    push(legs + (self._connection(service, arrival),), total)
+
+        return results
@@ -0,0 +1,157 @@
+import logging
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from tool_records import ToolOutput
+
+logger = logging.getLogger(__name__)
+
+class Formatted(NamedTuple):
+    """
+    One tool call's response section, and the records it was rendered from
+    """
+    markdown: str
+    data: Any
+
+class ToolFormatter(NamedTuple):
+    render: Callable[[Dict[str, Any], ToolOutput, Optional[Dict[str, Any]]], str]
+    # Shown instead of render's output when the tool found nothing; None for tools that always answer
+    empty: Optional[str]
+    # Shown if render fails
+    failure: str
+
+# Formatter of each tool, filled in by @formatter
+FORMATTERS: Dict[str, ToolFormatter] = {}
+
+UNHANDLED_TOOL = "⚠️ Sorry, I couldn't handle that request right now."
+
+def formatter(tool: str, empty: Optional[str] = None, failure: str = UNHANDLED_TOOL):
+    """
+    Register the decorated function as the formatter of a tool's results. It is called with the tool call,
+    the decoded ToolOutput and the conversation context, and returns the markdown section.
+    """
+    def register(render):
+        FORMATTERS[tool] = ToolFormatter(render, empty, failure)
+        return render
+    return register
+
+@lru_cache(maxsize=4096)
+def slug(name: str) -> str:
+    """
+    URL slug of a hotel, restaurant or attraction name for its mock booking link
+    """
+    return name.lower().replace(" ", "-").replace("'", "")
+
+def format_tool_result(tool_call: Dict[str, Any], output: ToolOutput, context: Optional[Dict[str, Any]] = None) -> Formatted:
+    """
+    Format the decoded output of one tool call as a user-facing response section
+    """
+    data = [item._asdict() for item in output.items] if output.text is None else output.text
+    tool_formatter = FORMATTERS.get(tool_call["tool"])
+    if tool_formatter is None:
+        logger.warning(f"Unhandled tool: {tool_call['tool']}")
+        return Formatted(UNHANDLED_TOOL, data)
+
+    if tool_formatter.empty is not None and not output.items:
+        return Formatted(tool_formatter.empty, data)
+    try:
+        return Formatted(tool_formatter.render(tool_call, output, context), data)
+    except Exception as e:
+        logger.error(f"Error formatting {tool_call['tool']} results: {e}")
+        return Formatted(tool_formatter.failure, data)
+
+@formatter("search_flights",
+           empty="I searched but couldn't find any flights matching your criteria. Would you like to try different dates or destinations?",
+           failure="⚠️ Sorry, I couldn't handle that flight request right now.")
+def format_flights(tool_call, output, context=None):
+    destination = tool_call["arguments"]["to_location"]
+    parts: List[str] = [f"✈️ I found these flights from {tool_call['arguments']['from_location']} to {destination}:\n\n"]
+    for flight in output.items:
+        booking_link = flight.mock_booking_link or f"https://mockflights.com/book/{slug(flight.airline)}"
+        parts += [
+            f"• {flight.airline}: ${flight.price_usd}\n",
+            f"  Departure: {flight.departure_date} {flight.departure_time} | Arrival: {flight.arrival or 'Not specified'}\n",
+            f"  Duration: {flight.duration}\n" if flight.duration else "",
+            f"  Stops: {flight.stops}\n",
+            f"  Airports: {flight.airports}\n" if flight.airports else "",
+            f"  🎫 Book flight now: {booking_link}\n\n"
+        ]
+    parts.append(f"Would you like me to help you find hotels in {destination}?")
+    return "".join(parts)
+
+@formatter("recommend_hotels",
+           empty="I searched but couldn't find any hotels matching your criteria. Would you like to try different hotels?")
+def format_hotels(tool_call, output, context=None):
+    location = tool_call["arguments"]["location"]
+    budget = tool_call["arguments"].get("budget", "medium")
+    parts: List[str] = [f"Here are some recommended hotels in {location} (Budget: {budget}):\n\n"]
+    for hotel in output.items:
+        parts += [
+            f"• {hotel.name} - ${hotel.price_per_night_usd} per night\n",
+            f"  Rating: {hotel.rating}/5.0 | Location: {hotel.location}\n",
+            "  Comfortable accommodation with excellent amenities.\n",
+            "  Amenities: Wi-Fi, Air conditioning, Breakfast\n",
+            f"  📱 Book now: https://mockhotels.com/book/{slug(hotel.name)}\n\n"
+        ]
+    parts.append("Would you like recommendations for attractions or restaurants in this area as well?")
+
+    # Follow up on a destination mentioned earlier in the conversation
+    if context and location in context.get("mentioned_destinations", ()):
+        parts.append(f"\nSince you mentioned {location}, would you like some attraction suggestions for it?")
+    return "".join(parts)
+
+@formatter("recommend_attractions",
+           empty="I searched but couldn't find any attractions matching your criteria. Would you like to try different attractions?",
+           failure="⚠️ Sorry, I couldn't process the attractions data right now. Please try again later.")
+def format_attractions(tool_call, output, context=None):
+    location = tool_call["arguments"]["location"]
+    parts: List[str] = [f"Here are the top attractions in {location} worth visiting:\n\n"]
+    for attraction in output.items:
+        parts += [
+            f"• {attraction.name} - Rating: 4.5/5.0\n",
+            f"  {attraction.description or 'Not specified'}\n",
+            "  Hours: 9:00 AM - 5:00 PM daily\n",
+            "  Price: $15-25 per person\n",
+            f"  🎟️ Get tickets: https://getyourguide.com/book/{slug(attraction.name)}\n\n"
+        ]
+    parts.append(f"Would you like restaurant recommendations in {location} as well?")
+    return "".join(parts)
+
+@formatter("recommend_restaurants",
+           empty="I searched but couldn't find any restaurants matching your criteria. Would you like to try different restaurants?",
+           failure="I found some restaurants, but I'm having trouble formatting the details.")
+def format_restaurants(tool_call, output, context=None):
+    location = tool_call["arguments"]["location"]
+    cuisine = tool_call["arguments"].get("cuisine", "any")
+    parts: List[str] = [f"Here are the top recommended restaurants in {location}",
+                        f" for {cuisine} cuisine" if cuisine != "any" else "", ":\n\n"]
+    for restaurant in output.items:
+        parts += [
+            f"• {restaurant.name} - {restaurant.cuisine or 'Not specified'} cuisine\n",
+            f"  Rating: {restaurant.rating}/5.0 \n",
+            "  Popular local restaurant with great reviews.\n",
+            f"  Next free table tonight: {restaurant.next_free_table}\n" if restaurant.next_free_table else "",
+            f"  📞 Make a reservation: https://opentable.com/book/{slug(restaurant.name)}\n\n"
+        ]
+    parts.append(f"Are you looking for any specific type of dining experience in {location}?")
+    return "".join(parts)
+
+@formatter("transport_options",
+           empty="I couldn't find any transport options for that route. Would you like to try different locations?",
+           failure="I found some transport options, but I'm having trouble formatting the details.")
+def format_transport(tool_call, output, context=None):
+    parts: List[str] = [
+        f"Here are transportation options from {tool_call['arguments']['from_location']} to {tool_call['arguments']['to_location']}:\n\n"
+    ]
+    parts += [f"• By {option.mode}: {option.duration} journey time - ${option.price_usd}\n" for option in output.items]
+    parts.append("\nWould you like me to search flights or hotels for this trip?")
+    return "".join(parts)
+
+@formatter("seasonal_travel_advice",
+           failure="I have some seasonal travel information, but I'm having trouble formatting it properly.")
+def format_seasonal_advice(tool_call, output, context=None):
+    return "".join([
+        f"📅 Seasonal Travel Advice for {tool_call['arguments']['destination']}:\n\n",
+        f"{output.text}\n\n",
+        "Would you like information about attractions or hotels in this destination?"
+    ])
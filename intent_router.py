@@ -0,0 +1,332 @@
+import os
+import re
+import datetime
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import extractors
+
+logger = logging.getLogger(__name__)
+
+# Minimum confidence for a local routing decision; below it the query goes to the LLM
+DEFAULT_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.75"))
+
+# Default origin used by the tool-selection prompt when none is known
+DEFAULT_ORIGIN = "New York"
+
+# Keyword phrases that signal each tool, with their weights. Longer, more specific phrases weigh more.
+TOOL_KEYWORDS: Dict[str, Dict[str, float]] = {
+    "search_flights": {
+        "flight": 1.0, "flights": 1.0, "fly": 1.0, "flying": 1.0, "airfare": 1.0,
+        "airline": 1.0, "airlines": 1.0, "plane ticket": 1.0, "plane tickets": 1.0
+    },
+    "recommend_hotels": {
+        "hotel": 1.0, "hotels": 1.0, "hostel": 1.0, "hostels": 1.0, "accommodation": 1.0,
+        "accommodations": 1.0, "place to stay": 1.5, "places to stay": 1.5, "where to stay": 1.5,
+        "resort": 1.0, "resorts": 1.0, "lodging": 1.0
+    },
+    "recommend_attractions": {
+        "attraction": 1.0, "attractions": 1.0, "things to do": 1.5, "what to do": 1.5,
+        "sightseeing": 1.0, "sights": 1.0, "museum": 1.0, "museums": 1.0, "landmarks": 1.0,
+        "must-see": 1.0, "must see": 1.0, "what to see": 1.5, "places to visit": 1.5
+    },
+    "recommend_restaurants": {
+        "restaurant": 1.0, "restaurants": 1.0, "where to eat": 1.5, "eat": 0.5, "food": 1.0,
+        "dining": 1.0, "dinner": 1.0, "lunch": 1.0, "cuisine": 1.0
+    },
+    "transport_options": {
+        "transport": 1.0, "transportation": 1.0, "get around": 1.5, "getting around": 1.5,
+        "bus": 1.0, "train": 1.0, "car rental": 1.0, "drive": 0.5, "get from": 1.0
+    },
+    "seasonal_travel_advice": {
+        "best time": 1.5, "when to visit": 1.5, "when to go": 1.5, "weather": 1.0,
+        "season": 1.0, "seasons": 1.0, "climate": 1.0
+    }
+}
+
+CUISINES = [
+    "italian", "japanese", "chinese", "indian", "french", "mexican", "thai", "greek",
+    "spanish", "turkish", "lebanese", "korean", "vietnamese", "american", "vegetarian", "vegan"
+]
+
+# Keyword score at which a tool counts as explicitly asked for, so several such tools make a compound query
+INTENT_MIN_SCORE = 1.0
+
+# Confidence multipliers applied when an argument is not stated in the query itself
+FROM_CONTEXT_FACTOR = 0.9
+DEFAULTED_FACTOR = 0.8
+
+# Questions asking how or whether rather than for options ("how do I get to my hotel", "is it safe to eat
+# street food"): a tool keyword in them is weak evidence that the tool is wanted
+_ADVICE_QUESTION_PATTERN = re.compile(
+    r"^\W*(?:how\s+(?:do|can|should|would)\s+(?:i|we)|is\s+it|are\s+(?:they|there|these)|should\s+(?:i|we)|"
+    r"do\s+(?:i|we)\s+need|why)\b",
+    re.IGNORECASE
+)
+ADVICE_QUESTION_FACTOR = 0.5
+
+# Tools whose first argument is an origin, defaulted when neither the query nor the context names one
+ROUTE_TOOLS = ("search_flights", "transport_options")
+
+_TOOL_PATTERNS = {
+    tool: [(re.compile(r'\b' + re.escape(phrase) + r'\b', re.IGNORECASE), weight) for phrase, weight in keywords.items()]
+    for tool, keywords in TOOL_KEYWORDS.items()
+}
+_FROM_TO_PATTERN = re.compile(r'from\s+([A-Za-z\s]+?)\s+to\s+([A-Za-z\s]+)', re.IGNORECASE)
+_PRECEDING_WORD_PATTERN = re.compile(r'\b(from|to|in|for)\s+$', re.IGNORECASE)
+_CUISINE_PATTERN = re.compile(r'\b(' + '|'.join(CUISINES) + r')\b', re.IGNORECASE)
+# "show more", "more hotels please", "next page", "any other options?"
+_MORE_PATTERN = re.compile(
+    r'^\s*(?:please\s+)?(?:(?:show|see|give|get|load|list)\s+(?:me\s+|us\s+)?)?(?:some\s+|a\s+few\s+)?more\b'
+    r'|\bnext\s+page\b|\b(?:more|other)\s+(?:results|options)\b',
+    re.IGNORECASE
+)
+# Longer queries are new questions even if they contain "more"
+MORE_REQUEST_MAX_WORDS = 6
+
+class IntentRouter:
+    def __init__(self, threshold: float = DEFAULT_CONFIDENCE_THRESHOLD):
+        """
+        Rule- and keyword-based router that picks tools and fills in their arguments without an LLM call.
+        Emits a list of the same {"tool": ..., "arguments": ...} structures as the LLM, each with a confidence score.
+        """
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._stats = {"total": 0, "routed": 0, "fallback": 0, "by_tool": {}}
+
+    def classify(self, query: str, context: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Return the best local tool call for the query with its confidence, or None if no tool matches
+        """
+        scores = self._score_tools(query)
+        if not scores:
+            return None
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        tool, best = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+
+        # A clear winner gives full intent confidence; competing tools and advice questions lower it
+        intent_confidence = (best - runner_up) / best * self._question_factor(query)
+
+        arguments, argument_confidence = self._build_arguments(tool, query, context or {})
+        if arguments is None:
+            return None
+
+        return {
+            "tool": tool,
+            "arguments": arguments,
+            "confidence": round(intent_confidence * argument_confidence, 3)
+        }
+
+    def classify_all(self, query: str, context: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Return every tool call the query asks for, in TOOL_KEYWORDS order.
+        A query naming several tools explicitly ("flights, a hotel and things to do") gets one call per tool;
+        anything else gets the single best call from classify, or an empty list.
+        Each call's confidence is scored as in classify: its lead over the tools left out of the plan, lowered for
+        advice questions, times its argument confidence. A route with a defaulted origin is penalized once more, as its destination is then
+        most likely the place the plan's other intents are about ("the weather in Paris ... the train station").
+        """
+        scores = self._score_tools(query)
+        intents = [tool for tool in TOOL_KEYWORDS if scores.get(tool, 0.0) >= INTENT_MIN_SCORE]
+
+        if len(intents) < 2:
+            tool_call = self.classify(query, context)
+            return [tool_call] if tool_call else []
+
+        context = context or {}
+        outside = max((score for tool, score in scores.items() if tool not in intents), default=0.0)
+        tool_calls = []
+        for tool in intents:
+            arguments, argument_confidence = self._build_arguments(tool, query, context)
+            if arguments is None:
+                # A compound plan is only routed locally if every part of it can be
+                return []
+
+            intent_confidence = (scores[tool] - outside) / scores[tool] * self._question_factor(query)
+            if tool in ROUTE_TOOLS and self._origin_defaulted(query, context):
+                intent_confidence *= DEFAULTED_FACTOR
+            tool_calls.append({"tool": tool, "arguments": arguments, "confidence": round(intent_confidence * argument_confidence, 3)})
+        return tool_calls
+
+    def route(self, query: str, context: Optional[Dict[str, Any]] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return the local tool calls if every one clears the confidence threshold, otherwise None so the caller asks the LLM.
+        Records routing hit rates.
+        """
+        tool_calls = self.classify_all(query, context)
+        routed = bool(tool_calls) and all(tool_call["confidence"] >= self.threshold for tool_call in tool_calls)
+
+        with self._lock:
+            self._stats["total"] += 1
+            if routed:
+                self._stats["routed"] += 1
+                by_tool = self._stats["by_tool"]
+                for tool_call in tool_calls:
+                    by_tool[tool_call["tool"]] = by_tool.get(tool_call["tool"], 0) + 1
+            else:
+                self._stats["fallback"] += 1
+
+        if routed:
+            logger.info(f"Routed locally to {', '.join(tool_call['tool'] for tool_call in tool_calls)} "
+                        f"(confidence {min(tool_call['confidence'] for tool_call in tool_calls)})")
+            return tool_calls
+
+        confidence = min(tool_call["confidence"] for tool_call in tool_calls) if tool_calls else 0.0
+        logger.info(f"Local routing confidence {confidence} below {self.threshold}, falling back to LLM")
+        return None
+
+    def match_more_request(self, query: str) -> Optional[List[str]]:
+        """
+        Recognize a request for the next page of the previous answer's results.
+        Returns the tools it names ("more hotels"), an empty list for all of them ("show more"),
+        or None if the query is not such a request, e.g. because it names a destination.
+        """
+        if len(query.split()) > MORE_REQUEST_MAX_WORDS or not _MORE_PATTERN.search(query):
+            return None
+        if extractors.find_destinations(query):
+            return None
+        return list(self._score_tools(query))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return routing counters and the local hit rate
+        """
+        with self._lock:
+            stats = {
+                "total": self._stats["total"],
+                "routed": self._stats["routed"],
+                "fallback": self._stats["fallback"],
+                "by_tool": dict(self._stats["by_tool"])
+            }
+
+        stats["hit_rate"] = stats["routed"] / stats["total"] if stats["total"] else 0.0
+        return stats
+
+    def _score_tools(self, query: str) -> Dict[str, float]:
+        scores = {}
+        for tool, patterns in _TOOL_PATTERNS.items():
+            score = sum(weight for pattern, weight in patterns if pattern.search(query))
+            if score:
+                scores[tool] = score
+        return scores
+
+    def _build_arguments(self, tool: str, query: str, context: Dict[str, Any]) -> Tuple[Optional[Dict[str, str]], float]:
+        """
+        Fill in the tool arguments from the query, then the context, then defaults.
+        Returns the arguments (None if a required one cannot be found) and their confidence factor.
+        """
+        current_trip = context.get("current_trip") or {}
+        origin, destination = self._extract_route(query)
+        destinations = extractors.extract_destinations(query)
+        location = destination or (destinations[0] if len(destinations) == 1 else None)
+        confidence = 1.0
+
+        if tool in ("search_flights", "transport_options"):
+            if not destination:
+                return None, 0.0
+
+            if not origin:
+                origin = current_trip.get("origin") or context.get("location")
+                confidence *= FROM_CONTEXT_FACTOR if origin else DEFAULTED_FACTOR
+                origin = origin or DEFAULT_ORIGIN
+
+            arguments = {"from_location": origin, "to_location": destination}
+            if tool == "search_flights":
+                date_range, date_confidence = self._resolve_date_range(query, current_trip)
+                arguments["date_range"] = date_range
+                confidence *= date_confidence
+            return arguments, confidence
+
+        if not location:
+            location = current_trip.get("destination")
+            if not location:
+                return None, 0.0
+            confidence *= FROM_CONTEXT_FACTOR
+
+        if tool == "recommend_hotels":
+            budget = extractors.extract_budget(query)
+            if not budget:
+                budget = current_trip.get("budget")
+                confidence *= FROM_CONTEXT_FACTOR if budget else DEFAULTED_FACTOR
+            return {"location": location, "budget": budget or "medium"}, confidence
+
+        if tool == "recommend_restaurants":
+            cuisine = _CUISINE_PATTERN.search(query)
+            return {"location": location, "cuisine": cuisine.group(1).lower() if cuisine else "any"}, confidence
+
+        if tool == "seasonal_travel_advice":
+            return {"destination": location}, confidence
+
+        return {"location": location}, confidence
+
+    def _question_factor(self, query: str) -> float:
+        return ADVICE_QUESTION_FACTOR if _ADVICE_QUESTION_PATTERN.search(query) else 1.0
+
+    def _origin_defaulted(self, query: str, context: Dict[str, Any]) -> bool:
+        """
+        Whether a route's origin would fall back to DEFAULT_ORIGIN: not in the query and not in the context
+        """
+        origin, _ = self._extract_route(query)
+        return not (origin or (context.get("current_trip") or {}).get("origin") or context.get("location"))
+
+    def _extract_route(self, query: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Find origin and destination in "from X to Y", or from the words before each place name
+        """
+        destinations = extractors.extract_destinations(query)
+        if not destinations:
+            return None, None
+
+        from_to = _FROM_TO_PATTERN.search(query)
+        if from_to:
+            origin_text = from_to.group(1).lower()
+            dest_text = from_to.group(2).lower()
+            origin = next((d for d in destinations if d.lower() in origin_text), None)
+            destination = next((d for d in destinations if d.lower() in dest_text), None)
+            return origin, destination
+
+        # Otherwise look at the word before each place: "from London ... to Rome", "hotels in Rome"
+        origin = destination = None
+        for name, start, _ in extractors.find_destinations(query):
+            preceding = _PRECEDING_WORD_PATTERN.search(query, 0, start)
+            if not preceding:
+                continue
+            if preceding.group(1).lower() == "from":
+                origin = origin or name
+            elif destination is None and name != origin:
+                destination = name
+
+        if len(destinations) > 1 and not (origin and destination):
+            # Several places without a clear direction
+            return None, None
+        return origin, destination
+
+    def _resolve_date_range(self, query: str, current_trip: Dict[str, Any]) -> Tuple[str, float]:
+        """
+        Use a date range from the query or context, otherwise a week starting next month
+        """
+        date_ranges = extractors.extract_date_ranges(query)
+        if date_ranges:
+            return str(date_ranges[0]), 1.0
+
+        context_range = current_trip.get("date_range")
+        if context_range:
+            parsed = extractors.parse_date_range(context_range)
+            if parsed:
+                return str(parsed), FROM_CONTEXT_FACTOR
+
+        next_month = datetime.date.today() + datetime.timedelta(days=30)
+        end = next_month + datetime.timedelta(days=7)
+        return f"{next_month.isoformat()} to {end.isoformat()}", DEFAULTED_FACTOR
+
+# Shared router used by the MCP client
+router = IntentRouter()
+
+def get_routing_stats() -> Dict[str, Any]:
+    """
+    Return the shared router's hit-rate counters
+    """
+    return router.get_stats()
@@ -0,0 +1,119 @@
+import os
+import logging
+import threading
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from async_runtime import run_on_loop, register_shutdown
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+
+# Process-wide client. It lives on the background event loop so its keep-alive connections are reused.
+_client: Optional[AsyncOpenAI] = None
+_client_lock = threading.Lock()
+
+def _build_client() -> AsyncOpenAI:
+    """
+    Build the shared AsyncOpenAI client from environment settings.
+    OPENAI_BASE_URL lets tests and benchmarks point it at a local fake endpoint.
+    """
+    timeout = float(os.getenv("OPENAI_TIMEOUT", "30"))
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "20")),
+        max_keepalive_connections=int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "10")),
+        keepalive_expiry=float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+    )
+
+    return AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        base_url=os.getenv("OPENAI_BASE_URL") or None,
+        timeout=httpx.Timeout(timeout, connect=min(5.0, timeout)),
+        # The SDK retries connection errors, 429s and 5xx responses with exponential backoff
+        max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "3")),
+        http_client=DefaultAsyncHttpxClient(limits=limits)
+    )
+
+def get_openai_client() -> AsyncOpenAI:
+    """
+    Return the shared AsyncOpenAI client, creating it on first use
+    """
+    global _client
+
+    with _client_lock:
+        if _client is None:
+            _client = _build_client()
+            logger.info("Created shared OpenAI client")
+
+    return _client
+
+async def close_openai_client() -> None:
+    """
+    Close the shared client and its connection pool. The next call creates a new one.
+    """
+    global _client
+
+    with _client_lock:
+        client, _client = _client, None
+
+    if client is not None:
+        await run_on_loop(client.close())
+
+# Registered once: the client may be closed and recreated many times, and closing is a no-op without one
+register_shutdown(close_openai_client)
+
+async def _chat_completion(messages: List[Dict[str, str]], **params: Any) -> str:
+    client = get_openai_client()
+    response = await client.chat.completions.create(
+        model=params.pop("model", os.getenv("OPENAI_MODEL", DEFAULT_MODEL)),
+        messages=messages,
+        **params
+    )
+    return response.choices[0].message.content
+
+async def chat_completion(messages: List[Dict[str, str]], **params: Any) -> str:
+    """
+    Run a chat completion on the shared client and return the message content.
+    Can be awaited from any event loop.
+    """
+    return await run_on_loop(_chat_completion(messages, **params))
+
+async def _tool_completion(messages: List[Dict[str, str]], tools: List[Dict[str, Any]], **params: Any) -> Tuple[Optional[str], List[Tuple[str, str]]]:
+    client = get_openai_client()
+    response = await client.chat.completions.create(
+        model=params.pop("model", os.getenv("OPENAI_MODEL", DEFAULT_MODEL)),
+        messages=messages,
+        tools=tools,
+        tool_choice="auto",
+        **params
+    )
+    message = response.choices[0].message
+    return message.content, [(call.function.name, call.function.arguments) for call in message.tool_calls or []]
+
+async def tool_completion(messages: List[Dict[str, str]], tools: List[Dict[str, Any]], **params: Any) -> Tuple[Optional[str], List[Tuple[str, str]]]:
+    """
+    Run a chat completion that may call the given OpenAI tool definitions.
+    Returns the text content and the (name, JSON arguments string) of each tool call the model made.
+    Can be awaited from any event loop.
+    """
+    return await run_on_loop(_tool_completion(messages, tools, **params))
+
+async def stream_chat_completion(messages: List[Dict[str, str]], **params: Any) -> AsyncIterator[str]:
+    """
+    Run a streamed chat completion on the shared client and yield content deltas as they arrive.
+    Must be iterated on the background loop, where the shared client lives.
+    """
+    client = get_openai_client()
+    stream = await client.chat.completions.create(
+        model=params.pop("model", os.getenv("OPENAI_MODEL", DEFAULT_MODEL)),
+        messages=messages,
+        stream=True,
+        **params
+    )
+
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
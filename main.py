@@ -1,11 +1,22 @@
+import os
 import streamlit as st
 from dotenv import load_dotenv
-from mcp_client import run_async
+from mcp_client import run_async, run_async_stream
 from context_manager import ContextManager
+from conversation_history import ConversationHistory
+from chat_view import render_chat, reset_chat
+import tracing
 
 # Load environment variables
 load_dotenv()
 
+# Render responses token by token as they are generated
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "true").lower() in ("1", "true", "yes")
+
+# Expose per-stage latency histograms on http://127.0.0.1:<METRICS_PORT>/metrics
+if os.getenv("METRICS_PORT"):
+    tracing.start_metrics_server(int(os.getenv("METRICS_PORT")))
+
 # Set page configuration with wider layout
 st.set_page_config(
     page_title="Jetzy",
@@ -121,6 +132,9 @@ if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
 if 'showing_welcome' not in st.session_state:
     st.session_state.showing_welcome = True
+# Token-bounded window of recent turns plus a running summary, sent with every LLM call
+if 'conversation_history' not in st.session_state:
+    st.session_state.conversation_history = ConversationHistory()
 
 # Sidebar content
 with st.sidebar:
@@ -165,8 +179,11 @@ with st.sidebar:
         if st.button("Clear Travel Context"):
             context_manager.clear_context()
             st.session_state.chat_history = []
+            st.session_state.conversation_history.clear()
+            reset_chat()
             # You might also want to reset the welcome message
             st.session_state.showing_welcome = True
+            context_manager.save()
             st.rerun()
 
     st.markdown("---")
@@ -266,36 +283,54 @@ with col2:
             st.session_state.chat_history.append({"role": "user", "content": user_query})
             st.session_state.showing_welcome = False
             
-            # Update context with the current query 
-            context_manager.update_context_from_text(user_query)
-            
-            # Record the search query in context
-            context_manager.add_search(user_query)
+            # Update context with the current query and record the search, as one change
+            with context_manager.batch():
+                context_manager.update_context_from_text(user_query)
+                context_manager.add_search(user_query)
             
+            # Tie the logs and tracing spans of this query together
+            request_id = tracing.new_request_id()
+
+            # The MCP client records the tool calls that answered the query in this copy of the context
+            turn_context = context_manager.to_dict()
+            turn_context["history"] = st.session_state.conversation_history.messages()
+
             # Show a spinner while processing
             with st.spinner("Planning your perfect trip..."):
-                # Pass the context to the MCP client
-                response = run_async(user_query, context_manager.to_dict())
+                if STREAM_RESPONSES:
+                    # Render the response progressively; the chat history below shows the final message.
+                    # Assistant text, if it is a context source, is scanned chunk by chunk as it streams.
+                    stream_placeholder = st.empty()
+                    with stream_placeholder.container():
+                        response = st.write_stream(context_manager.extract_stream(run_async_stream(user_query, turn_context, request_id)))
+                    stream_placeholder.empty()
+                else:
+                    # Pass the context to the MCP client
+                    response = run_async(user_query, turn_context, request_id)
             
             # Add assistant response to chat history
             assistant_message = {"role": "assistant", "content": response}
             st.session_state.chat_history.append(assistant_message)
+            st.session_state.conversation_history.add("user", user_query)
+            st.session_state.conversation_history.add("assistant", response)
             
-            # Update the context based on the assistant's response
-            context_manager.update_context(assistant_message)
+            # Update the context from the tool calls that answered the query, and from the response
+            # itself only when assistant text is a source (CONTEXT_EXTRACT_FROM)
+            with context_manager.batch():
+                context_manager.update_from_tool_calls(turn_context.get("tool_calls", []))
+                if not STREAM_RESPONSES:
+                    context_manager.update_context(assistant_message)
 
     # Display chat history
     if not st.session_state.showing_welcome or (submit_button and user_query):
-        st.markdown("<div class='chat-container'>", unsafe_allow_html=True)
-        for message in st.session_state.chat_history:
-            if message["role"] == "user":
-                st.markdown(f"<div class='user-message'>{message['content']}</div>", unsafe_allow_html=True)
-            else:
-                st.markdown(f"<div class='assistant-message'>{message['content']}</div>", unsafe_allow_html=True)
-        st.markdown("</div>", unsafe_allow_html=True)
+        # Only the latest messages, rendered once each; older ones are paged in on request
+        render_chat(st.session_state.chat_history)
 
 # Add footer
 st.markdown("<div class='footer'>Jetzy • Powered by advanced AI technology</div>", unsafe_allow_html=True)
 
+# One write to the context store per script run, whatever changed during it
+context_manager.save()
+
 if __name__ == "__main__":
     pass
\ No newline at end of file
@@ -1,10 +1,24 @@
 import os
+import re
 import json
+import time
 import asyncio
+import queue
 import datetime
-from openai import OpenAI
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+import concurrent.futures
+from mcp import StdioServerParameters
+from session_pool import get_session_pool
+from llm import chat_completion, stream_chat_completion, tool_completion
+import tracing
+import tool_records
+from async_runtime import submit
+from intent_router import router
+from tool_cache import tool_cache
+from page_tracker import page_tracker
+from formatters import format_tool_result
+from response_cache import response_cache
+from prompts import build_tool_selection_prompt, count_tokens
+from tool_schemas import to_openai_tools, validate_arguments
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -14,527 +28,608 @@ logger = logging.getLogger(__name__)
 
 server_params = StdioServerParameters(command="python", args=["mcp_server.py"])
 
-def llm_client(message: str, context=None):
+# Seconds a Streamlit script run waits for a query before giving up
+QUERY_TIMEOUT = float(os.getenv("QUERY_TIMEOUT", "120"))
+
+# Seconds a single tool call may take before its section is replaced with a notice
+TOOL_TIMEOUT = float(os.getenv("TOOL_CALL_TIMEOUT", "20"))
+
+# Appended to a section when its tool has another page of results
+MORE_RESULTS_HINT = 'Say "show more" to see more options.'
+
+# Let the model pick tools through native function calling; set to false for endpoints without tool support,
+# which then get the JSON-in-text prompt
+NATIVE_TOOL_CALLING = os.getenv("LLM_NATIVE_TOOLS", "true").lower() in ("1", "true", "yes")
+
+# Sampling parameters shared by the buffered and streamed LLM calls
+LLM_PARAMS = {
+    "temperature": 0.7,
+    "max_tokens": 1000,
+    "top_p": 0.9,
+    "frequency_penalty": 0.2,
+    "presence_penalty": 0.3
+}
+
+# Instructions that follow the user details in every system message
+SYSTEM_GUIDELINES = (
+    "\nWhen sharing travel information, write in a natural, conversational style. Include: \n - Common departure airports for the origin city \n - Typical price ranges and popular airlines for this route \n - If specific flight data is available, highlight the best deals with exact dates and prices \n - YOU MUST INCLUDE BOOKING LINKS FOR EACH FLIGHT OPTION, HOTEL OPTION, ACCOMMODATION OPTION AND RESTAURANT OPTION MENTIONED IN YOUR RESPONSE \n - For flights: use mockup links like https://mockflights.com/book/airline-name \n - For hotels: use mockup links like https://mockhotels.com/book/hotel-name \n - For attractions: use links to TripAdvisor, GetYourGuide, or Viator \n - For restaurants: use links to TripAdvisor, OpenTable, or Yelp \n - Always offer to help with related travel needs (hotels, attractions, etc.)"
+    # Provide realistic data even for partial queries
+    "\n\nIMPORTANT: When the user provides incomplete information (like just a destination without origin or dates), don't just ask for more information. Instead, provide helpful general information about typical flights to that destination including:\n- Common departure cities (New York, London, etc.)\n- Typical price ranges (e.g., '$600-900 roundtrip')\n- Popular airlines for this route\n- Example deals like 'There's a flight on Norwegian leaving New York 18th April to Athens, and back on 30th April for $403'\n- ALWAYS include realistic pricing data and specific flight examples\n- ALWAYS include clickable booking links for EACH flight option mentioned\n\nFormat your response as if you're a helpful travel agent having a conversation, not just listing data. Do not say you are an AI or language model. Just sound like a real assistant."
+    # Emphasize that booking links are absolutely required
+    "\n\nCRITICAL: Your response MUST include booking links for ALL options mentioned. If you don't include these links, the system will ignore your response and use a different method instead."
+)
+
+def build_system_message(context=None):
+    """
+    Build the system message, including user context for better personalization.
+    Without a context the result is the same on every call.
+    """
+    # Create system message with context awareness
+    system_message = "You are a knowledgeable travel assistant with expertise in flight information. "
+
+    if context:
+        # Add contextual information if available
+        system_message += "Here's information about the user I want you to use to personalize your response:\n"
+
+        if context.get("location"):
+            system_message += f"- Their current location seems to be {context['location']}\n"
+
+        # Add current trip information
+        current_trip = context.get("current_trip", {})
+        if current_trip.get("origin") and current_trip.get("destination"):
+            system_message += f"- They are planning a trip from {current_trip['origin']} to {current_trip['destination']}\n"
+
+            if current_trip.get("date_range"):
+                system_message += f"- Their travel dates are: {current_trip['date_range']}\n"
+
+            if current_trip.get("budget"):
+                system_message += f"- Their budget level is: {current_trip['budget']}\n"
+
+        # Add mentioned destinations
+        mentioned = context.get("mentioned_destinations", [])
+        if mentioned:
+            system_message += f"- Destinations mentioned in conversation: {', '.join(mentioned[:5])}\n"
+
+        # Add recent searches for context
+        recent = context.get("recent_searches", [])
+        if recent:
+            system_message += f"- Their recent searches include: {recent[0]}\n"
+
+    system_message += SYSTEM_GUIDELINES
+
+    return system_message
+
+def build_messages(system_message, message, context=None):
+    """
+    Chat messages for one LLM call: the system message, the conversation history carried in the context
+    (a running summary and the recent turns), then the new message
+    """
+    history = context.get("history") or [] if context else []
+    return [{"role": "system", "content": system_message}, *history, {"role": "user", "content": message}]
+
+def history_tokens(context=None):
+    return sum(count_tokens(turn["content"]) for turn in context.get("history") or []) if context else 0
+
+async def llm_client(message: str, context=None, cache_text=None, system_message=None):
         """
         Send a message to the LLM and return the response.
-        Includes user context for better personalization.
+        Includes user context for better personalization, unless an explicit system_message is given.
+        Repeated and near-duplicate questions are answered from the response cache;
+        cache_text is the variable part of the message (the user's question) used for fuzzy matching.
         """
         try:
-            logger.info("Sending request to OpenAI API")
+            cached = response_cache.get(message, context, cache_text)
+            if cached is not None:
+                return cached
 
-            # Initialize the OpenAI client
-            openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-            
-            # Create system message with context awareness
-            system_message = "You are a knowledgeable travel assistant with expertise in flight information. "
-            
-            if context:
-                # Add contextual information if available
-                system_message += "Here's information about the user I want you to use to personalize your response:\n"
-                
-                if context.get("location"):
-                    system_message += f"- Their current location seems to be {context['location']}\n"
-                
-                # Add current trip information
-                current_trip = context.get("current_trip", {})
-                if current_trip.get("origin") and current_trip.get("destination"):
-                    system_message += f"- They are planning a trip from {current_trip['origin']} to {current_trip['destination']}\n"
-                    
-                    if current_trip.get("date_range"):
-                        system_message += f"- Their travel dates are: {current_trip['date_range']}\n"
-                    
-                    if current_trip.get("budget"):
-                        system_message += f"- Their budget level is: {current_trip['budget']}\n"
-                
-                # Add mentioned destinations
-                mentioned = context.get("mentioned_destinations", [])
-                if mentioned:
-                    system_message += f"- Destinations mentioned in conversation: {', '.join(mentioned[:5])}\n"
-                
-                # Add recent searches for context
-                recent = context.get("recent_searches", [])
-                if recent:
-                    system_message += f"- Their recent searches include: {recent[0]}\n"
-            
-            system_message += "\nWhen sharing travel information, write in a natural, conversational style. Include: \n - Common departure airports for the origin city \n - Typical price ranges and popular airlines for this route \n - If specific flight data is available, highlight the best deals with exact dates and prices \n - YOU MUST INCLUDE BOOKING LINKS FOR EACH FLIGHT OPTION, HOTEL OPTION, ACCOMMODATION OPTION AND RESTAURANT OPTION MENTIONED IN YOUR RESPONSE \n - For flights: use mockup links like https://mockflights.com/book/airline-name \n - For hotels: use mockup links like https://mockhotels.com/book/hotel-name \n - For attractions: use links to TripAdvisor, GetYourGuide, or Viator \n - For restaurants: use links to TripAdvisor, OpenTable, or Yelp \n - Always offer to help with related travel needs (hotels, attractions, etc.)"
-            
-            # NEW: Add instruction for providing realistic data even for partial queries
-            system_message += "\n\nIMPORTANT: When the user provides incomplete information (like just a destination without origin or dates), don't just ask for more information. Instead, provide helpful general information about typical flights to that destination including:\n- Common departure cities (New York, London, etc.)\n- Typical price ranges (e.g., '$600-900 roundtrip')\n- Popular airlines for this route\n- Example deals like 'There's a flight on Norwegian leaving New York 18th April to Athens, and back on 30th April for $403'\n- ALWAYS include realistic pricing data and specific flight examples\n- ALWAYS include clickable booking links for EACH flight option mentioned\n\nFormat your response as if you're a helpful travel agent having a conversation, not just listing data. Do not say you are an AI or language model. Just sound like a real assistant."
-            
-            # CRITICAL: emphasize that booking links are absolutely required
-            system_message += "\n\nCRITICAL: Your response MUST include booking links for ALL options mentioned. If you don't include these links, the system will ignore your response and use a different method instead."
-            
-            # Send the message to the LLM
-            response = openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": message}
-                ],
-                temperature=0.7,
-                max_tokens=1000,
-                top_p=0.9,
-                frequency_penalty=0.2,
-                presence_penalty=0.3
-            )
-            
-            # Extract and return the response content
-            content = response.choices[0].message.content 
+            system_message = system_message or build_system_message(context)
+            input_tokens = count_tokens(system_message) + count_tokens(message) + history_tokens(context)
+            logger.info(f"Sending request to OpenAI API ({input_tokens} input tokens)")
+
+            # Send the message to the LLM over the shared connection pool
+            with tracing.span("llm", input_tokens=input_tokens):
+                content = await chat_completion(
+                    messages=build_messages(system_message, message, context),
+                    **LLM_PARAMS
+                )
 
             logger.info(f"Received response from LLM: {content[:100]}...")  
 
+            response_cache.set(message, content, context, cache_text)
+
             return content
         except Exception as e:
             logger.error(f"Error in LLM client: {e}")
             return f"Error communicating with AI service: {str(e)}"
 
+async def llm_select_tools(message: str, tools, context=None, cache_text=None, system_message=None):
+    """
+    Ask the LLM to pick tools for the message through native function calling.
+    Returns the text content and a list of {"tool": ..., "arguments": ...} calls.
+    Calls whose arguments are not a JSON object are dropped and counted as malformed.
+    Selections are cached like llm_client responses.
+    """
+    cached = response_cache.get(message, context, cache_text)
+    if cached is not None:
+        selection = json.loads(cached)
+        return selection["content"], selection["tool_calls"]
+
+    system_message = system_message or build_system_message(context)
+    input_tokens = count_tokens(system_message) + count_tokens(message) + count_tokens(json.dumps(tools)) + history_tokens(context)
+    logger.info(f"Sending tool-selection request to OpenAI API ({input_tokens} input tokens)")
+
+    with tracing.span("llm", input_tokens=input_tokens, native_tools=True):
+        content, raw_calls = await tool_completion(
+            messages=build_messages(system_message, message, context),
+            tools=tools,
+            **LLM_PARAMS
+        )
+
+    tool_calls = []
+    malformed = 0
+    for name, arguments in raw_calls:
+        try:
+            arguments = json.loads(arguments or "{}")
+        except json.JSONDecodeError:
+            arguments = None
+        if not isinstance(arguments, dict):
+            logger.warning(f"Malformed arguments for tool {name}: {str(arguments)[:100]}")
+            malformed += 1
+            continue
+        tool_calls.append({"tool": name, "arguments": arguments})
+
+    if malformed:
+        tracing.tool_selection_outcomes.inc("malformed")
+    else:
+        tracing.tool_selection_outcomes.inc("tool_call" if tool_calls else "direct_answer")
+        response_cache.set(message, json.dumps({"content": content, "tool_calls": tool_calls}), context, cache_text)
+
+    return content, tool_calls
+
+async def llm_client_stream(message: str, context=None, cache_text=None):
+    """
+    Streaming version of llm_client. Yields response deltas as the model produces them.
+    Logs time to first token separately from the total completion time.
+    """
+    stream_span = None
+    try:
+        cached = response_cache.get(message, context, cache_text)
+        if cached is not None:
+            for chunk in chunk_text(cached):
+                yield chunk
+            return
+
+        system_message = build_system_message(context)
+        input_tokens = count_tokens(system_message) + count_tokens(message) + history_tokens(context)
+        logger.info(f"Sending streaming request to OpenAI API ({input_tokens} input tokens)")
+        start = time.perf_counter()
+        deltas = []
+        # Not a with block: the generator yields while the span is open
+        stream_span = tracing.start_span("llm.stream", input_tokens=input_tokens)
+
+        async for delta in stream_chat_completion(
+            messages=build_messages(system_message, message, context),
+            **LLM_PARAMS
+        ):
+            if not deltas:
+                ttft = time.perf_counter() - start
+                stream_span.set_attribute("ttft_ms", round(ttft * 1000, 1))
+                logger.info(f"LLM time to first token: {ttft * 1000:.0f} ms")
+            deltas.append(delta)
+            yield delta
+
+        stream_span.end()
+        content = "".join(deltas)
+        logger.info(f"LLM streamed response in {(time.perf_counter() - start) * 1000:.0f} ms: {content[:100]}...")
+
+        response_cache.set(message, content, context, cache_text)
+    except Exception as e:
+        if stream_span is not None:
+            stream_span.end(error=e)
+        logger.error(f"Error in streaming LLM client: {e}")
+        yield f"Error communicating with AI service: {str(e)}"
+
 def get_prompt_to_identify_tool_and_arguments(query, tools, context=None):
-    tools_description = "\n".join([f"- {tool.name}: {tool.description}" for tool in tools])
-    
-    # Initial prompt
-    prompt = "You are a travel expert assistant with a focus on providing detailed, actionable information. You have access to these tools:\n\n"
-    prompt += f"{tools_description}\n\n"
-    
-    # Add context information if available
-    if context:
-        prompt += "### USER CONTEXT INFO ###\n"
-        
-        # Add location if available for better defaults
-        if context.get("location"):
-            prompt += f"- User's current location: {context['location']}\n"
-        
-        # Add current trip information
-        current_trip = context.get("current_trip", {})
-        if current_trip.get("origin") and current_trip.get("destination"):
-            prompt += f"- Current trip: {current_trip['origin']} to {current_trip['destination']}\n"
-            
-            if current_trip.get("date_range"):
-                prompt += f"- Travel dates: {current_trip['date_range']}\n"
-            
-            if current_trip.get("budget"):
-                prompt += f"- Budget level: {current_trip['budget']}\n"
-        
-        # Add destinations mentioned in conversation
-        mentioned = context.get("mentioned_destinations", [])
-        if mentioned:
-            prompt += f"- Destinations discussed: {', '.join(mentioned[:5])}\n"
-        
-        prompt += "### END CONTEXT INFO ###\n\n"
-
-    # IMPROVED: Guide for comprehensive response with booking links
-    prompt += "RESPONSE GUIDELINES:\n"
-    prompt += "1. CRITICAL: EVERY recommendation you provide MUST include booking/reservation links or ticket purchase options.\n"
-    prompt += "2. For ALL queries about flights, hotels, attractions, restaurants, or transport, use the appropriate tool.\n"
-    prompt += "3. For vague queries, use context to fill in missing details rather than asking for more information.\n"
-    prompt += "4. Your tool selection should match what the user is looking for, even if they don't explicitly mention the exact tool name.\n"
-    prompt += "5. Provide comprehensive details for each option including pricing, ratings, and specific descriptive details.\n\n"
-
-    # Specific guidance for each tool type
-    prompt += "DETAILED TOOL USAGE INSTRUCTIONS:\n"
-    prompt += "- For flight queries: Include origin, destination, flexible dates if specific ones aren't given.\n"
-    prompt += "- For hotel queries: Always include specific hotel names, prices, ratings, descriptions and booking links.\n"
-    prompt += "- For attraction queries: Include details about opening hours, ticket prices, and online booking options.\n"
-    prompt += "- For restaurant queries: Include cuisine type, price range, ratings, and reservation links.\n"
-    prompt += "- For transport options: Include duration, prices, and booking options for each transport mode.\n\n"
-
-    # Tool selection criteria
-    prompt += "TOOL SELECTION CRITERIA:\n"
-    prompt += "- Flight queries (e.g., 'flights to Paris', 'how to get to Greece') → Use search_flights\n"
-    prompt += "- Hotel queries (e.g., 'places to stay in Rome', 'hotels in Tokyo') → Use recommend_hotels\n"
-    prompt += "- Attraction queries (e.g., 'things to do in Barcelona', 'visit museums in London') → Use recommend_attractions\n"
-    prompt += "- Food queries (e.g., 'where to eat in Seoul', 'best restaurants in New York') → Use recommend_restaurants\n"
-    prompt += "- Transportation queries (e.g., 'how to get around Amsterdam', 'transport in Berlin') → Use transport_options\n"
-    prompt += "- Seasonal advice queries (e.g., 'best time to visit Thailand', 'weather in Mexico') → Use seasonal_travel_advice\n\n"
-
-    # Missing information handling
-    prompt += "HANDLING MISSING INFORMATION:\n"
-    prompt += "- If origin location is missing: Use user's current location from context, or default to 'New York'\n"
-    prompt += "- If dates are missing: Create reasonable dates for next month (e.g., 15-22 days from now)\n"
-    prompt += "- If budget is missing: Default to 'medium' budget level\n"
-    prompt += "- IMPORTANT: Always make an intelligent guess for missing information rather than skipping the tool call\n\n"
-    
-    # Continue with the rest of the prompt
-    prompt += f"User's Question: {query}\n\n"
-    prompt += "IMPORTANT: When you need to use a tool, you must ONLY respond with "
-    prompt += "the exact JSON object format below, nothing else:\n"
-    prompt += "{\n"
-    prompt += '    "tool": "tool-name",\n'
-    prompt += '    "arguments": {\n'
-    prompt += '        "argument-name": "value"\n'
-    prompt += "    }\n"
-    prompt += "}\n\n"
-    prompt += "Format requirements:\n"
-    prompt += "- For dates, use YYYY-MM-DD format\n"
-    prompt += "- City names should be full names (e.g., 'New York' not 'NY')\n"
-    prompt += "- For date ranges, use the format 'YYYY-MM-DD to YYYY-MM-DD'\n"
-    prompt += "- Use information from the user context when the user query is vague or refers to previous conversation\n"
-    prompt += "- If dates are missing and not in context, CREATE reasonable dates for next month instead of skipping the tool call\n"
-    prompt += "- If origin is missing, use the user's location from context or 'New York' as a default rather than skipping the tool call"
-    
+    """
+    Build the tool-selection prompt for the query, within the input token budget
+    """
+    reserved_tokens = count_tokens(build_system_message()) + history_tokens(context)
+    prompt, _ = build_tool_selection_prompt(query, tools, context, reserved_tokens=reserved_tokens)
     return prompt
     
+def decode_tool_result(tool, result):
+    """
+    Decode a tool's MCP result once into a ToolOutput of typed records. Uses the structured content
+    when the server sends it, and otherwise parses the text content, which FastMCP splits into one
+    item per element when a tool returns a list.
+    """
+    structured = getattr(result, "structuredContent", None)
+    if structured is not None:
+        return tool_records.decode(tool, structured)
+
+    texts = [item.text for item in result.content if getattr(item, "type", None) == "text"]
+    try:
+        data = [json.loads(text) for text in texts]
+    except json.JSONDecodeError:
+        return tool_records.decode(tool, "\n".join(texts))
+    return tool_records.decode(tool, data[0] if len(data) == 1 else data)
+
+def conversation_id(context=None):
+    return context.get("conversation_id") if context else None
+
+def looks_like_tool_call(llm_response):
+    """
+    Whether a response that failed to parse was meant to be tool-call JSON rather than a direct answer
+    """
+    text = llm_response.strip()
+    return text.startswith(("{", "[", "```")) or '"tool"' in text
+
+def get_tool_selection_stats():
+    """
+    Return LLM tool-selection outcome counters with the malformed-output and invalid-argument rates
+    """
+    stats = tracing.tool_selection_outcomes.snapshot()
+    requests = sum(stats.get(outcome, 0) for outcome in ("tool_call", "direct_answer", "malformed"))
+    stats["requests"] = requests
+    stats["malformed_rate"] = stats.get("malformed", 0) / requests if requests else 0.0
+    stats["invalid_argument_rate"] = stats.get("invalid_arguments", 0) / requests if requests else 0.0
+    return stats
+
+def parse_tool_calls(llm_response):
+    """
+    Parse the LLM's tool selection into a list of tool calls.
+    Returns None if the response is a direct answer rather than a tool call.
+    """
+    try:
+        parsed = json.loads(llm_response)
+    except json.JSONDecodeError:
+        return None
+
+    tool_calls = parsed if isinstance(parsed, list) else [parsed]
+    if not tool_calls or not all(isinstance(tool_call, dict) and "tool" in tool_call for tool_call in tool_calls):
+        return None
+
+    for tool_call in tool_calls:
+        tool_call.setdefault("arguments", {})
+    return tool_calls
+
+async def run_tool_call(session, tool_call, context=None):
+    """
+    Call one tool and format its result. A timeout or failure becomes a short notice
+    so the other sections of a compound answer are still shown.
+
+    Returns:
+        tuple: The formatted section and the cursor of the result's next page, if it has one
+    """
+    tool = tool_call["tool"]
+
+    try:
+        with tracing.span("tool", tool=tool):
+            result = await asyncio.wait_for(tool_cache.call_tool(session, tool, tool_call["arguments"]), timeout=TOOL_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.error(f"Tool {tool} timed out after {TOOL_TIMEOUT}s")
+        return f"⚠️ Sorry, {tool.replace('_', ' ')} took too long to respond.", None
+    except Exception as e:
+        logger.error(f"Tool {tool} failed: {e}")
+        return f"⚠️ Sorry, I couldn't get results from {tool.replace('_', ' ')} right now.", None
+
+    with tracing.span("format", tool=tool):
+        output = decode_tool_result(tool, result)
+        if output.error:
+            return f"⚠️ Sorry, I couldn't use {tool.replace('_', ' ')} with those details: {output.error}", None
+
+        section = format_tool_result(tool_call, output, context).markdown
+        if output.next_cursor:
+            section += f"\n\n{MORE_RESULTS_HINT}"
+        return section, output.next_cursor
+
 async def run_tool_query(query: str, context=None):
     try:
-        async with stdio_client(server_params) as (read, write):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                
-                # Get the list of available tools
-                tools = await session.list_tools()
-                
-                prompt = get_prompt_to_identify_tool_and_arguments(query, tools.tools, context)
-                llm_response = llm_client(prompt, context)
-                
-                try:
-                    # Check if response is valid JSON
-                    tool_call = json.loads(llm_response)
-                    
-                    if not isinstance(tool_call, dict) or "tool" not in tool_call:
-                        # This is a direct response, not a tool call
-                        return llm_response
-                    
-                    available_tool_names = [tool.name for tool in tools.tools]
-                    
-                    if tool_call["tool"] not in available_tool_names:
-                        return f"I don't have access to the tool needed for this query. Here's what I understand about your request: {query}"
-                    
-                    result = await session.call_tool(tool_call["tool"], arguments=tool_call["arguments"])
-                    
-                    # Get tool_data content
-                    tool_data = result.content[0].text
-                    
-                    # Format response based on the tool type
-                    if tool_call["tool"] == "search_flights":
-                        try:
-                            flights_data = json.loads(tool_data)
-        
-                            # Validate the response format
-                            if not flights_data:
-                                return "I searched but couldn't find any flights matching your criteria. Would you like to try different dates or destinations?"
-                            
-                            # Convert to list if a single flight was returned
-                            if isinstance(flights_data, dict):
-                                flights = [flights_data]  # Single flight object
-                            elif isinstance(flights_data, list):
-                                flights = flights_data    # Multiple flights
-                            else:
-                                logger.warning(f"Unexpected flight data type: {type(flights_data)}")
-                                return "I couldn't process the flight search results. Would you like general information about this route instead?"
-                            
-                            # Origin and destination for the response
-                            origin = tool_call['arguments']['from_location']
-                            destination = tool_call['arguments']['to_location']
-                            response = f"✈️ I found these flights from {origin} to {destination}:\n\n"
-                            
-                            for flight in flights:
-                                # Ensure required fields exist
-                                required_fields = ['airline', 'price_usd', 'departure_date', 'return_date']
-                                for field in required_fields:
-                                    if field not in flight:
-                                        flight[field] = "Not specified"
-                                
-                                # Generate booking link if not provided
-                                if 'mock_booking_link' not in flight:
-                                    airline_slug = flight['airline'].lower().replace(' ', '-').replace("'", "")
-                                    flight['mock_booking_link'] = f"https://mockflights.com/book/{airline_slug}"
-                                
-                                # Format the flight information with rich details
-                                response += f"• {flight['airline']}: ${flight['price_usd']}\n"
-                                response += f"  Departure: {flight['departure_date']} | Return: {flight['return_date']}\n"
-                                
-                                # Add optional details if available
-                                if 'duration' in flight:
-                                    response += f"  Duration: {flight['duration']}\n"
-                                if 'stops' in flight:
-                                    response += f"  Stops: {flight['stops']}\n"
-                                if 'airports' in flight:
-                                    response += f"  Airports: {flight['airports']}\n"
-                                
-                                # Add booking link with emoji
-                                response += f"  🎫 Book flight now: {flight['mock_booking_link']}\n\n"
-                            
-                            # Add contextual follow-up suggestion
-                            response += f"Would you like me to help you find hotels in {destination}?"
-
-                            return response
-                        except json.JSONDecodeError:
-                            logger.error("Failed to parse flight data JSON")
-                            return "⚠️ Sorry, I received invalid data from the flight search. Would you like to try again?"
-                        except Exception as e:
-                            logger.error(f"Error processing flight data: {e}")
-                            return "⚠️ Sorry, I couldn't handle that flight request right now."
-                    elif tool_call["tool"] == "recommend_hotels":
-                        try:
-                            hotels_data = json.loads(tool_data)
-
-                            if not hotels_data:
-                                return "I searched but couldn't find any hotels matching your criteria. Would you like to try different hotels?"
-                            
-                            if isinstance(hotels_data, dict):
-                                hotels = [hotels_data]  # Single flight object
-                            elif isinstance(restaurants_data, list):
-                                hotels = hotels_data    # Multiple flights
-                            else:
-                                logger.warning(f"Unexpected Hotel data type: {type(hotels_data)}")
-                                return "I couldn't process the hotel search results."
-
-                            # budget = tool_call['arguments'].get('budget', 'medium')
-                            # Enhance the response format with rich details and booking links
-                            budget = tool_call['arguments'].get('budget', 'medium')
-                            response = f"Here are some recommended hotels in {tool_call['arguments']['location']} (Budget: {budget}):\n\n"
-
-                            for hotel in hotels:
-                                required_fields = ['name', 'location', 'price_per_night_usd']
-                                for field in required_fields:
-                                    if field not in hotel:
-                                        hotel[field] = "Not specified"
-
-                                 # Generate a booking link
-                                hotel_slug = hotel['name'].lower().replace(' ', '-').replace("'", "")
-                                booking_link = f"https://mockhotels.com/book/{hotel_slug}"
-                                
-                                # Build rich response with detailed information
-                                response += f"• {hotel['name']} - ${hotel['price_per_night_usd']} per night\n"
-                                response += f"  Rating: {hotel['rating']}/5.0 | Location: {hotel.get('area', hotel['location'])}\n"
-                                response += f"  {hotel.get('description', 'Comfortable accommodation with excellent amenities.')}\n"
-                                response += f"  Amenities: {', '.join(hotel.get('amenities', ['Wi-Fi', 'Air conditioning', 'Breakfast']))}\n"
-                                response += f"  📱 Book now: {booking_link}\n\n"
-
-                               # Add contextually relevant follow-up suggestion
-                            response += "Would you like recommendations for attractions or restaurants in this area as well?"
-                                                
-                            # Add contextual follow-up question based on previous conversation
-                            if context and "mentioned_destinations" in context:
-                                if tool_call['arguments']['location'] in context["mentioned_destinations"]:
-                                    response += f"\nSince you mentioned {tool_call['arguments']['location']}, would you like some attraction suggestions for it?"
-                            
-                            return response
-                        except:
-                            return "⚠️ Sorry, I couldn't handle that request right now."
-                    elif tool_call["tool"] == "recommend_attractions":
-                        try:
-                            attractions_data = json.loads(tool_data)
-
-                            if not attractions_data:
-                                return "I searched but couldn't find any attractions matching your criteria. Would you like to try different attractionss?"
-                            
-                            if isinstance(attractions_data, dict):
-                                attractions = [attractions_data]  # Single attraction object
-                            elif isinstance(attractions_data, list):
-                                attractions = attractions_data    # Multiple attractions
-                            else:
-                                logger.warning(f"Unexpected attraction data type: {type(attractions_data)}")
-                                return "I couldn't process the attractions search results."
-                            
-                            location = tool_call['arguments']['location']
-                            response = f"Here are the top attractions in {location} worth visiting:\n\n"
-
-                            for attraction in attractions:
-                                required_fields = ['name', 'location', 'description']
-                                for field in required_fields:
-                                    if field not in attraction:
-                                        attraction[field] = "Not specified"
-
-                            
-                                # Generate booking links
-                                attraction_slug = attraction['name'].lower().replace(' ', '-').replace("'", "")
-                                ticket_link = f"https://getyourguide.com/book/{attraction_slug}"
-                                
-                                # Build rich response
-                                response += f"• {attraction['name']} - Rating: {attraction.get('rating', '4.5')}/5.0\n"
-                                response += f"  {attraction['description']}\n"
-                                response += f"  Hours: {attraction.get('hours', '9:00 AM - 5:00 PM daily')}\n"
-                                response += f"  Price: {attraction.get('price', '$15-25 per person')}\n"
-                                response += f"  🎟️ Get tickets: {ticket_link}\n\n"
-                                                                        
-                            # Add contextually relevant follow-up suggestion
-                            response += f"Would you like restaurant recommendations in {location} as well?"
-                            return response
-                        except Exception as e:
-                            logger.error(f"Error processing attractions data: {e}")
-                            return "⚠️ Sorry, I couldn't process the attractions data right now. Please try again later."
-                    elif tool_call["tool"] == "recommend_restaurants":
-                        try:
-                            restaurants_data = json.loads(tool_data)
-
-                            if not restaurants_data:
-                                return "I searched but couldn't find any restaurants matching your criteria. Would you like to try different restaurants?"
-
-                        
-                            if isinstance(restaurants_data, dict):
-                                restaurants = [restaurants_data]  # Single restaurant object
-                            elif isinstance(restaurants_data, list):
-                                restaurants = restaurants_data    # Multiple restaurants
-                            else:
-                                logger.warning(f"Unexpected restaurant data type: {type(restaurants_data)}")
-                                return "I couldn't process the restaurant search results."
-                            
-                            location = tool_call['arguments']['location']
-                            cuisine = tool_call['arguments'].get('cuisine', 'any')
-
-                            # Create rich response with booking links
-                            response = f"Here are the top recommended restaurants in {location}"
-                            if cuisine != 'any':
-                                response += f" for {cuisine} cuisine"
-                            response += ":\n\n"
-        
-                            
-                            for restaurant in restaurants:
-                                required_fields = ['name', 'location', 'cuisine']
-                                for field in required_fields:
-                                    if field not in restaurant:
-                                        restaurant[field] = "Not specified"
-                            
-                            # Generate booking link
-                                restaurant_slug = restaurant['name'].lower().replace(' ', '-').replace("'", "")
-                                booking_link = f"https://opentable.com/book/{restaurant_slug}"
-                                
-                                # Build rich response
-                                response += f"• {restaurant['name']} - {restaurant['cuisine']} cuisine\n"
-                                response += f"  Rating: {restaurant['rating']}/5.0 \n"
-                                response += f"  {restaurant.get('description', 'Popular local restaurant with great reviews.')}\n"
-                                response += f"  Known for: {restaurant.get('signature_dish', 'Local specialties')}\n"
-                                response += f"  📞 Make a reservation: {booking_link}\n\n"
-
-                            response += f"Are you looking for any specific type of dining experience in {location}?"
-                                            
-                            return response
-                        except json.JSONDecodeError as e:
-                            logger.error(f"JSON decode error for restaurant data: {e}, data: {tool_data[:100]}")
-                            return "I received invalid data from the restaurant search."
-                        except Exception as e:
-                            logger.error(f"Error parsing restaurant data: {e}")
-                            return f"I found some restaurants, but I'm having trouble formatting the details."
-                        # except Exception as e:
-                        #     logger.error(f"Error parsing restaurant data: {e}")
-                        #     return f"I found some restaurants, but I'm having trouble formatting the details. Here's the raw information: {tool_data}"
-                    
-                    elif tool_call["tool"] == "transport_options":
-                        try:
-                            options_data = json.loads(tool_data)
-
-                            if isinstance(options_data, dict):
-                                options = [options_data]  # Single transport object
-                            elif isinstance(options_data, list):
-                                options = options_data    # Multiple transports
-                            else:
-                                logger.warning(f"Unexpected flight data type: {type(options_data)}")
-                                return "I couldn't process the flight search results. Would you like general information about this route instead?"
-                            
-                            for option in options:
-                                required_fields = ['from_location', 'to_location']
-                                for field in required_fields:
-                                    if field not in option:
-                                        option[field] = "Not specified"
-                            
-                            response = f"Here are transportation options from {tool_call['arguments']['from_location']} to {tool_call['arguments']['to_location']}:\n\n"
-
-                            # for mode, details in options.items():
-                            #     response += f"• By {mode}: {details['duration']} journey time - ${details['price_usd']}\n"
-                            
-                            return response
-                        except Exception as e:
-                            logger.error(f"Error parsing transport data: {e}")
-                            return f"I found some transport options, but I'm having trouble formatting the details. Here's the raw information: {tool_data}"
-                        
-                    elif tool_call["tool"] == "seasonal_travel_advice":
-                        try:
-                            # This tool returns a plain string, not JSON
-                            advice = tool_data
-                            destination = tool_call['arguments']['destination']
-                            
-                            response = f"📅 Seasonal Travel Advice for {destination}:\n\n"
-                            response += f"{advice}\n\n"
-                            response += "Would you like information about attractions or hotels in this destination?"
-                            
-                            return response
-                        except Exception as e:
-                            logger.error(f"Error formatting seasonal advice: {e}")
-                            return f"I have some seasonal travel information, but I'm having trouble formatting it properly. Here's what I know: {tool_data}"
-                                            
-                    else:
-                        # For other tools, return the raw response
-                        logger.warning(f"Unhandled tool: {tool_call['tool']}")
-                        return "⚠️ Sorry, I couldn't handle that request right now."
-                    
-                except json.JSONDecodeError:
-                    # If we can't parse JSON, the LLM gave a direct response
+        pool = await get_session_pool(server_params)
+        # Routing, prompting and the LLM round trip use the cached tool list; a session is only
+        # checked out around the tool calls, so slow LLM calls don't hold server processes
+        tools = await pool.list_tools()
+
+        # "Show more" fetches the next page of the previous answer's results
+        more_tools = router.match_more_request(query)
+        tool_calls = page_tracker.next_calls(conversation_id(context), more_tools) if more_tools is not None else None
+        paging = bool(tool_calls)
+
+        # Otherwise try the local intent router first and only ask the LLM when it is not confident
+        if not paging:
+            with tracing.span("router") as route_span:
+                tool_calls = router.route(query, context)
+                route_span.set_attribute("routed", tool_calls is not None)
+
+        if tool_calls is None:
+            with tracing.span("prompt") as prompt_span:
+                # The prompt carries the user context, so the system message doesn't repeat it
+                system_message = build_system_message()
+                functions = to_openai_tools(tools.tools) if NATIVE_TOOL_CALLING else None
+                # The history goes out with the prompt, so it counts against the same budget
+                reserved_tokens = count_tokens(system_message) + (count_tokens(json.dumps(functions)) if functions else 0) \
+                    + history_tokens(context)
+                prompt, prompt_tokens = build_tool_selection_prompt(
+                    query, tools.tools, context, reserved_tokens=reserved_tokens, native_tools=NATIVE_TOOL_CALLING
+                )
+                prompt_span.set_attribute("prompt_tokens", prompt_tokens)
+
+            if NATIVE_TOOL_CALLING:
+                content, tool_calls = await llm_select_tools(prompt, functions, context, cache_text=query, system_message=system_message)
+                if not tool_calls:
+                    # A direct response, not a tool call
+                    return content or "Sorry, I couldn't work out how to help with that. Could you rephrase your question?"
+            else:
+                llm_response = await llm_client(prompt, context, cache_text=query, system_message=system_message)
+
+                tool_calls = parse_tool_calls(llm_response)
+                if tool_calls is None:
+                    malformed = looks_like_tool_call(llm_response)
+                    tracing.tool_selection_outcomes.inc("malformed" if malformed else "direct_answer")
+                    if malformed:
+                        logger.warning(f"Malformed tool-selection output: {llm_response[:100]}")
+                    # This is a direct response, not a tool call
                     return llm_response
-                except Exception as e:
-                    return f"I encountered an error while processing your request: {str(e)}. Let me help you directly instead."
+                tracing.tool_selection_outcomes.inc("tool_call")
+        
+        try:
+            tools_by_name = {tool.name: tool for tool in tools.tools}
+
+            # Drop tools we don't have and repeated calls, keeping the order they were asked for
+            unique_calls = {}
+            for tool_call in tool_calls:
+                if tool_call["tool"] not in tools_by_name:
+                    logger.warning(f"Skipping unknown tool: {tool_call['tool']}")
+                    continue
+                unique_calls.setdefault(json.dumps([tool_call["tool"], tool_call["arguments"]], sort_keys=True), tool_call)
+            tool_calls = list(unique_calls.values())
+
+            if not tool_calls:
+                return f"I don't have access to the tool needed for this query. Here's what I understand about your request: {query}"
+
+            # Check the arguments against each tool's input schema before calling anything
+            errors = [validate_arguments(tools_by_name[tool_call["tool"]], tool_call["arguments"]) for tool_call in tool_calls]
+            for tool_call, error in zip(tool_calls, errors):
+                if error:
+                    logger.warning(f"Invalid arguments for {tool_call['tool']}: {error}")
+                    tracing.tool_selection_outcomes.inc("invalid_arguments")
+            
+            # Run every valid tool at once so a compound query takes as long as its slowest tool.
+            # Calls share one checked-out session, which multiplexes requests to the server.
+            valid_calls = [tool_call for tool_call, error in zip(tool_calls, errors) if not error]
+            if context is not None:
+                # Lets the caller update its context from the structured arguments rather than the answer's prose
+                context["tool_calls"] = valid_calls
+            async with pool.session() as session:
+                pages = await asyncio.gather(*(run_tool_call(session, tool_call, context) for tool_call in valid_calls))
+            page_tracker.remember(conversation_id(context), [
+                (tool_call, next_cursor) for tool_call, (_, next_cursor) in zip(valid_calls, pages)
+            ], replace=not paging)
+
+            sections = iter(section for section, _ in pages)
+            return "\n\n".join(
+                f"⚠️ Sorry, I couldn't use {tool_call['tool'].replace('_', ' ')} with those details ({error})." if error else next(sections)
+                for tool_call, error in zip(tool_calls, errors)
+            )
+        except Exception as e:
+            return f"I encountered an error while processing your request: {str(e)}. Let me help you directly instead."
     except Exception as e:
         return f"I couldn't connect to my travel tools right now. Error: {str(e)}. Please try again later."
 
-def run_async(query, context=None):
+def get_simple_flight_queries(query, context=None):
+    """
+    Check if we have a very basic flight query with just a destination.
+    If so, return an enhanced LLM query and a synthetic tool query to fall back on, otherwise None.
     """
-    Run the asyncio event loop to process the query.
+    words = query.lower().split()
+
+    # Default location to use if none available in context
+    default_origin = "New York"
+
+    # Check if this is a simple destination query that might be handled by LLM
+    if not (len(words) <= 7 and 
+        ("flight" in query.lower() or "fly" in query.lower()) and 
+        "to " in query.lower() and 
+        "from " not in query.lower()):
+        return None
+
+    origin = default_origin
+
+    # Use contextual origin if available
+    if context and context.get("current_trip", {}).get("origin"):
+        origin = context["current_trip"]["origin"]
+    elif context and context.get("location"):
+        origin = context["location"]
+        
+    enhanced_query = f"Tell me about flights from {origin} to {query.lower().split('to ')[1].strip()}. Provide specific examples with dates and prices. IMPORTANT: You MUST include booking links for each flight option mentioned."
+
+    # Extract destination for the tool call
+    destination = query.lower().split("to ")[1].strip()
+
+    # Create date range for next month (example)
+    today = datetime.datetime.now()
+    next_month = today + datetime.timedelta(days=30)
+    date_start = next_month.strftime("%Y-%m-%d")
+    date_end = (next_month + datetime.timedelta(days=7)).strftime("%Y-%m-%d")
+    date_range = f"{date_start} to {date_end}"
+    
+    # Construct a synthetic query for the tool workflow
+    tool_query = f"Find flights from {origin} to {destination} from {date_range}"
+
+    return enhanced_query, tool_query
+
+def has_booking_links(response):
+    """
+    Check if an LLM response contains booking links
+    """
+    return "http" in response and ("book" in response.lower() or "booking" in response.lower())
+
+def chunk_text(text, size=40):
+    """
+    Split already formatted text into chunks on whitespace boundaries so it can be streamed
+    """
+    chunk = ""
+    for piece in re.findall(r'\S+\s*|\s+', text):
+        chunk += piece
+        if len(chunk) >= size:
+            yield chunk
+            chunk = ""
+    if chunk:
+        yield chunk
+
+async def process_query(query, context=None, request_id=None):
+    """
+    Process the query, awaiting the LLM and tool calls without blocking the event loop.
     Returns a string response suitable for displaying to the user.
     
     Args:
         query (str): The user's query
         context (dict, optional): User context for personalized responses
+        request_id (str, optional): ID attached to every tracing span of this request
     """
-    try:
-        # Check if we have a very basic query with just a destination. If so, enhance it with some information to get a better response
-        words = query.lower().split()
+    with tracing.request(request_id, name="query", query_chars=len(query)):
+        try:
+            simple_flight_queries = get_simple_flight_queries(query, context)
+            if simple_flight_queries:
+                enhanced_query, tool_query = simple_flight_queries
 
-        # Default location to use if none available in context
-        default_origin = "New York"
+                # Try the LLM first
+                llm_response = await llm_client(enhanced_query, context)
 
-        # Check if this is a simple destination query that might be handled by LLM
-        if (len(words) <= 7 and 
-            ("flight" in query.lower() or "fly" in query.lower()) and 
-            "to " in query.lower() and 
-            "from " not in query.lower()):
-            
-            origin = default_origin
-
-            # Use contextual origin if available
-            if context and context.get("current_trip", {}).get("origin"):
-                origin = context["current_trip"]["origin"]
-            elif context and context.get("location"):
-                origin = context["location"]
-                
-            enhanced_query = f"Tell me about flights from {origin} to {query.lower().split('to ')[1].strip()}. Provide specific examples with dates and prices. IMPORTANT: You MUST include booking links for each flight option mentioned."
-
-            # Try the LLM first
-            llm_response = llm_client(enhanced_query, context)
-            
-            # Check if response contains booking links
-            if "http" in llm_response and ("book" in llm_response.lower() or "booking" in llm_response.lower()):
-                logger.info("LLM provided response with booking links")
-                return llm_response
-            else:
-                # LLM didn't include required booking links, fall back to tool
-                logger.info("LLM response missing booking links, falling back to tool workflow")
-
-                # Extract destination for the tool call
-                destination = query.lower().split("to ")[1].strip()
-
-                # Create date range for next month (example)
-                today = datetime.datetime.now()
-                next_month = today + datetime.timedelta(days=30)
-                date_start = next_month.strftime("%Y-%m-%d")
-                date_end = (next_month + datetime.timedelta(days=7)).strftime("%Y-%m-%d")
-                date_range = f"{date_start} to {date_end}"
-                
-                # Construct a synthetic query for the tool workflow
-                tool_query = f"Find flights from {origin} to {destination} from {date_range}"
-                result = asyncio.run(run_tool_query(tool_query, context))
-
-                if isinstance(result, dict) and "result" in result:
-                    return result["result"]
-                return result
-        
-        # For all other queries, proceed with normal tool selection flow
-        result = asyncio.run(run_tool_query(query, context))
-        logger.info(f"Final result type: {type(result)}")
-        logger.info(f"Final result preview: {str(result)[:100]}")
+                # Check if response contains booking links
+                if has_booking_links(llm_response):
+                    logger.info("LLM provided response with booking links")
+                    return llm_response
+                else:
+                    # LLM didn't include required booking links, fall back to tool
+                    logger.info("LLM response missing booking links, falling back to tool workflow")
+                    result = await run_tool_query(tool_query, context)
+
+                    if isinstance(result, dict) and "result" in result:
+                        return result["result"]
+                    return result
+
+            # For all other queries, proceed with normal tool selection flow
+            result = await run_tool_query(query, context)
+            logger.info(f"Final result type: {type(result)}")
+            logger.info(f"Final result preview: {str(result)[:100]}")
+
+            return result
+        except Exception as e:
+            logger.error(f"Error in process_query: {e}")
+            return f"Sorry, I encountered an error while processing your request: {str(e)}"
 
-        return result
+async def process_query_stream(query, context=None, request_id=None):
+    """
+    Streaming version of process_query. Yields the response in chunks as soon as they are available:
+    LLM answers token by token, tool-formatted responses in small pieces.
+    """
+    with tracing.request(request_id, name="query", query_chars=len(query)):
+        try:
+            simple_flight_queries = get_simple_flight_queries(query, context)
+            if simple_flight_queries:
+                enhanced_query, tool_query = simple_flight_queries
+
+                # Stream the LLM answer first
+                streamed = []
+                async for delta in llm_client_stream(enhanced_query, context):
+                    streamed.append(delta)
+                    yield delta
+
+                if has_booking_links("".join(streamed)):
+                    logger.info("LLM provided response with booking links")
+                    return
+
+                # The answer is already on screen, so append bookable tool results instead of replacing it
+                logger.info("LLM response missing booking links, appending tool results")
+                result = await run_tool_query(tool_query, context)
+                yield "\n\n"
+                for chunk in chunk_text(str(result)):
+                    yield chunk
+                return
+
+            # For all other queries, proceed with normal tool selection flow
+            result = await run_tool_query(query, context)
+            for chunk in chunk_text(str(result)):
+                yield chunk
+        except Exception as e:
+            logger.error(f"Error in process_query_stream: {e}")
+            yield f"Sorry, I encountered an error while processing your request: {str(e)}"
+
+def submit_query(query, context=None, request_id=None):
+    """
+    Submit the query to the shared background event loop.
+    Returns a concurrent future resolving to the response string.
+    """
+    return submit(process_query(query, context, request_id))
+
+def run_async(query, context=None, request_id=None):
+    """
+    Process the query on the shared background event loop and wait for the result.
+    Pooled MCP sessions and HTTP connections on that loop are reused across reruns and browser sessions.
+    Returns a string response suitable for displaying to the user.
+    
+    Args:
+        query (str): The user's query
+        context (dict, optional): User context for personalized responses
+        request_id (str, optional): ID attached to every tracing span of this request
+    """
+    request_id = request_id or tracing.new_request_id()
+    future = submit_query(query, context, request_id)
+    try:
+        return future.result(timeout=QUERY_TIMEOUT)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        logger.error(f"Query {request_id} timed out after {QUERY_TIMEOUT}s")
+        return "Sorry, that took too long to answer. Please try again."
     except Exception as e:
         logger.error(f"Error in run_async: {e}")
         return f"Sorry, I encountered an error while processing your request: {str(e)}"
 
+def run_async_stream(query, context=None, request_id=None):
+    """
+    Process the query on the shared background event loop and yield the response in chunks as they arrive.
+    Suitable for st.write_stream. Time to first chunk and total time are logged separately.
+    
+    Args:
+        query (str): The user's query
+        context (dict, optional): User context for personalized responses
+        request_id (str, optional): ID attached to every tracing span of this request
+    """
+    request_id = request_id or tracing.new_request_id()
+    chunks = queue.Queue()
+    done = object()
+
+    async def _pump():
+        try:
+            async for chunk in process_query_stream(query, context, request_id):
+                chunks.put(chunk)
+        finally:
+            chunks.put(done)
+
+    start = time.perf_counter()
+    future = submit(_pump())
+    first_chunk = True
+
+    try:
+        while True:
+            chunk = chunks.get(timeout=QUERY_TIMEOUT)
+            if chunk is done:
+                break
+
+            if first_chunk:
+                logger.info(f"Query {request_id} time to first token: {(time.perf_counter() - start) * 1000:.0f} ms")
+                first_chunk = False
+
+            yield chunk
+    except queue.Empty:
+        logger.error(f"Query {request_id} timed out after {QUERY_TIMEOUT}s")
+        yield "Sorry, that took too long to answer. Please try again."
+    finally:
+        # Stop the background work if the caller stopped reading early
+        if not future.done():
+            future.cancel()
+        logger.info(f"Query {request_id} total response time: {(time.perf_counter() - start) * 1000:.0f} ms")
+
 if __name__ == "__main__":
     pass
\ No newline at end of file
@@ -1,152 +1,270 @@
 from mcp.server.fastmcp import FastMCP
-from typing import List, Dict
+from typing import Any, Callable, List, Dict, Optional, Sequence
+import os
+import json
+import base64
 import random
-import datetime
+import hashlib
+import threading
+from collections import OrderedDict
+
+from catalog import GENERIC, load_catalog
+from extractors import extract_budget, parse_date_range
+from flight_search import SORT_KEYS, FlightSchedule
+from tool_cache import normalize_arguments
+from tool_records import AttractionOption, HotelOption, RestaurantOption, TransportOption
 
 mcp = FastMCP("My Server")
 
-@mcp.tool()
-def search_flights(from_location: str, to_location: str, date_range: str) -> List[Dict]:
+# Loaded once when the server starts; every tool queries its indexes
+catalog = load_catalog()
+flight_schedule = FlightSchedule.from_catalog(catalog)
+
+# Results per page of the list tools, and the most a caller may ask for
+DEFAULT_PAGE_SIZE = 5
+MAX_PAGE_SIZE = 20
+
+# A first page ranks the query afresh, up to this many results, and its later pages are sliced from that list
+MAX_RESULTS = 100
+# Ranked queries kept for their cursor pages
+RANKED_QUERIES = 256
+
+# Seed for the simulated live data (seats, room prices, tables). Each call derives its random numbers
+# from this seed and its normalized arguments, so identical requests return identical results.
+# Set SIMULATION_SEED=random for results that change on every call.
+SIMULATION_SEED = os.getenv("SIMULATION_SEED", "0")
+UNSEEDED = ("random", "none", "")
+
+def tool_rng(tool: str, arguments: Dict[str, Any], seed: Optional[str] = None) -> random.Random:
+    """
+    Random number generator for one tool call, seeded from the global seed, the tool and its arguments
     """
-    Simulates searching for available flights between two locations within a given date range.
+    seed = SIMULATION_SEED if seed is None else seed
+    if seed.strip().lower() in UNSEEDED:
+        return random.Random()
+
+    key = f"{seed}:{tool}:{json.dumps(normalize_arguments(arguments, casefold=True), sort_keys=True, separators=(',', ':'))}"
+    return random.Random(int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], "big"))
+
+def _query_hash(tool: str, arguments: Dict[str, Any]) -> str:
+    key = f"{tool}:{json.dumps(normalize_arguments(arguments, casefold=True), sort_keys=True, separators=(',', ':'))}"
+    return hashlib.sha256(key.encode()).hexdigest()[:12]
+
+def encode_cursor(tool: str, arguments: Dict[str, Any], offset: int) -> str:
+    """
+    Opaque cursor for the page starting at offset, bound to the query it came from
+    """
+    payload = json.dumps({"offset": offset, "query": _query_hash(tool, arguments)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(tool: str, arguments: Dict[str, Any], cursor: str) -> int:
+    """
+    Return the offset a cursor points at. Raises ValueError if it is malformed or belongs to another query.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        offset = int(payload["offset"])
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError(f"malformed cursor: {e}")
+    if payload.get("query") != _query_hash(tool, arguments) or offset < 0:
+        raise ValueError("cursor belongs to a different query")
+    return offset
+
+_ranked: "OrderedDict[str, Sequence]" = OrderedDict()
+_ranked_lock = threading.Lock()
+
+def ranked_results(tool: str, arguments: Dict[str, Any], fetch: Callable[[int], Sequence], fresh: bool) -> Sequence:
+    """
+    The first MAX_RESULTS results of a query in their sort order. A fresh request (a first page) always
+    fetches them and keeps them under the query hash; cursor pages are cut from the kept list, so the pages
+    of one search never overlap or skip results whatever their sizes.
+    """
+    query = _query_hash(tool, arguments)
+    if not fresh:
+        with _ranked_lock:
+            if query in _ranked:
+                _ranked.move_to_end(query)
+                return _ranked[query]
+
+    results = fetch(MAX_RESULTS)
+    with _ranked_lock:
+        _ranked[query] = results
+        while len(_ranked) > RANKED_QUERIES:
+            _ranked.popitem(last=False)
+    return results
+
+def paginate(tool: str, arguments: Dict[str, Any], fetch: Callable[[int], Sequence], render: Callable[[Sequence], List[Dict]],
+             limit: int, cursor: str) -> Dict[str, Any]:
+    """
+    Build one page of a list tool's results.
 
     Args:
-        from_location (str): The departure city or airport.
-        to_location (str): The destination city or airport.
-        date_range (str): The travel date range in a format like "2025-05-01 to 2025-05-07".
+        arguments: What identifies the query; relative arguments such as "next week" should be resolved in it
+        fetch: Returns up to n results in their stable sort order; called with MAX_RESULTS for a first page
+        render: Turns the results from the first one up to the end of the page into dicts. It always starts
+                from the first result, so simulated values drawn from the call's RNG don't depend on the page.
+        limit: Page size, clamped to 1..MAX_PAGE_SIZE
+        cursor: next_cursor of the previous page, or "" for the first page
 
     Returns:
-        list: A list of dictionaries where each dictionary represents a flight option, 
-              including airline, price, departure, and arrival times.
-    """
-    airlines = ["Delta", "United", "Air France", "Qatar Airways", "Lufthansa"]
-    airport_codes = {
-        "New York": "JFK",
-        "Paris": "CDG",
-        "London": "LHR",
-        "Rome": "FCO",
-        "Greece": "ATH",
-        "Tokyo": "HND",
-        "Dubai": "DXB"
+        dict: {"items": [...], "next_cursor": cursor of the next page or None}, plus "error" for a bad cursor
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    try:
+        offset = decode_cursor(tool, arguments, cursor) if cursor else 0
+    except ValueError as e:
+        return {"items": [], "next_cursor": None, "error": f"Invalid cursor ({e}). Search again without a cursor."}
+
+    results = ranked_results(tool, arguments, fetch, fresh=not cursor)
+    end = offset + limit
+    return {
+        "items": render(results[:end])[offset:],
+        "next_cursor": encode_cursor(tool, arguments, end) if len(results) > end else None
     }
 
-    try:
-        start_str, end_str = date_range.split("to")
-        start_date = datetime.datetime.strptime(start_str.strip(), "%Y-%m-%d")
-        end_date = datetime.datetime.strptime(end_str.strip(), "%Y-%m-%d")
-    except ValueError:
-        return [{"error": "Invalid date range format. Use 'YYYY-MM-DD to YYYY-MM-DD'."}]
-
-    if start_date >= end_date:
-        return [{"error": "Start date must be before end date."}]
-
-    results = []
-    for _ in range(3):
-        airline = random.choice(airlines)
-        price = round(random.uniform(300, 1000), 2)
-
-        departure = start_date + datetime.timedelta(days=random.randint(0, (end_date - start_date).days))
-        return_date = departure + datetime.timedelta(days=random.randint(5, 10))
-
-        results.append({
-            "airline": airline,
-            "price_usd": price,
-            "from": f"{from_location} ({airport_codes.get(from_location, 'XXX')})",
-            "to": f"{to_location} ({airport_codes.get(to_location, 'XXX')})",
-            "departure_date": departure.strftime("%Y-%m-%d"),
-            "return_date": return_date.strftime("%Y-%m-%d"),
-            "mock_booking_link": f"https://mockflights.com/book/{airline.lower().replace(' ', '')}"
-        })
+@mcp.tool()
+def search_flights(from_location: str, to_location: str, date_range: str, sort_by: str = "price",
+                   limit: int = DEFAULT_PAGE_SIZE, cursor: str = "") -> Dict[str, Any]:
+    """
+    Searches the flight schedule for direct and connecting itineraries between two locations
+    that depart within a given date range.
 
-    return results
+    Args:
+        from_location (str): The departure city, country or airport code.
+        to_location (str): The destination city, country or airport code.
+        date_range (str): The travel dates, like "2025-05-01 to 2025-05-07", "21st May to 3rd June",
+                          "May 2025" or "next week".
+        sort_by (str): "price" for the cheapest itineraries first or "duration" for the fastest.
+        limit (int): Itineraries per page.
+        cursor (str): The next_cursor of the previous page, to get the page after it.
+
+    Returns:
+        dict: "items", a list of itineraries including airlines, price, departure and arrival times,
+              duration, stops and seats left, and "next_cursor" for the next page (null on the last page).
+    """
+    arguments = {"from_location": from_location, "to_location": to_location, "date_range": date_range, "sort_by": sort_by}
+    parsed = parse_date_range(date_range)
+    if parsed is None:
+        return {"items": [], "next_cursor": None, "error": "Invalid date range format. Use 'YYYY-MM-DD to YYYY-MM-DD'."}
+
+    origin, destination = catalog.city(from_location), catalog.city(to_location)
+    if origin is None or destination is None:
+        return {"items": [], "next_cursor": None, "error": f"No airport found for {from_location if origin is None else to_location}."}
+
+    def fetch(count):
+        return flight_schedule.search(origin.airport_code, destination.airport_code, parsed.start, parsed.end,
+                                      sort_by=sort_by if sort_by in SORT_KEYS else "price", limit=count)
+
+    def render(itineraries):
+        rng = tool_rng("search_flights", arguments)
+        return [itinerary.to_option(from_location, to_location)._replace(seats_left=rng.randint(1, 9))._asdict()
+                for itinerary in itineraries]
+
+    # Keyed on the resolved dates, so a cursor from a "next week" search made on another day isn't honoured
+    return paginate("search_flights", dict(arguments, dates=str(parsed)), fetch, render, limit, cursor)
 
 @mcp.tool()
-def recommend_hotels(location: str, budget: str = "medium") -> list[dict]:
+def recommend_hotels(location: str, budget: str = "medium", limit: int = DEFAULT_PAGE_SIZE, cursor: str = "") -> Dict[str, Any]:
     """
     Provides a simulated list of hotel recommendations based on the location and budget.
 
     Args:
         location (str): The city or region where the user wants to stay.
         budget (str): The budget category, such as "low", "medium", or "high".
+        limit (int): Hotels per page.
+        cursor (str): The next_cursor of the previous page, to get the page after it.
 
     Returns:
-        list: A list of dictionaries where each dictionary contains hotel name, 
-              location, price per night, rating, and a mock booking link.
+        dict: "items", a list of hotels, best rated first, with name, location, price per night, rating,
+              rooms left and a mock booking link, and "next_cursor" for the next page (null on the last page).
     """
-    hotel_data = {
-        "low": [("Budget Inn", 50), ("City Hostel", 35)],
-        "medium": [("Comfort Suites", 120), ("Holiday Hotel", 90)],
-        "high": [("Grand Palace", 300), ("Luxury Stay", 450)]
-    }
+    arguments = {"location": location, "budget": budget}
+    # Accept synonyms such as "cheap" or "luxury" for the three budget tiers
+    tier = extract_budget(budget) or "medium"
+    hotels = catalog.hotels(location, tier) or catalog.hotels(GENERIC, tier)
 
-    hotels = hotel_data.get(budget.lower(), hotel_data["medium"])
-    return [
-        {
-            "name": name,
-            "location": location,
-            "price_per_night_usd": price,
-            "rating": round(random.uniform(3.5, 5.0), 1),
-            "mock_booking_link": f"https://mockhotels.com/book/{name.lower().replace(' ', '')}"
-        }
-        for name, price in hotels
-    ]
+    def render(page):
+        rng = tool_rng("recommend_hotels", arguments)
+        return [
+            HotelOption(
+                name=hotel.name,
+                location=location,
+                # Tonight's rate moves around the catalog rate
+                price_per_night_usd=round(hotel.price_per_night_usd * rng.uniform(0.85, 1.25)),
+                rating=hotel.rating,
+                rooms_left=rng.randint(1, 12),
+                mock_booking_link=f"https://mockhotels.com/book/{hotel.name.lower().replace(' ', '')}"
+            )._asdict()
+            for hotel in page
+        ]
+
+    return paginate("recommend_hotels", arguments, lambda count: hotels[:count], render, limit, cursor)
 
 @mcp.tool()
-def recommend_attractions(location: str) -> list[dict]:
+def recommend_attractions(location: str, limit: int = DEFAULT_PAGE_SIZE, cursor: str = "") -> Dict[str, Any]:
     """
     Returns a list of tourist attractions for a given location.
 
     Args:
         location (str): The name of the city or country to explore.
+        limit (int): Attractions per page.
+        cursor (str): The next_cursor of the previous page, to get the page after it.
 
     Returns:
-        list: A list of dictionaries where each dictionary includes the attraction name, 
-              its location, and a short description.
+        dict: "items", a list of attractions in catalog order with name, location and a short description,
+              and "next_cursor" for the next page (null on the last page).
     """
-    sample_attractions = {
-        "Paris": ["Eiffel Tower", "Louvre Museum", "Seine River Cruise"],
-        "New York": ["Statue of Liberty", "Central Park", "Broadway Shows"],
-        "Rome": ["Colosseum", "Trevi Fountain", "Vatican Museums"]
-    }
+    attractions = catalog.attractions(location) or catalog.attractions(GENERIC)
 
-    return [
-        {
-            "name": attraction,
-            "location": location,
-            "description": f"{attraction} is a must-see attraction in {location}."
-        }
-        for attraction in sample_attractions.get(location, ["Main Square", "Local Market", "City Museum"])
-    ]
+    def render(page):
+        return [
+            AttractionOption(
+                name=attraction.name,
+                location=location,
+                description=f"{attraction.name} is a must-see attraction in {location}."
+            )._asdict()
+            for attraction in page
+        ]
+
+    return paginate("recommend_attractions", {"location": location}, lambda count: attractions[:count], render, limit, cursor)
 
 @mcp.tool()
-def recommend_restaurants(location: str, cuisine: str = "any") -> list[dict]:
+def recommend_restaurants(location: str, cuisine: str = "any", limit: int = DEFAULT_PAGE_SIZE, cursor: str = "") -> Dict[str, Any]:
     """
     Suggests local restaurants based on location and optionally preferred cuisine.
 
     Args:
         location (str): The city or region to search restaurants in.
         cuisine (str): The preferred type of cuisine, e.g., "italian", "japanese", or "any".
+        limit (int): Restaurants per page.
+        cursor (str): The next_cursor of the previous page, to get the page after it.
 
     Returns:
-        list: A list of dictionaries where each dictionary contains restaurant name, 
-              location, cuisine type, and a simulated rating.
+        dict: "items", a list of restaurants, best rated first, with name, location, cuisine type, rating
+              and the next free table tonight, and "next_cursor" for the next page (null on the last page).
     """
-    cuisines = {
-        "any": ["The Local Bite", "Food Corner", "Taste Hub"],
-        "italian": ["Pasta House", "Trattoria Roma", "Mama's Kitchen"],
-        "japanese": ["Sushi Zen", "Tokyo Bowl", "Ninja Ramen"]
-    }
+    arguments = {"location": location, "cuisine": cuisine}
+    any_cuisine = cuisine.lower() == "any"
+    restaurants = (
+        catalog.restaurants(location, None if any_cuisine else cuisine)
+        or catalog.restaurants(GENERIC, cuisine)
+        or catalog.restaurants(GENERIC, "any")
+    )
 
-    restaurant_names = cuisines.get(cuisine.lower(), cuisines["any"])
-    return [
-        {
-            "name": name,
-            "location": location,
-            "cuisine": cuisine,
-            "rating": round(random.uniform(3.5, 5.0), 1)
-        }
-        for name in restaurant_names
-    ]
+    def render(page):
+        rng = tool_rng("recommend_restaurants", arguments)
+        return [
+            RestaurantOption(
+                name=restaurant.name,
+                location=location,
+                cuisine=restaurant.cuisine if any_cuisine else cuisine,
+                rating=restaurant.rating,
+                next_free_table=f"{rng.randint(18, 21)}:{rng.choice(('00', '15', '30', '45'))}"
+            )._asdict()
+            for restaurant in page
+        ]
+
+    return paginate("recommend_restaurants", arguments, lambda count: restaurants[:count], render, limit, cursor)
 
 @mcp.tool()
 def transport_options(from_location: str, to_location: str) -> dict:
@@ -161,28 +279,14 @@ def transport_options(from_location: str, to_location: str) -> dict:
         dict: A dictionary with keys like "bus", "train", "flight", and "car", 
               each containing a nested dictionary with duration and price in USD.
     """
-    return {
-        "bus": {
-            "route": f"{from_location} to {to_location}",
-            "duration": "10h",
-            "price_usd": 45
-        },
-        "train": {
-            "route": f"{from_location} to {to_location}",
-            "duration": "6h",
-            "price_usd": 75
-        },
-        "flight": {
-            "route": f"{from_location} to {to_location}",
-            "duration": "1h 30m",
-            "price_usd": 150
-        },
-        "car": {
-            "route": f"{from_location} to {to_location}",
-            "duration": "8h",
-            "price_usd": 90
-        }
-    }
+    route = f"{from_location} to {to_location}"
+    options = [
+        TransportOption("bus", route, "10h", 45),
+        TransportOption("train", route, "6h", 75),
+        TransportOption("flight", route, "1h 30m", 150),
+        TransportOption("car", route, "8h", 90)
+    ]
+    return {option.mode: option._asdict() for option in options}
 
 @mcp.tool()
 def seasonal_travel_advice(destination: str) -> str:
@@ -195,13 +299,7 @@ def seasonal_travel_advice(destination: str) -> str:
     Returns:
         str: A brief travel tip describing the ideal time to visit the destination.
     """
-    seasons = {
-        "Greece": "Best time to visit Greece is between April and June or September and October.",
-        "Japan": "Visit Japan in March-April for cherry blossoms or November for fall colors.",
-        "Thailand": "Dry season from November to February is ideal for travel."
-    }
-
-    return seasons.get(destination, f"Visit {destination} in its dry or festival season for the best experience.")
+    return catalog.seasonal_advice(destination) or f"Visit {destination} in its dry or festival season for the best experience."
 
 
 if __name__ == "__main__":
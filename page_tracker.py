@@ -0,0 +1,59 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Conversations whose pending pages are remembered; the least recently used are forgotten first
+DEFAULT_MAX_CONVERSATIONS = 1024
+
+class PageTracker:
+    def __init__(self, max_conversations: int = DEFAULT_MAX_CONVERSATIONS):
+        """
+        Remembers, per conversation, the tool calls of the latest answer that have another page of results,
+        so a "show more" request can fetch it without going through the router or the LLM again
+        """
+        self.max_conversations = max_conversations
+        self._pages: "OrderedDict[Optional[str], Dict[str, Tuple[Dict[str, Any], str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, conversation: Optional[str], pages: Iterable[Tuple[Dict[str, Any], Optional[str]]],
+                 replace: bool = True) -> None:
+        """
+        Record the next cursor of each tool call in an answer.
+
+        Args:
+            conversation: Conversation ID, or None outside a conversation
+            pages: (tool call, next cursor or None) pairs
+            replace: Forget the other tools' pages too, as a new question does; a "show more" answer
+                     only updates the tools it paged through
+        """
+        with self._lock:
+            pending = {} if replace else self._pages.get(conversation, {})
+            for tool_call, next_cursor in pages:
+                if next_cursor:
+                    pending[tool_call["tool"]] = (tool_call, next_cursor)
+                else:
+                    pending.pop(tool_call["tool"], None)
+
+            self._pages[conversation] = pending
+            self._pages.move_to_end(conversation)
+            while len(self._pages) > self.max_conversations:
+                self._pages.popitem(last=False)
+
+    def next_calls(self, conversation: Optional[str], tools: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Tool calls that fetch the next page of each pending result, optionally only for some tools
+        """
+        with self._lock:
+            pending = self._pages.get(conversation, {})
+            return [
+                {"tool": tool, "arguments": dict(tool_call["arguments"], cursor=cursor)}
+                for tool, (tool_call, cursor) in pending.items()
+                if not tools or tool in tools
+            ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pages.clear()
+
+# Shared tracker used by the MCP client
+page_tracker = PageTracker()
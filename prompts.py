@@ -0,0 +1,196 @@
+import os
+import logging
+import functools
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Maximum input tokens for the tool-selection request, system message included
+DEFAULT_INPUT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "2500"))
+
+# Context fields dropped first when the prompt is over budget, least useful first
+CONTEXT_TRIM_ORDER = ("mentioned_destinations", "location", "budget", "date_range", "route")
+
+TOOL_SELECTION_INTRO = (
+    "You are a travel expert assistant with a focus on providing detailed, actionable information. "
+    "You have access to these tools:\n\n"
+)
+
+TOOL_SELECTION_GUIDELINES = (
+    "RESPONSE GUIDELINES:\n"
+    "1. CRITICAL: EVERY recommendation you provide MUST include booking/reservation links or ticket purchase options.\n"
+    "2. For ALL queries about flights, hotels, attractions, restaurants, or transport, use the appropriate tool.\n"
+    "3. For vague queries, use context to fill in missing details rather than asking for more information.\n"
+    "4. Your tool selection should match what the user is looking for, even if they don't explicitly mention the exact tool name.\n"
+    "5. Provide comprehensive details for each option including pricing, ratings, and specific descriptive details.\n\n"
+    "DETAILED TOOL USAGE INSTRUCTIONS:\n"
+    "- For flight queries: Include origin, destination, flexible dates if specific ones aren't given.\n"
+    "- For hotel queries: Always include specific hotel names, prices, ratings, descriptions and booking links.\n"
+    "- For attraction queries: Include details about opening hours, ticket prices, and online booking options.\n"
+    "- For restaurant queries: Include cuisine type, price range, ratings, and reservation links.\n"
+    "- For transport options: Include duration, prices, and booking options for each transport mode.\n\n"
+    "TOOL SELECTION CRITERIA:\n"
+    "- Flight queries (e.g., 'flights to Paris', 'how to get to Greece') → Use search_flights\n"
+    "- Hotel queries (e.g., 'places to stay in Rome', 'hotels in Tokyo') → Use recommend_hotels\n"
+    "- Attraction queries (e.g., 'things to do in Barcelona', 'visit museums in London') → Use recommend_attractions\n"
+    "- Food queries (e.g., 'where to eat in Seoul', 'best restaurants in New York') → Use recommend_restaurants\n"
+    "- Transportation queries (e.g., 'how to get around Amsterdam', 'transport in Berlin') → Use transport_options\n"
+    "- Seasonal advice queries (e.g., 'best time to visit Thailand', 'weather in Mexico') → Use seasonal_travel_advice\n\n"
+    "HANDLING MISSING INFORMATION:\n"
+    "- If origin location is missing: Use user's current location from context, or default to 'New York'\n"
+    "- If dates are missing: Create reasonable dates for next month (e.g., 15-22 days from now)\n"
+    "- If budget is missing: Default to 'medium' budget level\n"
+    "- IMPORTANT: Always make an intelligent guess for missing information rather than skipping the tool call\n\n"
+)
+
+TOOL_SELECTION_FORMAT = (
+    "IMPORTANT: When you need to use a tool, you must ONLY respond with "
+    "the exact JSON object format below, nothing else:\n"
+    "{\n"
+    '    "tool": "tool-name",\n'
+    '    "arguments": {\n'
+    '        "argument-name": "value"\n'
+    "    }\n"
+    "}\n\n"
+    "If the question asks for several things at once (e.g. flights, a hotel and things to do), "
+    "respond with a JSON array of these objects, one per tool, in the order they were asked for.\n\n"
+    "Format requirements:\n"
+    "- For dates, use YYYY-MM-DD format\n"
+    "- City names should be full names (e.g., 'New York' not 'NY')\n"
+    "- For date ranges, use the format 'YYYY-MM-DD to YYYY-MM-DD'\n"
+    "- Use information from the user context when the user query is vague or refers to previous conversation\n"
+    "- If dates are missing and not in context, CREATE reasonable dates for next month instead of skipping the tool call\n"
+    "- If origin is missing, use the user's location from context or 'New York' as a default rather than skipping the tool call"
+)
+
+# With native function calling the tools travel as function definitions, so the prompt
+# neither lists them nor spells out a JSON answer format
+TOOL_CALLING_INTRO = (
+    "You are a travel expert assistant with a focus on providing detailed, actionable information. "
+    "Answer the user's question by calling the provided tools.\n\n"
+)
+
+TOOL_CALLING_FORMAT = (
+    "Call the tool that matches the question. If the question asks for several things at once "
+    "(e.g. flights, a hotel and things to do), call one tool for each, in the order they were asked for. "
+    "Only answer in plain text if no tool fits.\n\n"
+    "Argument requirements:\n"
+    "- For dates, use YYYY-MM-DD format\n"
+    "- City names should be full names (e.g., 'New York' not 'NY')\n"
+    "- For date ranges, use the format 'YYYY-MM-DD to YYYY-MM-DD'\n"
+    "- Use information from the user context when the user query is vague or refers to previous conversation\n"
+    "- If dates are missing and not in context, CREATE reasonable dates for next month instead of skipping the tool call\n"
+    "- If origin is missing, use the user's location from context or 'New York' as a default rather than skipping the tool call"
+)
+
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken encoding unavailable, estimating token counts: {e}")
+        return None
+
+@functools.lru_cache(maxsize=256)
+def count_tokens(text: str) -> int:
+    """
+    Count input tokens with tiktoken when it is installed, otherwise estimate about four characters per token
+    """
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return (len(text) + 3) // 4
+
+@functools.lru_cache(maxsize=32)
+def _static_prefix(tools: Tuple[Tuple[str, str], ...]) -> str:
+    """
+    The part of the prompt that only changes with the tool set: intro, tool list and guidelines.
+    Tool docstrings are collapsed onto one line each so indentation doesn't cost tokens.
+    """
+    tools_description = "\n".join(f"- {name}: {' '.join(description.split())}" for name, description in tools)
+    return f"{TOOL_SELECTION_INTRO}{tools_description}\n\n{TOOL_SELECTION_GUIDELINES}"
+
+def _context_fields(context: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Render each context field as a prompt line, keyed by its name in CONTEXT_TRIM_ORDER
+    """
+    fields = {}
+    if not context:
+        return fields
+
+    # Location if available for better defaults
+    if context.get("location"):
+        fields["location"] = f"- User's current location: {context['location']}\n"
+
+    # Current trip information
+    current_trip = context.get("current_trip") or {}
+    if current_trip.get("origin") and current_trip.get("destination"):
+        fields["route"] = f"- Current trip: {current_trip['origin']} to {current_trip['destination']}\n"
+
+        if current_trip.get("date_range"):
+            fields["date_range"] = f"- Travel dates: {current_trip['date_range']}\n"
+
+        if current_trip.get("budget"):
+            fields["budget"] = f"- Budget level: {current_trip['budget']}\n"
+
+    # Destinations mentioned in conversation
+    mentioned = context.get("mentioned_destinations") or []
+    if mentioned:
+        fields["mentioned_destinations"] = f"- Destinations discussed: {', '.join(mentioned[:5])}\n"
+
+    return fields
+
+def _render_context(fields: Dict[str, str]) -> str:
+    if not fields:
+        return ""
+    order = ("location", "route", "date_range", "budget", "mentioned_destinations")
+    return "### USER CONTEXT INFO ###\n" + "".join(fields[name] for name in order if name in fields) + "### END CONTEXT INFO ###\n\n"
+
+def build_tool_selection_prompt(query: str, tools: Sequence[Any], context: Optional[Dict[str, Any]] = None,
+                                budget: Optional[int] = None, reserved_tokens: int = 0,
+                                native_tools: bool = False) -> Tuple[str, int]:
+    """
+    Build the tool-selection prompt from the cached static sections plus this call's context and question.
+    Context fields are dropped in CONTEXT_TRIM_ORDER until the prompt and reserved_tokens (e.g. the system
+    message and tool definitions) fit the input budget; the question itself is never trimmed.
+    With native_tools the prompt is for function calling: no tool list and no JSON answer format.
+
+    Returns:
+        tuple: The prompt and its token count
+    """
+    budget = DEFAULT_INPUT_TOKEN_BUDGET if budget is None else budget
+    if native_tools:
+        prefix, answer_format = TOOL_CALLING_INTRO + TOOL_SELECTION_GUIDELINES, TOOL_CALLING_FORMAT
+    else:
+        prefix, answer_format = _static_prefix(tuple((tool.name, tool.description or "") for tool in tools)), TOOL_SELECTION_FORMAT
+    question = f"User's Question: {query}\n\n"
+    fixed_tokens = reserved_tokens + count_tokens(prefix) + count_tokens(question) + count_tokens(answer_format)
+
+    fields = _context_fields(context)
+    trimmed: List[str] = []
+    context_section = _render_context(fields)
+    context_tokens = count_tokens(context_section)
+
+    for name in CONTEXT_TRIM_ORDER:
+        if fixed_tokens + context_tokens <= budget:
+            break
+        if name in fields:
+            del fields[name]
+            trimmed.append(name)
+            context_section = _render_context(fields)
+            context_tokens = count_tokens(context_section)
+
+    if trimmed:
+        logger.info(f"Prompt over the {budget} token budget, dropped context: {', '.join(trimmed)}")
+    if fixed_tokens + context_tokens > budget:
+        logger.warning(f"Tool-selection prompt needs {fixed_tokens + context_tokens} tokens, over the {budget} token budget")
+
+    prompt = f"{prefix}{context_section}{question}{answer_format}"
+    return prompt, fixed_tokens - reserved_tokens + context_tokens
@@ -0,0 +1,198 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+import extractors
+
+logger = logging.getLogger(__name__)
+
+# Words that carry no meaning for matching repeated questions
+STOPWORDS = frozenset("""
+a an the and or of in on at to for from with about me my i we our you your is are be can could would
+please what whats which some any there this that tell show give find good best top get
+""".split())
+
+_PUNCTUATION = re.compile(r"[^\w\s-]")
+_DIGITS = re.compile(r"\d+")
+
+# Words by which a question leans on the turns before it ("hotels there", "what about Paris instead?")
+_REFERS_BACK = re.compile(
+    r"\b(it|its|there|that|those|these|them|they|same|also|too|instead|again|else|another|more|"
+    r"earlier|previous|before|above|what about|how about)\b", re.IGNORECASE
+)
+
+# Most recent turns a follow-up question is keyed on
+FOLLOW_UP_TURNS = 2
+
+def history_key(text: str, history: Optional[List[Dict[str, str]]]) -> Optional[str]:
+    """
+    Short hash of the last turns when the question refers back to them, else None: a self-contained
+    question means the same whatever was said before, so it shouldn't miss the cache over it
+    """
+    if not history or not _REFERS_BACK.search(text):
+        return None
+    recent = [[turn.get("role"), turn.get("content")] for turn in history[-FOLLOW_UP_TURNS:]]
+    return hashlib.blake2b(json.dumps(recent).encode(), digest_size=8).hexdigest()
+
+def normalize_text(text: str) -> str:
+    """
+    Lowercase the text, drop punctuation and collapse whitespace
+    """
+    return " ".join(_PUNCTUATION.sub(" ", text.casefold()).split())
+
+def shingles(text: str, size: int = 2) -> FrozenSet[int]:
+    """
+    Hash the meaningful tokens and token n-grams (up to size) of the text into a set of integers
+    """
+    tokens = [token for token in normalize_text(text).split() if token not in STOPWORDS]
+    hashed = set()
+    for n in range(1, size + 1):
+        for i in range(len(tokens) - n + 1):
+            digest = hashlib.blake2b(" ".join(tokens[i:i + n]).encode(), digest_size=8).digest()
+            hashed.add(int.from_bytes(digest, "big"))
+    return frozenset(hashed)
+
+def jaccard(a: FrozenSet[int], b: FrozenSet[int]) -> float:
+    """
+    Jaccard similarity of two shingle sets
+    """
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+class LLMResponseCache:
+    def __init__(self, ttl: float = 3600, max_entries: int = 512, fuzzy_threshold: float = 0.8):
+        """
+        Cache of LLM responses keyed on the normalized prompt plus the context fields that shape the answer.
+        Near-duplicate questions can hit the cache through shingle similarity; set fuzzy_threshold to 0 to disable.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.fuzzy_threshold = fuzzy_threshold
+        self._entries: "OrderedDict[str, Tuple[float, str, str, FrozenSet[int]]]" = OrderedDict()
+        self._buckets: Dict[str, Dict[str, FrozenSet[int]]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "fuzzy_hits": 0, "misses": 0}
+
+    def _bucket(self, message: str, text: str, context: Optional[Dict[str, Any]]) -> str:
+        """
+        Everything that must match exactly: the prompt template around the question, the context fields,
+        and the entities in the question (destinations, numbers, budget), so fuzzy matching never swaps them
+        """
+        template = normalize_text(message.replace(text, "")) if text != message else ""
+        context = context or {}
+        current_trip = context.get("current_trip") or {}
+        entities = {
+            "destinations": sorted(extractors.extract_destinations(text)),
+            "numbers": _DIGITS.findall(text),
+            "budget": extractors.extract_budget(text)
+        }
+        signature = json.dumps({
+            "template": template,
+            "location": context.get("location"),
+            "current_trip": {key: current_trip.get(key) for key in ("origin", "destination", "date_range", "budget")},
+            # A follow-up means something else after different turns
+            "history": history_key(text, context.get("history")),
+            "entities": entities
+        }, sort_keys=True, default=str)
+        return hashlib.blake2b(signature.encode(), digest_size=16).hexdigest()
+
+    def get(self, message: str, context: Optional[Dict[str, Any]] = None, cache_text: Optional[str] = None) -> Optional[str]:
+        """
+        Return a cached response for the message, or None on a miss.
+
+        Args:
+            message (str): The full prompt sent to the LLM
+            context (dict, optional): User context used to personalize the response
+            cache_text (str, optional): The variable part of the prompt (usually the user's question) to match fuzzily
+        """
+        if self.ttl <= 0:
+            return None
+
+        text = cache_text or message
+        bucket = self._bucket(message, text, context)
+        key = f"{bucket}:{normalize_text(text)}"
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                logger.info(f"LLM response cache hit (exact): {text[:60]}")
+                return entry[1]
+
+            if self.fuzzy_threshold > 0:
+                query_shingles = shingles(text)
+                best_key, best_score = None, 0.0
+                for candidate_key, candidate_shingles in self._buckets.get(bucket, {}).items():
+                    score = jaccard(query_shingles, candidate_shingles)
+                    if score > best_score:
+                        best_key, best_score = candidate_key, score
+
+                if best_key is not None and best_score >= self.fuzzy_threshold and self._entries[best_key][0] > now:
+                    self._entries.move_to_end(best_key)
+                    self._stats["fuzzy_hits"] += 1
+                    logger.info(f"LLM response cache hit (fuzzy, similarity {best_score:.2f}): {text[:60]}")
+                    return self._entries[best_key][1]
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, message: str, response: str, context: Optional[Dict[str, Any]] = None, cache_text: Optional[str] = None) -> None:
+        """
+        Store a response for the message
+        """
+        if self.ttl <= 0:
+            return
+
+        text = cache_text or message
+        bucket = self._bucket(message, text, context)
+        key = f"{bucket}:{normalize_text(text)}"
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            text_shingles = shingles(text)
+            self._entries[key] = (time.time() + self.ttl, response, bucket, text_shingles)
+            self._buckets.setdefault(bucket, {})[key] = text_shingles
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Return hit and miss counters
+        """
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+    def clear(self) -> None:
+        """
+        Drop every cached response
+        """
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def _remove(self, key: str) -> None:
+        _, _, bucket, _ = self._entries.pop(key)
+        bucket_entries = self._buckets.get(bucket)
+        if bucket_entries is not None:
+            bucket_entries.pop(key, None)
+            if not bucket_entries:
+                del self._buckets[bucket]
+
+# Shared cache used by llm_client
+response_cache = LLMResponseCache(
+    ttl=float(os.getenv("LLM_CACHE_TTL", "3600")),
+    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512")),
+    fuzzy_threshold=float(os.getenv("LLM_CACHE_FUZZY_THRESHOLD", "0.8"))
+)
@@ -0,0 +1,374 @@
+import os
+import time
+import asyncio
+import threading
+import datetime
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+import anyio
+from mcp import ClientSession, StdioServerParameters, types
+from mcp.client.stdio import stdio_client
+
+import tracing
+from async_runtime import run_on_loop, register_shutdown
+
+logger = logging.getLogger(__name__)
+
+# Number of warm mcp_server.py processes kept alive
+DEFAULT_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "2"))
+
+# Seconds to wait for a single MCP request before treating the server as dead
+DEFAULT_CALL_TIMEOUT = float(os.getenv("MCP_CALL_TIMEOUT", "30"))
+
+# Seconds a session may sit idle before it is pinged on checkout
+DEFAULT_PING_INTERVAL = float(os.getenv("MCP_PING_INTERVAL", "60"))
+
+class WorkerExited(RuntimeError):
+    """
+    The server process behind a pooled session is gone, so the call never got an answer
+    """
+
+class _PoolWorker:
+    def __init__(self, server_params: StdioServerParameters, index: int, call_timeout: float):
+        """
+        One warm MCP server child process holding an initialized ClientSession.
+        The stdio transport is owned by a dedicated task so it is entered and exited in the same task.
+        """
+        self.server_params = server_params
+        self.index = index
+        self.call_timeout = call_timeout
+        self.session: Optional[ClientSession] = None
+        self.tools: List[types.Tool] = []
+        self.broken = False
+        self.last_used = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._error: Optional[BaseException] = None
+        self._restart_lock: Optional[asyncio.Lock] = None
+        self._generation = 0
+
+    @property
+    def alive(self) -> bool:
+        """
+        Whether the worker has a usable session
+        """
+        return self.session is not None and not self.broken and self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """
+        Spawn the server process, initialize the session and cache the tool metadata
+        """
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._error = None
+        self.broken = False
+        self._task = asyncio.create_task(self._run(), name=f"mcp-pool-worker-{self.index}")
+
+        await self._ready.wait()
+        if self._error is not None:
+            raise RuntimeError(f"MCP server worker {self.index} failed to start: {self._error}")
+
+        self._generation += 1
+        self.last_used = time.monotonic()
+        logger.info(f"MCP pool worker {self.index} ready with {len(self.tools)} tools")
+
+    async def _run(self) -> None:
+        spawn = tracing.start_span("mcp.spawn", worker=self.index)
+        try:
+            async with stdio_client(self.server_params) as (read, write):
+                spawn.end()
+
+                # Relay server messages through our own stream so we notice when the child exits
+                relay_send, relay_read = anyio.create_memory_object_stream(0)
+                async with anyio.create_task_group() as tg:
+                    tg.start_soon(self._relay, read, relay_send)
+
+                    async with ClientSession(relay_read, write, read_timeout_seconds=datetime.timedelta(seconds=self.call_timeout)) as session:
+                        with tracing.span("mcp.initialize", worker=self.index):
+                            await session.initialize()
+                        with tracing.span("mcp.list_tools", worker=self.index):
+                            tools = await session.list_tools()
+
+                        self.session = session
+                        self.tools = tools.tools
+                        self._ready.set()
+
+                        # Hold the transport open until the pool asks us to stop
+                        await self._stop.wait()
+
+                    tg.cancel_scope.cancel()
+        except Exception as e:
+            spawn.end(error=e)
+            self._error = e
+            logger.error(f"MCP pool worker {self.index} exited with error: {e}")
+        finally:
+            self.session = None
+            self._ready.set()
+
+    async def _relay(self, read, relay_send) -> None:
+        async with relay_send:
+            async for message in read:
+                await relay_send.send(message)
+
+        # The server closed stdout, so the child process has exited
+        if not self._stop.is_set():
+            logger.warning(f"MCP server process for pool worker {self.index} exited")
+            self.broken = True
+            self._stop.set()
+
+    async def stop(self) -> None:
+        """
+        Close the session and terminate the server process
+        """
+        if self._task is None:
+            return
+
+        self._stop.set()
+        try:
+            await asyncio.wait_for(self._task, timeout=self.call_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self._task.cancel()
+        except Exception as e:
+            logger.warning(f"Error stopping MCP pool worker {self.index}: {e}")
+
+        self._task = None
+        self.session = None
+
+    async def restart(self) -> None:
+        """
+        Replace a dead or broken server process with a fresh one
+        """
+        if self._restart_lock is None:
+            self._restart_lock = asyncio.Lock()
+
+        generation = self._generation
+        async with self._restart_lock:
+            # Concurrent calls that failed together restart the process only once
+            if self._generation != generation and self.alive:
+                return
+
+            logger.warning(f"Restarting MCP pool worker {self.index}")
+            await self.stop()
+            await self.start()
+
+    async def ping(self) -> bool:
+        """
+        Check that the server process still answers
+        """
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout=min(5.0, self.call_timeout))
+            return True
+        except Exception as e:
+            logger.warning(f"MCP pool worker {self.index} failed ping: {e}")
+            return False
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None) -> types.CallToolResult:
+        """
+        Call a tool on this worker's session. Raises WorkerExited, and marks the worker broken, only if the
+        server process is gone; protocol errors and read timeouts (McpError) leave the session in use.
+        """
+        if not self.alive:
+            raise WorkerExited(f"MCP pool worker {self.index} is not running")
+
+        call = asyncio.ensure_future(self.session.call_tool(name, arguments=arguments))
+        try:
+            # Fail fast if the server process dies while the request is in flight
+            done, _ = await asyncio.wait({call, self._task}, return_when=asyncio.FIRST_COMPLETED)
+            if call not in done:
+                call.cancel()
+                self.broken = True
+                raise WorkerExited(f"MCP server process for pool worker {self.index} exited")
+            return call.result()
+        except asyncio.CancelledError:
+            # The caller gave up (e.g. a per-tool timeout); drop the request but keep the session
+            call.cancel()
+            raise
+        except WorkerExited:
+            raise
+        except Exception as e:
+            # The transport failed under the call only if the process or its relay is gone too
+            if not self.alive:
+                self.broken = True
+                raise WorkerExited(f"MCP server process for pool worker {self.index} exited: {e}") from e
+            raise
+        finally:
+            self.last_used = time.monotonic()
+
+class PooledSession:
+    def __init__(self, worker: _PoolWorker):
+        """
+        Checked-out handle on a pooled MCP session.
+        Exposes the subset of the ClientSession API used by the client.
+        """
+        self._worker = worker
+
+    @property
+    def tools(self) -> List[types.Tool]:
+        """
+        Tool metadata cached when the session was initialized
+        """
+        return self._worker.tools
+
+    async def list_tools(self) -> types.ListToolsResult:
+        """
+        Return the cached tool list without a round trip to the server
+        """
+        return types.ListToolsResult(tools=self._worker.tools)
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None) -> types.CallToolResult:
+        """
+        Call a tool on the pooled session.
+        If the server process has died, it is restarted and the call retried once. Other errors are raised
+        as they are: restarting would kill the calls still running on the session and repeat slow tools.
+        """
+        with tracing.span("mcp.call_tool", tool=name, worker=self._worker.index):
+            try:
+                return await run_on_loop(self._worker.call_tool(name, arguments))
+            except WorkerExited as e:
+                logger.warning(f"MCP tool call {name} failed on worker {self._worker.index}: {e}")
+                await run_on_loop(self._worker.restart())
+                return await run_on_loop(self._worker.call_tool(name, arguments))
+
+class MCPSessionPool:
+    def __init__(self, server_params: StdioServerParameters, size: int = DEFAULT_POOL_SIZE,
+                 call_timeout: float = DEFAULT_CALL_TIMEOUT, ping_interval: float = DEFAULT_PING_INTERVAL):
+        """
+        Pool of long-lived MCP server processes with initialized sessions.
+        All sessions live on the shared background event loop; the public methods can be awaited from any loop.
+        """
+        self.server_params = server_params
+        self.size = max(1, size)
+        self.call_timeout = call_timeout
+        self.ping_interval = ping_interval
+        self._workers: List[_PoolWorker] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._background = set()
+        self._started = False
+        self._closed = False
+
+    async def start(self) -> None:
+        """
+        Spawn the warm server processes. Safe to call more than once.
+        """
+        await run_on_loop(self._start())
+
+    async def _start(self) -> None:
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+
+        async with self._start_lock:
+            if self._started:
+                return
+            if self._closed:
+                raise RuntimeError("MCP session pool is closed")
+
+            self._idle = asyncio.Queue()
+            self._workers = [_PoolWorker(self.server_params, i, self.call_timeout) for i in range(self.size)]
+
+            # Start all workers concurrently; a worker that fails to start is retried on checkout
+            results = await asyncio.gather(*(worker.start() for worker in self._workers), return_exceptions=True)
+            for worker, result in zip(self._workers, results):
+                if isinstance(result, Exception):
+                    logger.error(f"{result}")
+                    worker.broken = True
+                self._idle.put_nowait(worker)
+
+            if all(isinstance(result, Exception) for result in results):
+                raise RuntimeError("No MCP server workers could be started")
+
+            self._started = True
+            logger.info(f"MCP session pool started with {self.size} workers")
+
+    async def _checkout(self) -> _PoolWorker:
+        worker = await self._idle.get()
+
+        try:
+            # Restart dead children, and ping sessions that have been idle for a while
+            if not worker.alive:
+                await worker.restart()
+            elif time.monotonic() - worker.last_used > self.ping_interval and not await worker.ping():
+                await worker.restart()
+        except Exception:
+            worker.broken = True
+            self._idle.put_nowait(worker)
+            raise
+
+        return worker
+
+    async def _checkin(self, worker: _PoolWorker) -> None:
+        if self._closed:
+            await worker.stop()
+            return
+
+        if worker.broken:
+            # Restart in the background so the current request is not delayed
+            task = asyncio.create_task(self._recycle(worker))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+            return
+
+        self._idle.put_nowait(worker)
+
+    async def _recycle(self, worker: _PoolWorker) -> None:
+        try:
+            await worker.restart()
+        except Exception as e:
+            logger.error(f"Failed to restart MCP pool worker {worker.index}: {e}")
+            worker.broken = True
+
+        self._idle.put_nowait(worker)
+
+    async def list_tools(self) -> types.ListToolsResult:
+        """
+        Tool metadata cached when the workers started, without checking a session out
+        """
+        await self.start()
+        return types.ListToolsResult(tools=next((worker.tools for worker in self._workers if worker.tools), []))
+
+    @asynccontextmanager
+    async def session(self):
+        """
+        Check a session out of the pool for the duration of a request and return it afterwards
+        """
+        with tracing.span("mcp.checkout"):
+            await self.start()
+            worker = await run_on_loop(self._checkout())
+
+        try:
+            yield PooledSession(worker)
+        finally:
+            await run_on_loop(self._checkin(worker))
+
+    async def close(self) -> None:
+        """
+        Stop every server process in the pool
+        """
+        await run_on_loop(self._close())
+
+    async def _close(self) -> None:
+        self._closed = True
+        await asyncio.gather(*(worker.stop() for worker in self._workers), return_exceptions=True)
+        self._workers = []
+        logger.info("MCP session pool closed")
+
+_pool: Optional[MCPSessionPool] = None
+_pool_lock = threading.Lock()
+
+async def get_session_pool(server_params: StdioServerParameters) -> MCPSessionPool:
+    """
+    Return the process-wide session pool, starting it on first use
+    """
+    global _pool
+
+    with _pool_lock:
+        if _pool is None or _pool._closed:
+            _pool = MCPSessionPool(server_params)
+            register_shutdown(_pool.close)
+        pool = _pool
+
+    await pool.start()
+    return pool
@@ -0,0 +1,22 @@
+import pytest_asyncio
+
+from benchmarks.fake_openai import FakeOpenAIServer
+from llm import close_openai_client
+from response_cache import response_cache
+
+@pytest_asyncio.fixture
+async def fake_openai(monkeypatch):
+    """
+    Point the shared OpenAI client at a local fake endpoint
+    """
+    server = FakeOpenAIServer().start()
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+    monkeypatch.setenv("OPENAI_MAX_RETRIES", "0")
+    await close_openai_client()
+    response_cache.clear()
+
+    yield server
+
+    await close_openai_client()
+    server.stop()
@@ -0,0 +1,30 @@
+from catalog import CATALOG_PATH, GENERIC, Catalog, City, Country, Hotel, Restaurant
+
+def test_lookups_use_case_folded_indexes():
+    catalog = Catalog({
+        "cities": [City("Rome", "Italy", "FCO", 41.8, 12.24)],
+        "countries": [Country("Italy", "Rome")],
+        "hotels": [Hotel("Budget Inn", GENERIC, "low", 50, 4.0), Hotel("Albergo", "Rome", "low", 70, 4.1),
+                   Hotel("Hotel Roma", "Rome", "low", 80, 4.6), Hotel("Palazzo", "Rome", "high", 380, 4.8)],
+        "restaurants": [Restaurant("Roscioli", "Rome", "Italian", 4.5)]
+    })
+
+    assert catalog.city("rome").airport_code == "FCO"
+    assert catalog.city("fco").name == "Rome"
+    assert catalog.city("ITALY").name == "Rome"
+    assert catalog.city("Oslo") is None
+    assert [hotel.name for hotel in catalog.hotels("ROME", "Low")] == ["Hotel Roma", "Albergo"]
+    assert [hotel.name for hotel in catalog.hotels("Rome")] == ["Palazzo", "Hotel Roma", "Albergo"]
+    assert catalog.hotels("Oslo", "low") == ()
+    assert catalog.restaurants("rome", "italian")[0].name == "Roscioli"
+    assert catalog.find("hotel roma")[0].price_per_night_usd == 80
+
+def test_sqlite_round_trip(tmp_path):
+    catalog = Catalog.load(CATALOG_PATH)
+    path = str(tmp_path / "catalog.sqlite3")
+
+    catalog.to_sqlite(path)
+    loaded = Catalog.load(path)
+
+    assert loaded.tables == catalog.tables
+    assert loaded.hotels("Paris", "high") == catalog.hotels("Paris", "high")
@@ -0,0 +1,34 @@
+import chat_view
+from chat_view import chat_html, render_chat, render_message
+
+HISTORY = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i}"} for i in range(500)]
+
+def test_only_the_last_page_is_rendered_until_earlier_ones_are_loaded(monkeypatch):
+    rendered, clicks = [], iter([False, True])
+    monkeypatch.setattr(chat_view.st, "markdown", lambda body, **kwargs: rendered.append(body))
+    monkeypatch.setattr(chat_view.st, "button", lambda label, **kwargs: next(clicks))
+    state = {}
+
+    render_chat(HISTORY, page_size=20, state=state)
+    assert rendered[-1].count("-message'>") == 20 and "message 480<" in rendered[-1] and "message 479<" not in rendered[-1]
+
+    render_chat(HISTORY, page_size=20, state=state)
+    assert rendered[-1].count("-message'>") == 40 and state["chat_shown"] == 40
+
+def test_messages_are_escaped_once_and_memoized():
+    render_message.cache_clear()
+    message = {"role": "assistant", "content": "<script>x</script>\nBook: https://mockhotels.com/book/roma"}
+
+    body = chat_html([message, message])
+    assert "<script>" not in body and "&lt;script&gt;" in body
+    assert '<a href="https://mockhotels.com/book/roma" target="_blank">' in body and "<br />" in body
+    assert render_message.cache_info().hits == 1 and render_message.cache_info().misses == 1
+
+def test_markdown_is_rendered_and_urls_stop_before_punctuation():
+    body = render_message("assistant", "**Delta**: [Book now](https://mockflights.com/book/delta).\n"
+                                       "Hotel (https://mockhotels.com/book/roma). <b>raw</b>")
+
+    assert "<strong>Delta</strong>" in body
+    assert '<a href="https://mockflights.com/book/delta" target="_blank">Book now</a>.' in body
+    assert '(<a href="https://mockhotels.com/book/roma" target="_blank">https://mockhotels.com/book/roma</a>).' in body
+    assert "<b>" not in body and "&lt;b&gt;raw&lt;/b&gt;" in body
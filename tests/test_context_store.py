@@ -0,0 +1,113 @@
+import uuid
+import datetime
+from types import SimpleNamespace
+
+import pytest
+import streamlit as st
+
+import context_manager
+from context_manager import ContextManager
+from context_store import ContextStore, FileContextStore, InMemoryContextStore, SQLiteContextStore, deserialize_context, serialize_context
+
+class CountingStore(InMemoryContextStore):
+    def __init__(self):
+        super().__init__()
+        self.saves = 0
+
+    def save(self, session_id, data):
+        self.saves += 1
+        super().save(session_id, data)
+
+class Clock:
+    def __init__(self):
+        self.calls = 0
+
+    def now(self):
+        self.calls += 1
+        return datetime.datetime(2025, 5, 1, 10, 0, self.calls)
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite", "file"])
+def test_stores_round_trip_contexts(backend, tmp_path):
+    store = {
+        "memory": lambda: InMemoryContextStore(),
+        "sqlite": lambda: SQLiteContextStore(str(tmp_path / "context.sqlite3")),
+        "file": lambda: FileContextStore(str(tmp_path / "contexts"))
+    }[backend]()
+    session_id = uuid.uuid4().hex
+    context = {"location": "Berlin", "mentioned_destinations": {"Rome", "Paris"}}
+
+    assert store.load(session_id) is None
+    store.save(session_id, serialize_context(context))
+    assert deserialize_context(store.load(session_id)) == context
+
+    store.delete(session_id)
+    assert store.load(session_id) is None
+
+def test_store_missing_a_method_fails_when_created():
+    class ReadOnlyStore(ContextStore):
+        def load(self, session_id):
+            return None
+
+    with pytest.raises(TypeError, match="save"):
+        ReadOnlyStore()
+
+def test_context_is_written_once_per_run_and_shared_across_replicas():
+    store, session_id = CountingStore(), uuid.uuid4().hex
+    st.session_state.clear()
+
+    manager = ContextManager(store, session_id)
+    manager.update_context_from_text("Find flights from London to Rome from 2025-05-01 to 2025-05-07 on a budget")
+    manager.add_search("flights to Rome")
+    manager.save()
+    manager.save()
+    assert store.saves == 1
+
+    # Another replica has no session_state for this session and reads the context from the store
+    st.session_state.clear()
+    replica = ContextManager(store, session_id)
+    assert replica.get_user_context()["current_trip"]["destination"] == "Rome"
+    assert "Rome" in replica.get_user_context()["mentioned_destinations"]
+    replica.save()
+    assert store.saves == 1
+    st.session_state.clear()
+
+def test_batch_tracks_changes_and_caches_the_serialized_form(monkeypatch):
+    st.session_state.clear()
+    manager = ContextManager(InMemoryContextStore(), uuid.uuid4().hex)
+    clock = Clock()
+    monkeypatch.setattr(context_manager, "datetime", SimpleNamespace(datetime=clock))
+
+    first = manager.to_dict()
+    assert manager.serialized() is manager.serialized()
+
+    with manager.batch():
+        manager.set_location("Berlin")
+        manager.update_current_trip(destination="Rome", budget="low")
+        manager.add_search("hotels in Rome")
+    context = manager.to_dict()
+    assert context["last_updated"] == "2025-05-01T10:00:01" and clock.calls == 1
+    assert manager.changed_fields() == {"location", "current_trip", "mentioned_destinations", "recent_searches", "last_updated"}
+    assert context["location"] == "Berlin" and first["location"] is None
+
+    # Repeating what the context already holds is not a change
+    manager.save()
+    manager.update_current_trip(destination="Rome")
+    manager.add_search("hotels in Rome")
+    assert manager.changed_fields() == set() and clock.calls == 1
+    st.session_state.clear()
+
+def test_context_comes_from_user_turns_and_tool_calls_not_assistant_prose():
+    st.session_state.clear()
+    manager = ContextManager(InMemoryContextStore(), uuid.uuid4().hex)
+
+    manager.update_context({"role": "assistant", "content": "Barcelona, Berlin and Vienna are lovely in May"})
+    manager.update_from_tool_calls([{"tool": "search_flights", "arguments": {
+        "from_location": "London", "to_location": "Rome", "date_range": "2025-05-01 to 2025-05-07"}}])
+    context = manager.to_dict()
+    assert context["mentioned_destinations"] == ["Rome"]
+    assert context["current_trip"]["origin"] == "London" and context["current_trip"]["date_range"] == "2025-05-01 to 2025-05-07"
+
+    streaming = ContextManager(InMemoryContextStore(), uuid.uuid4().hex, extract_from=["user", "assistant"])
+    assert "".join(streaming.extract_stream(["Try Barce", "lona or Vie", "nna on a budget"])) == "Try Barcelona or Vienna on a budget"
+    assert streaming.to_dict()["mentioned_destinations"] == ["Barcelona", "Vienna"]
+    st.session_state.clear()
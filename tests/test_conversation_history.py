@@ -0,0 +1,39 @@
+import pytest
+
+from conversation_history import SUMMARY_HEADER, ConversationHistory, summarize_turns
+from mcp_client import llm_client
+from prompts import count_tokens
+
+def test_history_tokens_stay_bounded_and_summary_only_changes_on_rollover():
+    calls = []
+
+    def summarize(summary, turns, max_tokens):
+        calls.append(len(turns))
+        return summarize_turns(summary, turns, max_tokens)
+
+    history = ConversationHistory(window_tokens=200, summary_tokens=60, summarize=summarize)
+    history.add("user", "Find flights from London to Rome in May.")
+    assert history.messages() == [{"role": "user", "content": "Find flights from London to Rome in May."}] and not calls
+
+    sizes = []
+    for turn in range(300):
+        history.add("user", f"Question {turn}: what about hotels near the station? " * 3)
+        history.add("assistant", f"Answer {turn}. " + "Here are some options with prices and links. " * 40)
+        sizes.append(sum(count_tokens(message["content"]) for message in history.messages()))
+
+    # Long answers are truncated to half the window, so the prompt cost is flat from the first rollover on
+    assert max(sizes) <= 200 + 60 + count_tokens(SUMMARY_HEADER) and calls
+    assert history.messages()[0]["content"].startswith(SUMMARY_HEADER) and "Answer 298." in history.messages()[0]["content"]
+
+@pytest.mark.asyncio
+async def test_llm_calls_carry_the_history(fake_openai):
+    fake_openai.reply = "Rome in May is lovely"
+    history = ConversationHistory()
+    history.add("user", "I want to go to Rome")
+    history.add("assistant", "Great choice!")
+
+    await llm_client("When should I go?", {"history": history.messages()})
+
+    messages = fake_openai.requests[-1]["messages"]
+    assert [message["role"] for message in messages] == ["system", "user", "assistant", "user"]
+    assert messages[1]["content"] == "I want to go to Rome" and messages[-1]["content"] == "When should I go?"
@@ -0,0 +1,75 @@
+import datetime
+
+from extractors import (
+    DestinationMatcher, IncrementalExtractor, extract_destinations, extract_travel_details, find_destinations, parse_date_range
+)
+
+TODAY = datetime.date(2025, 3, 12)
+
+def test_destinations_are_returned_in_order_of_appearance():
+    assert extract_destinations("Fly from London to Paris, then back to London") == ["London", "Paris"]
+
+def test_destination_offsets():
+    text = "Trip from new york to Hong Kong"
+
+    assert find_destinations(text) == [("New York", 10, 18), ("Hong Kong", 22, 31)]
+
+def test_uppercase_aliases_are_case_sensitive():
+    assert extract_destinations("Tell us about NYC") == ["New York"]
+    assert extract_destinations("Weekend in vegas") == ["Las Vegas"]
+
+def test_longest_name_wins_and_whole_words_only():
+    matcher = DestinationMatcher(["York", "New York", "New York City"])
+
+    assert matcher.extract("Visiting New York City soon") == ["New York City"]
+    assert matcher.extract("A New Yorker in Yorkshire") == []
+
+def test_dates_are_resolved_to_calendar_ranges():
+    details = extract_travel_details("Flights 2025-05-01 to 2025-05-07, or 21st May to 3rd June, or July 2025", today=TODAY)
+
+    assert [str(date_range) for date_range in details.date_ranges] == [
+        "2025-05-01 to 2025-05-07", "2025-05-21 to 2025-06-03", "2025-07-01 to 2025-07-31"
+    ]
+
+def test_digits_inside_longer_numbers_are_not_days():
+    assert extract_travel_details("Budget 2025 May trip to Rome", TODAY).date_ranges == []
+    assert extract_travel_details("Room 112 march past the hall", TODAY).date_ranges == []
+    assert extract_travel_details("Flight 42025-05-01 to 2025-05-07", TODAY).date_ranges == []
+    assert [str(date_range) for date_range in extract_travel_details("Room 112, 12 March", TODAY).date_ranges] == ["2025-03-12 to 2025-03-12"]
+
+def test_relative_dates_use_the_reference_date():
+    assert str(parse_date_range("next week", today=TODAY)) == "2025-03-17 to 2025-03-23"
+    assert str(parse_date_range("next month", today=TODAY)) == "2025-04-01 to 2025-04-30"
+    assert str(parse_date_range("somewhere warm in January", today=TODAY)) == "2026-01-01 to 2026-01-31"
+    assert parse_date_range("2025-02-30 to 2025-03-02", today=TODAY) is None
+
+def test_first_budget_word_wins():
+    assert extract_travel_details("A medium budget hotel").budget == "medium"
+    assert extract_travel_details("Luxury, not cheap").budget == "high"
+    assert extract_travel_details("Hotels in Paris").budget is None
+
+def test_incremental_extraction_matches_across_chunk_boundaries():
+    text = "Fly from New York to Hong Kong from 21st May to 3rd June, then a cheap hotel in Paris. " * 20
+    extractor = IncrementalExtractor(TODAY)
+
+    found = []
+    for start in range(0, len(text), 7):
+        found += extractor.feed(text[start:start + 7])
+    found += extractor.finish()
+
+    full = extract_travel_details(text, TODAY)
+    assert found == extractor.destinations == ["New York", "Hong Kong", "Paris"]
+    assert extractor.details() == full and len(full.date_ranges) == 20
+    # Only the carry-over tail is held between chunks
+    assert len(extractor._buffer) < extractor.carry_over + 7
+
+def test_incremental_extraction_of_text_without_spaces_stays_bounded():
+    text = "東京" * 20000 + " from 21st May to 3rd June"
+    extractor = IncrementalExtractor(TODAY)
+
+    for start in range(0, len(text), 20):
+        extractor.feed(text[start:start + 20])
+        assert len(extractor._buffer) < extractor.carry_over + 20
+    extractor.finish()
+
+    assert extractor.details() == extract_travel_details(text, TODAY)
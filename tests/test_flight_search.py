@@ -0,0 +1,60 @@
+import datetime
+import random
+
+from catalog import City, load_catalog
+from flight_search import FlightSchedule
+
+AIRPORTS = [
+    City("New York", "United States", "JFK", 40.64, -73.78),
+    City("London", "United Kingdom", "LHR", 51.47, -0.45),
+    City("Paris", "France", "CDG", 49.01, 2.55),
+    City("Rome", "Italy", "FCO", 41.80, 12.24),
+    City("Athens", "Greece", "ATH", 37.94, 23.94),
+    City("Dubai", "United Arab Emirates", "DXB", 25.25, 55.37),
+    City("Tokyo", "Japan", "HND", 35.55, 139.78),
+    City("Sydney", "Australia", "SYD", -33.94, 151.18)
+]
+
+MAY_1, MAY_14 = datetime.date(2025, 5, 1), datetime.date(2025, 5, 14)
+
+def test_schedule_is_deterministic():
+    first = FlightSchedule(AIRPORTS, seed=3).search("JFK", "FCO", MAY_1, MAY_14)
+    second = FlightSchedule(AIRPORTS, seed=3).search("JFK", "FCO", MAY_1, MAY_14)
+
+    assert first and [itinerary.to_option("New York", "Rome") for itinerary in first] == \
+        [itinerary.to_option("New York", "Rome") for itinerary in second]
+
+def test_search_returns_best_itineraries_within_the_window():
+    schedule = FlightSchedule(AIRPORTS, seed=3)
+
+    for sort_by, key in (("price", lambda itinerary: itinerary.price), ("duration", lambda itinerary: itinerary.duration)):
+        itineraries = schedule.search("JFK", "SYD", MAY_1, MAY_14, sort_by=sort_by, max_stops=2, limit=4)
+
+        assert len(itineraries) == 4
+        assert [key(itinerary) for itinerary in itineraries] == sorted(key(itinerary) for itinerary in itineraries)
+        for itinerary in itineraries:
+            assert MAY_1 <= itinerary.legs[0].departure.date() <= MAY_14
+            assert itinerary.legs[0].service.origin == "JFK" and itinerary.legs[-1].service.destination == "SYD"
+            assert len(itinerary.legs) <= 3
+            for previous, leg in zip(itinerary.legs, itinerary.legs[1:]):
+                assert leg.service.origin == previous.service.destination
+                assert leg.departure - previous.arrival >= datetime.timedelta(minutes=45)
+
+def test_direct_only_search():
+    schedule = FlightSchedule(AIRPORTS, seed=3)
+    direct = [destination for destination in schedule.routes["LHR"]]
+
+    assert all(len(itinerary.legs) == 1 for itinerary in schedule.search("LHR", direct[0], MAY_1, MAY_1, max_stops=0))
+    assert schedule.search("LHR", "LHR", MAY_1, MAY_14) == []
+
+def test_fewer_results_are_a_prefix_of_more():
+    schedule = FlightSchedule.from_catalog(load_catalog())
+    codes = sorted(schedule.airports)
+    rng = random.Random(5)
+    pairs = [("AMS", "BKK")] + [tuple(rng.sample(codes, 2)) for _ in range(20)]
+
+    for sort_by in ("price", "duration"):
+        for origin, destination in pairs:
+            more = schedule.search(origin, destination, MAY_1, MAY_14, sort_by=sort_by, limit=12)
+            for limit in (1, 3, 6):
+                assert schedule.search(origin, destination, MAY_1, MAY_14, sort_by=sort_by, limit=limit) == more[:limit]
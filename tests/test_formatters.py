@@ -0,0 +1,58 @@
+import json
+from unittest.mock import patch
+
+import pytest
+from mcp import types
+
+import formatters
+import tracing
+from formatters import FORMATTERS, format_tool_result, formatter
+from mcp_client import run_tool_call
+from tool_cache import ToolResultCache
+from tool_records import HotelOption, ToolOutput, TransportOption
+
+def test_each_formatter_renders_markdown_and_data():
+    hotels = ToolOutput((HotelOption("Hotel Roma", "Rome", 150, 4.4),))
+    formatted = format_tool_result({"tool": "recommend_hotels", "arguments": {"location": "Rome"}}, hotels,
+                                   {"mentioned_destinations": ["Rome"]})
+    assert "Hotel Roma - $150 per night" in formatted.markdown
+    assert "https://mockhotels.com/book/hotel-roma" in formatted.markdown and "Since you mentioned Rome" in formatted.markdown
+    assert formatted.data == [hotels.items[0]._asdict()]
+
+    transport = ToolOutput((TransportOption("bus", "Rome to Florence", "3h", 20), TransportOption("train", "Rome to Florence", "1h 30m", 40)))
+    markdown = format_tool_result({"tool": "transport_options", "arguments": {"from_location": "Rome", "to_location": "Florence"}},
+                                  transport).markdown
+    assert "• By bus: 3h journey time - $20" in markdown and "• By train: 1h 30m" in markdown
+
+    empty = format_tool_result({"tool": "recommend_attractions", "arguments": {"location": "Rome"}}, ToolOutput())
+    assert empty.markdown == FORMATTERS["recommend_attractions"].empty
+
+def test_new_tool_only_needs_a_registered_formatter(monkeypatch):
+    monkeypatch.setattr(formatters, "FORMATTERS", dict(FORMATTERS))
+
+    @formatter("currency_rates", failure="No rates right now.")
+    def format_rates(tool_call, output, context=None):
+        return f"1 EUR = {output.text} USD"
+
+    @formatter("broken_tool", failure="Broken.")
+    def format_broken(tool_call, output, context=None):
+        raise KeyError("missing")
+
+    assert format_tool_result({"tool": "currency_rates", "arguments": {}}, ToolOutput(text="1.08")).markdown == "1 EUR = 1.08 USD"
+    assert format_tool_result({"tool": "broken_tool", "arguments": {}}, ToolOutput(text="")).markdown == "Broken."
+    assert format_tool_result({"tool": "unknown", "arguments": {}}, ToolOutput()).markdown == formatters.UNHANDLED_TOOL
+
+class HotelSession:
+    async def call_tool(self, name, arguments=None):
+        page = {"items": [HotelOption("Hotel Roma", "Rome", 150, 4.4)._asdict()], "next_cursor": None}
+        return types.CallToolResult(content=[types.TextContent(type="text", text=json.dumps(page))])
+
+@pytest.mark.asyncio
+async def test_formatting_time_is_recorded_per_tool():
+    tracing.reset_metrics()
+
+    with patch("mcp_client.tool_cache", ToolResultCache(ttls={}, default_ttl=0)):
+        section, _ = await run_tool_call(HotelSession(), {"tool": "recommend_hotels", "arguments": {"location": "Rome"}})
+
+    assert "Hotel Roma" in section
+    assert 'jetzy_format_duration_seconds_count{tool="recommend_hotels"} 1' in tracing.render_metrics()
@@ -0,0 +1,76 @@
+from intent_router import IntentRouter
+
+def test_routes_flight_query_with_explicit_dates():
+    router = IntentRouter(threshold=0.75)
+
+    [tool_call] = router.route("Find flights from New York to Paris from 2025-05-01 to 2025-05-14")
+
+    assert tool_call["tool"] == "search_flights"
+    assert tool_call["arguments"] == {
+        "from_location": "New York",
+        "to_location": "Paris",
+        "date_range": "2025-05-01 to 2025-05-14"
+    }
+    assert tool_call["confidence"] == 1.0
+
+def test_routes_hotel_query_with_budget_from_context():
+    router = IntentRouter(threshold=0.75)
+    context = {"current_trip": {"budget": "high"}}
+
+    [tool_call] = router.route("hotels in Rome", context)
+
+    assert tool_call["tool"] == "recommend_hotels"
+    assert tool_call["arguments"] == {"location": "Rome", "budget": "high"}
+    assert tool_call["confidence"] == 0.9
+
+def test_compound_query_routes_every_tool():
+    router = IntentRouter(threshold=0.75)
+
+    tool_calls = router.route("Plan a trip to Rome: flights from London 2025-05-01 to 2025-05-08, a mid-range hotel and things to do")
+
+    assert [tool_call["tool"] for tool_call in tool_calls] == ["search_flights", "recommend_hotels", "recommend_attractions"]
+    assert tool_calls[0]["arguments"] == {
+        "from_location": "London",
+        "to_location": "Rome",
+        "date_range": "2025-05-01 to 2025-05-08"
+    }
+    assert tool_calls[1]["arguments"] == {"location": "Rome", "budget": "medium"}
+    assert tool_calls[2]["arguments"] == {"location": "Rome"}
+    assert router.get_stats()["by_tool"] == {"search_flights": 1, "recommend_hotels": 1, "recommend_attractions": 1}
+
+def test_compound_plan_is_scored_like_a_single_intent():
+    router = IntentRouter(threshold=0.75)
+    query = "What is the weather in Paris like in the train station"
+
+    assert router.route(query) is None
+    confidences = {tool_call["tool"]: tool_call["confidence"] for tool_call in router.classify_all(query)}
+    assert confidences["transport_options"] < 0.75 and confidences["seasonal_travel_advice"] == 1.0
+
+    # With the origin stated, the same two intents are routed
+    tool_calls = router.route("Train or bus from London to Paris, and the best time to visit Paris")
+    assert [tool_call["tool"] for tool_call in tool_calls] == ["transport_options", "seasonal_travel_advice"]
+
+def test_ambiguous_query_falls_back_to_llm():
+    router = IntentRouter(threshold=0.75)
+
+    assert router.route("flights and hotels in Paris") is None
+    assert router.route("Tell me a joke") is None
+    # A tool's keyword in a question asking how or whether isn't a request for options
+    assert router.route("how do I get from the airport to my hotel in Paris") is None
+    assert router.route("Is it safe to eat street food in Bangkok?") is None
+
+    stats = router.get_stats()
+    assert stats["total"] == 4
+    assert stats["fallback"] == 4
+    assert stats["hit_rate"] == 0.0
+
+def test_hit_rate_counts_local_routes():
+    router = IntentRouter(threshold=0.75)
+
+    router.route("What are the top attractions to visit in Tokyo?")
+    router.route("best time to visit Japan")
+    router.route("Tell me a joke")
+
+    stats = router.get_stats()
+    assert stats["by_tool"] == {"recommend_attractions": 1, "seasonal_travel_advice": 1}
+    assert round(stats["hit_rate"], 2) == 0.67
@@ -0,0 +1,56 @@
+import pytest
+
+import async_runtime
+from llm import close_openai_client, get_openai_client
+from mcp_client import llm_client, llm_client_stream
+
+@pytest.mark.asyncio
+async def test_llm_client_uses_fake_endpoint(fake_openai):
+    fake_openai.reply = "Try the Louvre"
+
+    response = await llm_client("What should I see in Paris?", {"location": "London"})
+
+    assert response == "Try the Louvre"
+    messages = fake_openai.requests[0]["messages"]
+    assert messages[-1] == {"role": "user", "content": "What should I see in Paris?"}
+    assert "London" in messages[0]["content"]
+
+@pytest.mark.asyncio
+async def test_llm_client_reuses_shared_connection(fake_openai):
+    client = get_openai_client()
+
+    for city in ("Paris", "Rome", "Tokyo"):
+        await llm_client(f"What should I see in {city}?")
+
+    assert get_openai_client() is client
+    assert len(fake_openai.requests) == 3
+    assert len(fake_openai.client_ports) == 1
+
+@pytest.mark.asyncio
+async def test_recreating_the_client_registers_no_more_shutdown_hooks(fake_openai):
+    hooks = len(async_runtime._shutdown_hooks)
+
+    for _ in range(3):
+        get_openai_client()
+        await close_openai_client()
+
+    assert len(async_runtime._shutdown_hooks) == hooks
+    assert async_runtime._shutdown_hooks.count(close_openai_client) <= 1
+
+@pytest.mark.asyncio
+async def test_repeated_question_is_answered_from_cache(fake_openai):
+    await llm_client("What should I see in Paris?")
+    response = await llm_client("what should I see in Paris")
+
+    assert response == fake_openai.reply
+    assert len(fake_openai.requests) == 1
+
+@pytest.mark.asyncio
+async def test_llm_client_stream_yields_deltas(fake_openai):
+    fake_openai.reply = "Visit the Colosseum early"
+
+    deltas = [delta async for delta in llm_client_stream("What should I see in Rome?")]
+
+    assert len(deltas) == 4
+    assert "".join(deltas).strip() == "Visit the Colosseum early"
+    assert fake_openai.requests[0]["stream"] is True
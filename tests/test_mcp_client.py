@@ -5,10 +5,224 @@ import asyncio
 from unittest.mock import patch, MagicMock, AsyncMock
 import os
 import sys
+import time
+from contextlib import asynccontextmanager
+
+from mcp import types
 
 from mcp_client import (
     llm_client,
     get_prompt_to_identify_tool_and_arguments,
     run_async,
-    run_tool_query
-)
\ No newline at end of file
+    run_async_stream,
+    run_tool_query,
+    decode_tool_result,
+    get_tool_selection_stats
+)
+from prompts import count_tokens
+from response_cache import response_cache
+from tool_cache import ToolResultCache
+
+TOOL_OUTPUTS = {
+    "search_flights": [{"airline": "Delta", "price_usd": 420.0, "departure_date": "2025-05-02", "return_date": "2025-05-09"}],
+    "recommend_hotels": [{"name": "Hotel Roma", "location": "Rome", "price_per_night_usd": 150, "rating": 4.4}],
+    "recommend_attractions": [{"name": "Colosseum", "location": "Rome", "description": "Ancient amphitheatre"}]
+}
+
+class SlowSession:
+    """
+    Stand-in for a pooled MCP session whose tools each take a fixed time
+    """
+    def __init__(self, delays):
+        self.delays = delays
+
+    async def list_tools(self):
+        return types.ListToolsResult(tools=[
+            types.Tool(name=name, description=name, inputSchema={"type": "object"}) for name in TOOL_OUTPUTS
+        ])
+
+    async def call_tool(self, name, arguments=None):
+        await asyncio.sleep(self.delays[name])
+        # Like the real server, a tool returning one dict in a list sends that dict as the content
+        return types.CallToolResult(content=[types.TextContent(type="text", text=json.dumps(TOOL_OUTPUTS[name][0]))])
+
+class SlowPool:
+    def __init__(self, delays):
+        self._session = SlowSession(delays)
+        self.checkouts = 0
+
+    async def list_tools(self):
+        return await self._session.list_tools()
+
+    @asynccontextmanager
+    async def session(self):
+        self.checkouts += 1
+        yield self._session
+
+def use_slow_tools(delays):
+    return (
+        patch("mcp_client.get_session_pool", AsyncMock(return_value=SlowPool(delays))),
+        patch("mcp_client.tool_cache", ToolResultCache(ttls={}, default_ttl=0))
+    )
+
+COMPOUND_QUERY = "Plan a trip to Rome: flights from London 2025-05-01 to 2025-05-08, a mid-range hotel and things to do"
+
+@pytest.mark.asyncio
+async def test_run_async_reuses_background_loop(fake_openai):
+    fake_openai.reply = "Here is a plain answer"
+
+    # Simulate two Streamlit script threads submitting queries concurrently
+    responses = await asyncio.gather(
+        asyncio.to_thread(run_async, "Tell me something about travel"),
+        asyncio.to_thread(run_async, "Tell me something else about travel")
+    )
+
+    assert responses == ["Here is a plain answer", "Here is a plain answer"]
+
+    # A later rerun reuses one of the kept-alive connections instead of opening a new one
+    await asyncio.to_thread(run_async, "One more question")
+    assert len(fake_openai.requests) == 3
+    assert len(fake_openai.client_ports) <= 2
+
+@pytest.mark.asyncio
+async def test_run_async_stream_yields_chunks(fake_openai):
+    fake_openai.reply = "Cheap flights to Rome are easy to book at https://mockflights.com/book/delta"
+
+    chunks = await asyncio.to_thread(lambda: list(run_async_stream("Flights to Rome")))
+
+    assert len(chunks) > 1
+    assert "".join(chunks).strip() == fake_openai.reply
+
+@pytest.mark.asyncio
+async def test_compound_query_runs_tools_concurrently():
+    pool_patch, cache_patch = use_slow_tools({"search_flights": 0.3, "recommend_hotels": 0.2, "recommend_attractions": 0.1})
+
+    with pool_patch, cache_patch:
+        start = time.perf_counter()
+        response = await run_tool_query(COMPOUND_QUERY)
+        elapsed = time.perf_counter() - start
+
+    # Close to the slowest tool rather than the 0.6s sum
+    assert elapsed < 0.5
+    assert response.index("Delta") < response.index("Hotel Roma") < response.index("Colosseum")
+
+@pytest.mark.asyncio
+async def test_slow_tool_times_out_without_losing_other_sections():
+    pool_patch, cache_patch = use_slow_tools({"search_flights": 5, "recommend_hotels": 0, "recommend_attractions": 0})
+
+    with pool_patch, cache_patch, patch("mcp_client.TOOL_TIMEOUT", 0.2):
+        response = await run_tool_query(COMPOUND_QUERY)
+
+    assert "search flights took too long" in response
+    assert "Hotel Roma" in response
+    assert "Colosseum" in response
+
+@pytest.mark.asyncio
+async def test_llm_selects_tools_through_native_function_calling(fake_openai):
+    pool_patch, cache_patch = use_slow_tools({"search_flights": 0, "recommend_hotels": 0, "recommend_attractions": 0})
+    fake_openai.rules = [("ideas for my days", json.dumps({"tool": "recommend_attractions", "arguments": {"location": "Rome"}}))]
+
+    with pool_patch, cache_patch:
+        response = await run_tool_query("I'd love some ideas for my days away")
+
+    [request] = fake_openai.requests
+    assert [tool["function"]["name"] for tool in request["tools"]] == list(TOOL_OUTPUTS)
+    assert "Colosseum" in response
+
+@pytest.mark.asyncio
+async def test_sessions_are_only_checked_out_for_tool_calls(fake_openai):
+    pool = SlowPool({"search_flights": 0, "recommend_hotels": 0, "recommend_attractions": 0})
+    fake_openai.reply = "Happy to help you plan it"
+
+    with patch("mcp_client.get_session_pool", AsyncMock(return_value=pool)), \
+            patch("mcp_client.tool_cache", ToolResultCache(ttls={}, default_ttl=0)):
+        assert await run_tool_query("Could you help me plan something nice?") == "Happy to help you plan it"
+        assert pool.checkouts == 0
+
+        await run_tool_query(COMPOUND_QUERY)
+        assert pool.checkouts == 1
+
+@pytest.mark.asyncio
+async def test_malformed_tool_arguments_are_counted(fake_openai):
+    pool_patch, cache_patch = use_slow_tools({"search_flights": 0, "recommend_hotels": 0, "recommend_attractions": 0})
+    fake_openai.rules = [("ideas for my days", json.dumps({"tool": "recommend_attractions", "arguments": "{location: Rome"}))]
+    before = get_tool_selection_stats().get("malformed", 0)
+
+    with pool_patch, cache_patch:
+        response = await run_tool_query("I'd love some ideas for my days away")
+
+    assert "Colosseum" not in response
+    assert get_tool_selection_stats()["malformed"] == before + 1
+
+def request_tokens(request):
+    return sum(count_tokens(message["content"]) for message in request["messages"]) + \
+        (count_tokens(json.dumps(request["tools"])) if request.get("tools") else 0)
+
+@pytest.mark.asyncio
+async def test_tool_selection_stays_within_budget_with_a_long_history(fake_openai):
+    fake_openai.reply = "Happy to help you plan it"
+    history = [{"role": "user" if turn % 2 == 0 else "assistant", "content": f"Turn {turn}: " + "tell me more about the trip. " * 20}
+               for turn in range(8)]
+    user_context = {
+        "location": "London",
+        "current_trip": {"origin": "London", "destination": "Rome", "date_range": "2025-05-01 to 2025-05-08", "budget": "high"},
+        "mentioned_destinations": ["Rome", "Paris", "Vienna", "Berlin"]
+    }
+
+    with patch("mcp_client.get_session_pool", AsyncMock(return_value=SlowPool({}))):
+        # The request with the history alone, which no amount of trimming gets below
+        await run_tool_query("Could you help me plan something nice?", {"history": history})
+        floor = request_tokens(fake_openai.requests[-1])
+        response_cache.clear()
+
+        # A budget with no room for the user context on top of the history
+        with patch("prompts.DEFAULT_INPUT_TOKEN_BUDGET", floor + 5):
+            await run_tool_query("Could you help me plan something nice?", dict(user_context, history=history))
+
+    assert len(fake_openai.requests) == 2
+    assert request_tokens(fake_openai.requests[-1]) <= floor + 5
+
+HOTELS = [{"name": f"Hotel {i}", "location": "Rome", "price_per_night_usd": 100 + i, "rating": 4.0} for i in range(7)]
+
+class PagedSession(SlowSession):
+    """
+    Serves recommend_hotels in pages of three, with the offset as the cursor
+    """
+    def __init__(self):
+        super().__init__({})
+        self.cursors = []
+
+    async def call_tool(self, name, arguments=None):
+        self.cursors.append(arguments.get("cursor", ""))
+        offset = int(arguments.get("cursor") or 0)
+        page = {"items": HOTELS[offset:offset + 3], "next_cursor": str(offset + 3) if offset + 3 < len(HOTELS) else None}
+        return types.CallToolResult(content=[types.TextContent(type="text", text=json.dumps(page))])
+
+@pytest.mark.asyncio
+async def test_show_more_fetches_the_next_page():
+    pool = SlowPool({})
+    pool._session = PagedSession()
+    context = {"conversation_id": "paging-test"}
+
+    with patch("mcp_client.get_session_pool", AsyncMock(return_value=pool)), \
+            patch("mcp_client.tool_cache", ToolResultCache(ttls={}, default_ttl=0)):
+        first = await run_tool_query("Find a hotel in Rome", context)
+        second = await run_tool_query("show more", context)
+        third = await run_tool_query("more hotels please", context)
+
+    assert "Hotel 2" in first and "Hotel 3" not in first and "show more" in first
+    assert "Hotel 3" in second and "Hotel 5" in second and "Hotel 2" not in second
+    assert "Hotel 6" in third and "show more" not in third
+    assert pool._session.cursors == ["", "3", "6"]
+    assert [tool_call["tool"] for tool_call in context["tool_calls"]] == ["recommend_hotels"]
+
+def test_tool_results_are_decoded_once_into_records():
+    # FastMCP sends a returned list as one text item per element
+    result = types.CallToolResult(content=[types.TextContent(type="text", text=json.dumps(hotel)) for hotel in HOTELS[:2]])
+    output = decode_tool_result("recommend_hotels", result)
+
+    assert [hotel.name for hotel in output.items] == ["Hotel 0", "Hotel 1"]
+    assert output.items[0].price_per_night_usd == 100 and output.next_cursor is None
+
+    advice = types.CallToolResult(content=[types.TextContent(type="text", text="Visit in spring.")])
+    assert decode_tool_result("seasonal_travel_advice", advice).text == "Visit in spring."
@@ -0,0 +1,93 @@
+import json
+import datetime
+
+import jsonschema
+
+import mcp_server
+from extractors import DateRange
+import tool_records
+
+def test_identical_requests_return_identical_results():
+    first = [
+        mcp_server.search_flights("London", "Paris", "2025-05-01 to 2025-05-08"),
+        mcp_server.recommend_hotels("Rome", "high"),
+        mcp_server.recommend_restaurants("Tokyo", "japanese")
+    ]
+    second = [
+        mcp_server.search_flights("London", "Paris", "2025-05-01 to 2025-05-08"),
+        mcp_server.recommend_hotels("Rome", "high"),
+        mcp_server.recommend_restaurants("Tokyo", "japanese")
+    ]
+
+    assert json.dumps(first) == json.dumps(second)
+
+def test_seed_and_unseeded_mode(monkeypatch):
+    arguments = {"location": " Rome ", "budget": "high"}
+
+    assert mcp_server.tool_rng("recommend_hotels", arguments).random() == \
+        mcp_server.tool_rng("recommend_hotels", {"location": "rome", "budget": "HIGH"}).random()
+    assert mcp_server.tool_rng("recommend_hotels", arguments, seed="1").random() != \
+        mcp_server.tool_rng("recommend_hotels", arguments, seed="2").random()
+
+    monkeypatch.setattr(mcp_server, "SIMULATION_SEED", "random")
+    assert mcp_server.tool_rng("recommend_hotels", arguments).random() != \
+        mcp_server.tool_rng("recommend_hotels", arguments).random()
+
+def test_pages_follow_the_full_result_order():
+    pairs = [("London", "Tokyo"), ("Amsterdam", "Bangkok"), ("Paris", "Sydney"), ("New York", "Rome"),
+             ("Dubai", "London"), ("Tokyo", "Athens"), ("Bangkok", "New York"), ("Rome", "Dubai")]
+
+    for from_location, to_location in pairs:
+        for sort_by in ("price", "duration"):
+            full = mcp_server.search_flights(from_location, to_location, "May 2025", sort_by=sort_by, limit=12)["items"]
+
+            pages, cursor = [], ""
+            for limit in (1, 3, 2, 6):
+                page = mcp_server.search_flights(from_location, to_location, "May 2025", sort_by=sort_by, limit=limit, cursor=cursor)
+                pages.append([json.dumps(item, sort_keys=True) for item in page["items"]])
+                cursor = page["next_cursor"]
+
+            flattened = [item for page in pages for item in page]
+            assert len(set(flattened)) == len(flattened)
+            assert flattened == [json.dumps(item, sort_keys=True) for item in full]
+
+    first = mcp_server.search_flights("London", "Tokyo", "May 2025", limit=4)
+    assert "error" in mcp_server.recommend_hotels("Rome", cursor=first["next_cursor"])
+    assert mcp_server.recommend_attractions("Paris", limit=50)["next_cursor"] is None
+
+def test_relative_dates_are_ranked_afresh_each_day(monkeypatch):
+    today = [datetime.date(2025, 5, 1)]
+    monkeypatch.setattr(mcp_server, "parse_date_range",
+                        lambda text: DateRange(today[0] + datetime.timedelta(days=7), today[0] + datetime.timedelta(days=13), text))
+
+    first = mcp_server.search_flights("London", "Tokyo", "next week", limit=3)
+    today[0] += datetime.timedelta(days=10)
+    later = mcp_server.search_flights("London", "Tokyo", "next week", limit=3)
+
+    assert min(item["departure_date"] for item in later["items"]) >= "2025-05-18"
+    assert first["items"] != later["items"]
+    # Yesterday's cursor points into a different ranking
+    assert "error" in mcp_server.search_flights("London", "Tokyo", "next week", limit=3, cursor=first["next_cursor"])
+
+    # Only cursor pages come from the kept ranking; a first page always searches again
+    searches = []
+    search = mcp_server.flight_schedule.search
+    monkeypatch.setattr(mcp_server.flight_schedule, "search", lambda *args, **kwargs: searches.append(args) or search(*args, **kwargs))
+    page = mcp_server.search_flights("London", "Tokyo", "next week", limit=3)
+    mcp_server.search_flights("London", "Tokyo", "next week", limit=3)
+    mcp_server.search_flights("London", "Tokyo", "next week", limit=3, cursor=page["next_cursor"])
+    assert len(searches) == 2
+
+def test_tool_results_match_their_output_schemas():
+    results = {
+        "search_flights": mcp_server.search_flights("London", "Tokyo", "May 2025"),
+        "recommend_hotels": mcp_server.recommend_hotels("Rome", "cheap"),
+        "recommend_attractions": mcp_server.recommend_attractions("Paris"),
+        "recommend_restaurants": mcp_server.recommend_restaurants("Tokyo"),
+        "transport_options": mcp_server.transport_options("Rome", "Florence")
+    }
+
+    for tool, result in results.items():
+        jsonschema.validate(result, tool_records.output_schema(tool))
+        assert tool_records.decode(tool, result).items
+    assert tool_records.output_schema("seasonal_travel_advice") is None
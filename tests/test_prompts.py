@@ -0,0 +1,44 @@
+from mcp import types
+
+from prompts import _static_prefix, build_tool_selection_prompt, count_tokens
+
+TOOLS = [
+    types.Tool(name="search_flights", description="Search flights.\n\n    Args:\n        date_range (str): Dates", inputSchema={}),
+    types.Tool(name="recommend_hotels", description="Recommend hotels.", inputSchema={}),
+]
+
+CONTEXT = {
+    "location": "London",
+    "current_trip": {"origin": "London", "destination": "Rome", "date_range": "2025-05-01 to 2025-05-08", "budget": "high"},
+    "mentioned_destinations": ["Rome", "Paris"]
+}
+
+def test_static_sections_are_built_once_per_tool_set():
+    _static_prefix.cache_clear()
+
+    first, _ = build_tool_selection_prompt("hotels in Rome", TOOLS, CONTEXT)
+    second, _ = build_tool_selection_prompt("flights to Paris", TOOLS)
+
+    assert _static_prefix.cache_info().hits == 1
+    assert "- search_flights: Search flights. Args: date_range (str): Dates\n" in first
+    assert "Travel dates: 2025-05-01 to 2025-05-08" in first
+    assert "USER CONTEXT INFO" not in second
+    assert second.index("User's Question: flights to Paris") > second.index("HANDLING MISSING INFORMATION")
+
+def test_context_is_trimmed_in_priority_order_to_fit_the_budget():
+    full, full_tokens = build_tool_selection_prompt("hotels in Rome", TOOLS, CONTEXT)
+    destinations_line = count_tokens("- Destinations discussed: Rome, Paris\n")
+
+    prompt, tokens = build_tool_selection_prompt("hotels in Rome", TOOLS, CONTEXT, budget=full_tokens - destinations_line // 2)
+
+    assert tokens < full_tokens
+    assert "Destinations discussed" not in prompt
+    assert "User's current location: London" in prompt
+    assert "Current trip: London to Rome" in prompt
+
+def test_question_is_kept_when_nothing_fits():
+    prompt, tokens = build_tool_selection_prompt("hotels in Rome", TOOLS, CONTEXT, budget=10)
+
+    assert "USER CONTEXT INFO" not in prompt
+    assert "User's Question: hotels in Rome" in prompt
+    assert tokens > 10
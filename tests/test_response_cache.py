@@ -0,0 +1,54 @@
+from response_cache import LLMResponseCache
+
+PROMPT = "You have access to these tools.\n\nUser's Question: {query}\n\nRespond with JSON."
+
+def _prompt(query):
+    return PROMPT.format(query=query)
+
+def test_exact_repeat_hits_after_normalization():
+    cache = LLMResponseCache()
+    cache.set(_prompt("Hotels in Rome?"), "answer", cache_text="Hotels in Rome?")
+
+    assert cache.get(_prompt("hotels in  rome"), cache_text="hotels in  rome") == "answer"
+
+def test_near_duplicate_question_hits_fuzzily():
+    cache = LLMResponseCache(fuzzy_threshold=0.8)
+    cache.set(_prompt("What are the top attractions to visit in Tokyo?"), "answer",
+              cache_text="What are the top attractions to visit in Tokyo?")
+
+    query = "what are top attractions to visit in Tokyo"
+    assert cache.get(_prompt(query), cache_text=query) == "answer"
+    assert cache.get_stats()["fuzzy_hits"] == 1
+
+def test_different_destination_or_context_misses():
+    cache = LLMResponseCache(fuzzy_threshold=0.5)
+    query = "What are some good hotels in Rome with a medium budget?"
+    cache.set(_prompt(query), "rome answer", {"location": "London"}, cache_text=query)
+
+    other = "What are some good hotels in Paris with a medium budget?"
+    assert cache.get(_prompt(other), {"location": "London"}, cache_text=other) is None
+    assert cache.get(_prompt(query), {"location": "Berlin"}, cache_text=query) is None
+
+def test_history_only_matters_for_follow_up_questions():
+    cache = LLMResponseCache(fuzzy_threshold=0.8)
+    rome = [{"role": "user", "content": "Flights to Rome"}, {"role": "assistant", "content": "Here are flights to Rome"}]
+    paris = [{"role": "user", "content": "Flights to Paris"}, {"role": "assistant", "content": "Here are flights to Paris"}]
+    longer = [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello"}] + rome
+
+    query = "What are the top attractions to visit in Tokyo?"
+    cache.set(_prompt(query), "tokyo answer", {"history": rome}, cache_text=query)
+    near = "what are top attractions to visit in Tokyo"
+    assert cache.get(_prompt(near), {"history": paris}, cache_text=near) == "tokyo answer"
+
+    follow_up = "What about hotels there?"
+    cache.set(_prompt(follow_up), "rome hotels", {"history": rome}, cache_text=follow_up)
+    assert cache.get(_prompt(follow_up), {"history": longer}, cache_text=follow_up) == "rome hotels"
+    assert cache.get(_prompt(follow_up), {"history": paris}, cache_text=follow_up) is None
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LLMResponseCache(max_entries=1)
+    cache.set("flights to Rome", "rome")
+    cache.set("flights to Paris", "paris")
+
+    assert cache.get("flights to Rome") is None
+    assert cache.get("flights to Paris") == "paris"
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+from mcp import types
+from mcp.shared.exceptions import McpError
+
+from async_runtime import get_loop, run_on_loop
+from mcp_client import server_params
+from session_pool import MCPSessionPool, PooledSession, _PoolWorker
+
+@pytest.mark.asyncio
+async def test_pool_reuses_warm_sessions():
+    pool = MCPSessionPool(server_params, size=1)
+    try:
+        async with pool.session() as session:
+            tools = await session.list_tools()
+            assert "recommend_attractions" in [tool.name for tool in tools.tools]
+            first_worker = session._worker
+
+        # The pool hands out the same cached list without a checkout
+        assert (await pool.list_tools()).tools == tools.tools
+
+        async with pool.session() as session:
+            result = await session.call_tool("seasonal_travel_advice", arguments={"destination": "Japan"})
+            assert "cherry blossoms" in result.content[0].text
+            assert session._worker is first_worker
+    finally:
+        await pool.close()
+
+@pytest.mark.asyncio
+async def test_pool_restarts_dead_server():
+    pool = MCPSessionPool(server_params, size=1)
+    try:
+        async with pool.session() as session:
+            # Simulate the child process dying between requests
+            session._worker.broken = True
+
+        async with pool.session() as session:
+            result = await session.call_tool("recommend_attractions", arguments={"location": "Rome"})
+            assert "Colosseum" in result.content[0].text
+    finally:
+        await pool.close()
+
+class FlakySession:
+    """
+    Stand-in for a live ClientSession: one tool fails with a protocol error while another is still running
+    """
+    async def call_tool(self, name, arguments=None):
+        if name == "failing":
+            await asyncio.sleep(0.05)
+            raise McpError(types.ErrorData(code=types.INTERNAL_ERROR, message="Timed out while waiting for response"))
+        await asyncio.sleep(0.2)
+        return types.CallToolResult(content=[types.TextContent(type="text", text="done")])
+
+async def _transport_task():
+    return asyncio.create_task(asyncio.sleep(3600))
+
+@pytest.mark.asyncio
+async def test_protocol_error_does_not_restart_the_session():
+    worker = _PoolWorker(server_params, 0, call_timeout=5)
+    worker.session = FlakySession()
+    # The transport task of a healthy worker runs until the pool stops it
+    worker._task = await run_on_loop(_transport_task())
+    restarts = []
+    worker.restart = lambda: restarts.append(worker) or asyncio.sleep(0)
+    session = PooledSession(worker)
+
+    try:
+        failed, slow = await asyncio.gather(session.call_tool("failing"), session.call_tool("slow"), return_exceptions=True)
+    finally:
+        get_loop().call_soon_threadsafe(worker._task.cancel)
+
+    assert isinstance(failed, McpError)
+    assert slow.content[0].text == "done"
+    assert not worker.broken and restarts == []
@@ -0,0 +1,76 @@
+import time
+
+import pytest
+from mcp import types
+
+from tool_cache import CacheBackend, InMemoryLRUBackend, SQLiteBackend, ToolResultCache
+
+def _result(text):
+    return types.CallToolResult(content=[types.TextContent(type="text", text=text)])
+
+class FakeSession:
+    def __init__(self):
+        self.calls = 0
+
+    async def call_tool(self, name, arguments=None):
+        self.calls += 1
+        return _result(f"{name} result {self.calls}")
+
+@pytest.mark.asyncio
+async def test_repeated_call_is_served_from_cache():
+    cache = ToolResultCache(InMemoryLRUBackend())
+    session = FakeSession()
+
+    first = await cache.call_tool(session, "recommend_attractions", {"location": "Paris"})
+    second = await cache.call_tool(session, "recommend_attractions", {"location": " Paris  "})
+
+    assert session.calls == 1
+    assert second.content[0].text == first.content[0].text
+    assert cache.get_stats() == {"recommend_attractions": {"hits": 1, "misses": 1}}
+
+    # Results echo the location, so a differently cased one gets its own entry
+    await cache.call_tool(session, "recommend_attractions", {"location": "paris"})
+    assert session.calls == 2
+
+def test_entries_expire_after_tool_ttl():
+    cache = ToolResultCache(InMemoryLRUBackend(), ttls={"search_flights": 0.01})
+
+    cache.set("search_flights", {"to_location": "Rome"}, _result("flights"))
+    time.sleep(0.02)
+
+    assert cache.get("search_flights", {"to_location": "Rome"}) is None
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = InMemoryLRUBackend(max_entries=2)
+    expires_at = time.time() + 60
+
+    backend.set("a", "1", expires_at)
+    backend.set("b", "2", expires_at)
+    backend.get("a")
+    backend.set("c", "3", expires_at)
+
+    assert backend.get("b") is None
+    assert backend.get("a") == "1"
+    assert backend.get("c") == "3"
+
+def test_sqlite_backend_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    expires_at = time.time() + 60
+
+    SQLiteBackend(path).set("key", "value", expires_at)
+
+    assert SQLiteBackend(path).get("key") == "value"
+
+def test_backend_missing_a_method_fails_when_created():
+    class NoClearBackend(CacheBackend):
+        def get(self, key):
+            return None
+
+        def set(self, key, value, expires_at):
+            pass
+
+        def delete(self, key):
+            pass
+
+    with pytest.raises(TypeError, match="clear"):
+        NoClearBackend()
@@ -0,0 +1,41 @@
+from mcp import types
+
+from tool_schemas import to_openai_tools, validate_arguments
+
+FLIGHTS = types.Tool(
+    name="search_flights",
+    description="""
+    Search for flights between two locations.
+
+        Args:
+            from_location: Departure city
+    """,
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "from_location": {"type": "string"},
+            "to_location": {"type": "string"},
+            "date_range": {"type": "string"}
+        },
+        "required": ["from_location", "to_location", "date_range"]
+    }
+)
+
+def test_to_openai_tools_converts_once_per_tool_set():
+    [definition] = to_openai_tools([FLIGHTS])
+
+    assert definition["type"] == "function"
+    assert definition["function"]["name"] == "search_flights"
+    assert definition["function"]["description"] == "Search for flights between two locations. Args: from_location: Departure city"
+    assert definition["function"]["parameters"]["required"] == ["from_location", "to_location", "date_range"]
+    assert to_openai_tools([FLIGHTS])[0] is definition
+
+def test_validate_arguments_reports_the_problem():
+    arguments = {"from_location": "London", "to_location": "Paris", "date_range": "2025-05-01 to 2025-05-08"}
+    assert validate_arguments(FLIGHTS, arguments) is None
+
+    missing = validate_arguments(FLIGHTS, {"from_location": "London", "to_location": "Paris"})
+    assert "'date_range' is a required property" in missing
+
+    wrong_type = validate_arguments(FLIGHTS, dict(arguments, to_location=["Paris"]))
+    assert wrong_type.startswith("to_location:")
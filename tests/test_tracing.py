@@ -0,0 +1,62 @@
+import json
+import asyncio
+import urllib.request
+
+import pytest
+
+import tracing
+from mcp_client import run_async
+
+@pytest.mark.asyncio
+async def test_spans_nest_across_tasks_and_share_the_request_id(tmp_path, monkeypatch):
+    path = tmp_path / "spans.jsonl"
+    monkeypatch.setenv("TRACE_JSONL_PATH", str(path))
+
+    async def stage(name):
+        with tracing.span(name):
+            await asyncio.sleep(0.01)
+
+    with tracing.request("req-1", name="query") as root:
+        await asyncio.gather(stage("a"), stage("b"))
+
+    spans = {span["name"]: span for span in map(json.loads, path.read_text().splitlines())}
+    assert set(spans) == {"a", "b", "query"}
+    assert all(span["request_id"] == "req-1" for span in spans.values())
+    assert spans["a"]["parent_id"] == spans["b"]["parent_id"] == root.span_id
+    assert spans["query"]["duration_ms"] >= spans["a"]["duration_ms"]
+
+def test_failed_span_records_the_error():
+    tracing.reset_metrics()
+
+    with pytest.raises(ValueError):
+        with tracing.span("parse") as span:
+            raise ValueError("bad input")
+
+    assert span.error == "ValueError: bad input"
+    assert 'jetzy_stage_errors_total{stage="parse"} 1' in tracing.render_metrics()
+
+def test_metrics_endpoint_serves_histograms():
+    tracing.reset_metrics()
+    with tracing.span("tool", tool="search_flights"):
+        pass
+
+    server = tracing.start_metrics_server(0)
+    port = server.server_address[1]
+    body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics").read().decode()
+
+    assert 'jetzy_stage_duration_seconds_count{stage="tool"} 1' in body
+    assert 'jetzy_tool_duration_seconds_bucket{tool="search_flights",le="+Inf"} 1' in body
+
+@pytest.mark.asyncio
+async def test_request_id_reaches_every_stage(fake_openai, tmp_path, monkeypatch):
+    path = tmp_path / "spans.jsonl"
+    monkeypatch.setenv("TRACE_JSONL_PATH", str(path))
+    fake_openai.reply = "Just a friendly answer"
+
+    await asyncio.to_thread(run_async, "Tell me something about tracing", None, "req-42")
+
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    names = {span["name"] for span in spans if span["request_id"] == "req-42"}
+    assert {"query", "router", "prompt", "llm"} <= names
+    # A direct answer never checks out an MCP session
+    assert "mcp.checkout" not in names
@@ -0,0 +1,274 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from mcp import types
+
+logger = logging.getLogger(__name__)
+
+# Seconds each tool's output stays fresh. Flight prices move, attractions and seasons barely do.
+DEFAULT_TOOL_TTLS: Dict[str, float] = {
+    "search_flights": 300,
+    "recommend_hotels": 3600,
+    "recommend_attractions": 86400,
+    "recommend_restaurants": 3600,
+    "transport_options": 86400,
+    "seasonal_travel_advice": 7 * 86400
+}
+DEFAULT_TTL = 600
+
+def _tool_ttls() -> Dict[str, float]:
+    """
+    Per-tool TTLs, overridable with TOOL_CACHE_TTL_<TOOL_NAME> environment variables
+    """
+    ttls = dict(DEFAULT_TOOL_TTLS)
+    for tool in list(ttls):
+        override = os.getenv(f"TOOL_CACHE_TTL_{tool.upper()}")
+        if override:
+            ttls[tool] = float(override)
+    return ttls
+
+class CacheBackend(ABC):
+    """
+    Storage interface for the tool-result cache. Values are strings with an absolute expiry time.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: str, expires_at: float) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+class InMemoryLRUBackend(CacheBackend):
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024):
+        """
+        In-process backend bounded by entry count and total value size, evicting least recently used entries
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, expires_at: float) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (expires_at, value)
+            self._bytes += len(value)
+
+            # Evict least recently used entries until we are within bounds
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str) -> None:
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+class SQLiteBackend(CacheBackend):
+    def __init__(self, path: str, max_entries: int = 10000):
+        """
+        On-disk backend that several app replicas can share, evicting least recently used entries
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tool_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tool_cache_last_access ON tool_cache (last_access)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM tool_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM tool_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+
+            self._conn.execute("UPDATE tool_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def set(self, key: str, value: str, expires_at: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tool_cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now)
+            )
+            # Drop expired rows, then the least recently used ones beyond the bound
+            self._conn.execute("DELETE FROM tool_cache WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                "DELETE FROM tool_cache WHERE key IN ("
+                "SELECT key FROM tool_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM tool_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM tool_cache")
+            self._conn.commit()
+
+def normalize_arguments(value: Any, casefold: bool = False) -> Any:
+    """
+    Normalize argument values so trivially different requests share a cache entry. Whitespace is collapsed;
+    case is kept by default, since tools echo arguments such as the location back in their results.
+    """
+    if isinstance(value, str):
+        value = " ".join(value.split())
+        return value.casefold() if casefold else value
+    if isinstance(value, dict):
+        return {key: normalize_arguments(item, casefold) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_arguments(item, casefold) for item in value]
+    return value
+
+class ToolResultCache:
+    def __init__(self, backend: Optional[CacheBackend] = None, ttls: Optional[Dict[str, float]] = None,
+                 default_ttl: float = DEFAULT_TTL):
+        """
+        Cache of MCP tool results keyed on the tool name plus normalized arguments
+        """
+        self.backend = backend or InMemoryLRUBackend()
+        self.ttls = ttls if ttls is not None else dict(DEFAULT_TOOL_TTLS)
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def make_key(self, tool: str, arguments: Optional[Dict[str, Any]]) -> str:
+        """
+        Build the cache key for a tool call
+        """
+        return f"{tool}:{json.dumps(normalize_arguments(arguments or {}), sort_keys=True, separators=(',', ':'))}"
+
+    def get(self, tool: str, arguments: Optional[Dict[str, Any]]) -> Optional[types.CallToolResult]:
+        """
+        Return a cached result, or None on a miss
+        """
+        value = self.backend.get(self.make_key(tool, arguments))
+        self._count(tool, "hits" if value is not None else "misses")
+
+        if value is None:
+            return None
+        return types.CallToolResult.model_validate_json(value)
+
+    def set(self, tool: str, arguments: Optional[Dict[str, Any]], result: types.CallToolResult) -> None:
+        """
+        Store a successful tool result with the tool's TTL
+        """
+        if result.isError:
+            return
+
+        ttl = self.ttls.get(tool, self.default_ttl)
+        if ttl <= 0:
+            return
+
+        self.backend.set(self.make_key(tool, arguments), result.model_dump_json(), time.time() + ttl)
+
+    async def call_tool(self, session, tool: str, arguments: Optional[Dict[str, Any]]) -> types.CallToolResult:
+        """
+        Return the cached result for the call, or call the tool on the session and cache its result
+        """
+        try:
+            cached = self.get(tool, arguments)
+        except Exception as e:
+            logger.warning(f"Tool cache lookup failed for {tool}: {e}")
+            cached = None
+
+        if cached is not None:
+            logger.info(f"Tool cache hit for {tool}")
+            return cached
+
+        result = await session.call_tool(tool, arguments=arguments)
+
+        try:
+            self.set(tool, arguments, result)
+        except Exception as e:
+            logger.warning(f"Tool cache store failed for {tool}: {e}")
+
+        return result
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Return hit and miss counters per tool
+        """
+        with self._lock:
+            return {tool: dict(counts) for tool, counts in self._stats.items()}
+
+    def _count(self, tool: str, outcome: str) -> None:
+        with self._lock:
+            counts = self._stats.setdefault(tool, {"hits": 0, "misses": 0})
+            counts[outcome] += 1
+
+def _build_backend() -> CacheBackend:
+    """
+    Pick the cache backend from TOOL_CACHE_BACKEND ("memory" or "sqlite")
+    """
+    max_entries = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "1024"))
+
+    if os.getenv("TOOL_CACHE_BACKEND", "memory").lower() == "sqlite":
+        return SQLiteBackend(os.getenv("TOOL_CACHE_PATH", "tool_cache.sqlite3"), max_entries=max_entries)
+
+    return InMemoryLRUBackend(
+        max_entries=max_entries,
+        max_bytes=int(os.getenv("TOOL_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+    )
+
+# Shared cache used by the MCP client
+tool_cache = ToolResultCache(_build_backend(), ttls=_tool_ttls(), default_ttl=float(os.getenv("TOOL_CACHE_DEFAULT_TTL", str(DEFAULT_TTL))))
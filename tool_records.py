@@ -0,0 +1,130 @@
+import json
+import typing
+from typing import Any, Dict, NamedTuple, Optional, Tuple, Type
+
+# Typed records shared by the MCP server, which builds its results from them, and the client,
+# which decodes each tool result into them once. Tuples keep them compact: no per-record __dict__.
+
+class FlightOption(NamedTuple):
+    airline: str = ""
+    flight_numbers: str = ""
+    price_usd: Optional[float] = None
+    origin: str = ""
+    destination: str = ""
+    departure_date: str = ""
+    departure_time: str = ""
+    arrival: str = ""
+    duration: str = ""
+    stops: int = 0
+    airports: str = ""
+    seats_left: Optional[int] = None
+    mock_booking_link: str = ""
+
+class HotelOption(NamedTuple):
+    name: str = ""
+    location: str = ""
+    price_per_night_usd: Optional[float] = None
+    rating: Optional[float] = None
+    rooms_left: Optional[int] = None
+    mock_booking_link: str = ""
+
+class AttractionOption(NamedTuple):
+    name: str = ""
+    location: str = ""
+    description: str = ""
+
+class RestaurantOption(NamedTuple):
+    name: str = ""
+    location: str = ""
+    cuisine: str = ""
+    rating: Optional[float] = None
+    next_free_table: str = ""
+
+class TransportOption(NamedTuple):
+    mode: str = ""
+    route: str = ""
+    duration: str = ""
+    price_usd: Optional[float] = None
+
+class ToolOutput(NamedTuple):
+    """
+    One decoded tool result: a page of records, or the text of a tool that answers in prose
+    """
+    items: Tuple[Any, ...] = ()
+    next_cursor: Optional[str] = None
+    error: Optional[str] = None
+    text: Optional[str] = None
+
+# Record type of each list tool's items
+TOOL_RECORDS: Dict[str, Type[NamedTuple]] = {
+    "search_flights": FlightOption,
+    "recommend_hotels": HotelOption,
+    "recommend_attractions": AttractionOption,
+    "recommend_restaurants": RestaurantOption,
+    "transport_options": TransportOption
+}
+
+# Tools whose results come in pages of {"items": [...], "next_cursor": ...}
+PAGED_TOOLS = ("search_flights", "recommend_hotels", "recommend_attractions", "recommend_restaurants")
+
+def from_dict(record: Type[NamedTuple], data: Dict[str, Any]) -> NamedTuple:
+    """
+    Build a record from a dict, ignoring unknown keys and defaulting missing ones
+    """
+    return record(**{field: data[field] for field in record._fields if field in data})
+
+_JSON_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean"}
+
+def _field_schema(annotation: Any) -> Dict[str, Any]:
+    if typing.get_origin(annotation) is typing.Union:
+        types = [_JSON_TYPES[arg] for arg in typing.get_args(annotation) if arg is not type(None)]
+        return {"type": types + ["null"]}
+    return {"type": _JSON_TYPES[annotation]}
+
+def record_schema(record: Type[NamedTuple]) -> Dict[str, Any]:
+    """
+    JSON schema of a record as the server sends it
+    """
+    return {
+        "type": "object",
+        "properties": {field: _field_schema(annotation) for field, annotation in record.__annotations__.items()},
+        "required": list(record._fields)
+    }
+
+def output_schema(tool: str) -> Optional[Dict[str, Any]]:
+    """
+    Declared JSON schema of a tool's result, or None for tools that answer in prose
+    """
+    if tool in PAGED_TOOLS:
+        return {
+            "type": "object",
+            "properties": {
+                "items": {"type": "array", "items": record_schema(TOOL_RECORDS[tool])},
+                "next_cursor": {"type": ["string", "null"]},
+                "error": {"type": "string"}
+            },
+            "required": ["items", "next_cursor"]
+        }
+    if tool == "transport_options":
+        # Keyed by mode: {"bus": {...}, "train": {...}}
+        return {"type": "object", "additionalProperties": record_schema(TransportOption)}
+    return None
+
+def decode(tool: str, data: Any) -> ToolOutput:
+    """
+    Turn a tool's decoded JSON (or plain text) into a ToolOutput of typed records
+    """
+    record = TOOL_RECORDS.get(tool)
+    if record is None or isinstance(data, str):
+        return ToolOutput(text=data if isinstance(data, str) else json.dumps(data))
+
+    if isinstance(data, dict) and "items" in data:
+        return ToolOutput(tuple(from_dict(record, item) for item in data["items"]), data.get("next_cursor"), data.get("error"))
+    if tool == "transport_options" and isinstance(data, dict):
+        return ToolOutput(tuple(from_dict(record, dict(details, mode=mode)) for mode, details in data.items()))
+
+    # A bare record or list of records, as older servers send
+    items = data if isinstance(data, list) else [data]
+    if len(items) == 1 and isinstance(items[0], dict) and "error" in items[0]:
+        return ToolOutput(error=items[0]["error"])
+    return ToolOutput(tuple(from_dict(record, item) for item in items if isinstance(item, dict)))
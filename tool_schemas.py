@@ -0,0 +1,60 @@
+import json
+import logging
+import functools
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from jsonschema import exceptions as jsonschema_exceptions
+from jsonschema.validators import validator_for
+
+logger = logging.getLogger(__name__)
+
+# OpenAI rejects longer function descriptions
+MAX_DESCRIPTION_CHARS = 1024
+
+def _tool_key(tool) -> Tuple[str, str, str]:
+    return tool.name, tool.description or "", json.dumps(tool.inputSchema or {}, sort_keys=True)
+
+@functools.lru_cache(maxsize=32)
+def _openai_tools(tool_keys: Tuple[Tuple[str, str, str], ...]) -> Tuple[Dict[str, Any], ...]:
+    return tuple({
+        "type": "function",
+        "function": {
+            "name": name,
+            # Collapse the docstring indentation, it costs tokens on every request
+            "description": " ".join(description.split())[:MAX_DESCRIPTION_CHARS],
+            "parameters": json.loads(schema) or {"type": "object", "properties": {}}
+        }
+    } for name, description, schema in tool_keys)
+
+def to_openai_tools(tools: Sequence[Any]) -> List[Dict[str, Any]]:
+    """
+    Convert MCP tool metadata into OpenAI tool (function) definitions.
+    Converted once per tool set; the returned definitions are shared and must not be modified.
+    """
+    return list(_openai_tools(tuple(_tool_key(tool) for tool in tools)))
+
+@functools.lru_cache(maxsize=64)
+def _validator(schema: str):
+    schema = json.loads(schema)
+    cls = validator_for(schema)
+    cls.check_schema(schema)
+    return cls(schema)
+
+def validate_arguments(tool, arguments: Any) -> Optional[str]:
+    """
+    Check tool call arguments against the tool's input schema.
+    Returns None if they are valid, otherwise a short description of the most relevant problem.
+    """
+    try:
+        validator = _validator(json.dumps(tool.inputSchema or {}, sort_keys=True))
+    except jsonschema_exceptions.SchemaError as e:
+        # A broken schema on the server side shouldn't block the call; the server validates again
+        logger.warning(f"Invalid input schema for {tool.name}: {e.message}")
+        return None
+
+    error = jsonschema_exceptions.best_match(validator.iter_errors(arguments))
+    if error is None:
+        return None
+
+    location = ".".join(str(part) for part in error.absolute_path)
+    return f"{location}: {error.message}" if location else error.message
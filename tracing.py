@@ -0,0 +1,331 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Finer buckets for in-process stages that take well under a millisecond
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+_request_spans: contextvars.ContextVar[Optional[List["Span"]]] = contextvars.ContextVar("request_spans", default=None)
+
+def new_request_id() -> str:
+    """
+    Generate an ID that ties together the spans of one user request
+    """
+    return uuid.uuid4().hex[:16]
+
+def get_request_id() -> Optional[str]:
+    """
+    Return the ID of the request being handled, if any
+    """
+    return _request_id.get()
+
+class Histogram:
+    def __init__(self, name: str, description: str, label: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Prometheus-style cumulative histogram with one label
+        """
+        self.name = name
+        self.description = description
+        self.label = label
+        self.buckets = buckets
+        self._series: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, seconds: float) -> None:
+        with self._lock:
+            # Bucket counts, then +Inf count, then the sum
+            series = self._series.setdefault(label_value, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += seconds
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_value, series in sorted(self._series.items()):
+                label = f'{self.label}="{label_value}"'
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {int(count)}')
+                lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {int(series[-2])}')
+                lines.append(f"{self.name}_sum{{{label}}} {series[-1]:.6f}")
+                lines.append(f"{self.name}_count{{{label}}} {int(series[-2])}")
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+class Counter:
+    def __init__(self, name: str, description: str, label: str):
+        """
+        Prometheus-style counter with one label
+        """
+        self.name = name
+        self.description = description
+        self.label = label
+        self._values: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_value: str, amount: int = 1) -> None:
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for label_value, value in sorted(self.snapshot().items()):
+            lines.append(f'{self.name}{{{self.label}="{label_value}"}} {value}')
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+stage_histogram = Histogram("jetzy_stage_duration_seconds", "Time spent in each request pipeline stage", "stage")
+tool_histogram = Histogram("jetzy_tool_duration_seconds", "Time spent in each tool call, cache hits included", "tool")
+format_histogram = Histogram("jetzy_format_duration_seconds", "Time spent decoding and formatting each tool's results",
+                             "tool", FAST_BUCKETS)
+stage_errors = Counter("jetzy_stage_errors_total", "Stages that ended with an error", "stage")
+tool_selection_outcomes = Counter("jetzy_tool_selection_total", "Outcomes of asking the LLM to pick tools", "outcome")
+_metrics = (stage_histogram, tool_histogram, format_histogram, stage_errors, tool_selection_outcomes)
+
+class Span:
+    def __init__(self, name: str, attributes: Dict[str, Any], parent: Optional["Span"]):
+        """
+        One timed stage of a request. Use span() or start_span() rather than creating it directly.
+        """
+        self.name = name
+        self.attributes = attributes
+        self.request_id = _request_id.get()
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.start_time = time.time()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        self._start = time.perf_counter()
+        self._otel_span = _start_otel_span(name, attributes, parent)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        """
+        Stop the clock and export the span. Ending a span twice has no effect.
+        """
+        if self.duration is not None:
+            return
+
+        self.duration = time.perf_counter() - self._start
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+        if self._otel_span is not None:
+            _end_otel_span(self)
+        _export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "request_id": self.request_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start_time, 6),
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+def start_span(name: str, **attributes: Any) -> Span:
+    """
+    Start a span under the current one without making it current. The caller must call end().
+    Suited to stages that cannot be wrapped in a with block, such as entering a context manager.
+    """
+    return Span(name, attributes, _current_span.get())
+
+@contextmanager
+def span(name: str, **attributes: Any):
+    """
+    Time the enclosed block as a span; spans started inside it, including in tasks it creates, become its children
+    """
+    current = start_span(name, **attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.end(error=e)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+
+@contextmanager
+def request(request_id: Optional[str] = None, name: str = "request", **attributes: Any):
+    """
+    Root span of one user request. Logs a per-stage breakdown when the request finishes.
+    """
+    request_token = _request_id.set(request_id or new_request_id())
+    spans_token = _request_spans.set([])
+    try:
+        with span(name, **attributes) as root:
+            yield root
+    finally:
+        spans = _request_spans.get() or []
+        _request_spans.reset(spans_token)
+        _request_id.reset(request_token)
+
+        stages: Dict[str, float] = {}
+        for finished in spans:
+            if finished is not root:
+                stages[finished.name] = stages.get(finished.name, 0.0) + finished.duration
+        breakdown = ", ".join(f"{stage} {seconds * 1000:.0f} ms" for stage, seconds in stages.items())
+        logger.info(f"Request {root.request_id} took {root.duration * 1000:.0f} ms ({breakdown or 'no stages'})")
+
+def _export(finished: Span) -> None:
+    stage_histogram.observe(finished.name, finished.duration)
+    if finished.name == "tool" and "tool" in finished.attributes:
+        tool_histogram.observe(str(finished.attributes["tool"]), finished.duration)
+    elif finished.name == "format" and "tool" in finished.attributes:
+        format_histogram.observe(str(finished.attributes["tool"]), finished.duration)
+    if finished.error is not None:
+        stage_errors.inc(finished.name)
+
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append(finished)
+
+    path = os.getenv("TRACE_JSONL_PATH")
+    if path:
+        try:
+            line = json.dumps(finished.to_dict(), default=str)
+            with _jsonl_lock, open(path, "a") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            logger.warning(f"Could not write span to {path}: {e}")
+
+_jsonl_lock = threading.Lock()
+
+# OpenTelemetry is optional: spans are mirrored to an OTLP collector only when
+# TRACE_OTLP_ENDPOINT is set and opentelemetry-sdk plus the OTLP HTTP exporter are installed
+_otel_tracer = None
+_otel_initialized = False
+_otel_lock = threading.Lock()
+
+def _get_otel_tracer():
+    global _otel_tracer, _otel_initialized
+
+    if _otel_initialized:
+        return _otel_tracer
+
+    with _otel_lock:
+        if _otel_initialized:
+            return _otel_tracer
+        _otel_initialized = True
+
+        endpoint = os.getenv("TRACE_OTLP_ENDPOINT")
+        if not endpoint:
+            return None
+
+        try:
+            from opentelemetry import trace
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning("TRACE_OTLP_ENDPOINT is set but opentelemetry-sdk or the OTLP exporter is not installed")
+            return None
+
+        provider = TracerProvider(resource=Resource.create({"service.name": "jetzy"}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint)))
+        _otel_tracer = provider.get_tracer("jetzy")
+        logger.info(f"Exporting spans to OpenTelemetry collector at {endpoint}")
+        return _otel_tracer
+
+def _start_otel_span(name: str, attributes: Dict[str, Any], parent: Optional[Span]):
+    tracer = _get_otel_tracer()
+    if tracer is None:
+        return None
+
+    from opentelemetry import trace
+
+    context = trace.set_span_in_context(parent._otel_span) if parent is not None and parent._otel_span is not None else None
+    otel_span = tracer.start_span(name, context=context)
+    if _request_id.get():
+        otel_span.set_attribute("request_id", _request_id.get())
+    return otel_span
+
+def _end_otel_span(finished: Span) -> None:
+    from opentelemetry.trace import Status, StatusCode
+
+    for key, value in finished.attributes.items():
+        finished._otel_span.set_attribute(key, value if isinstance(value, (str, bool, int, float)) else str(value))
+    if finished.error is not None:
+        finished._otel_span.set_status(Status(StatusCode.ERROR, finished.error))
+    finished._otel_span.end()
+
+def render_metrics() -> str:
+    """
+    Render every histogram and counter in the Prometheus text exposition format
+    """
+    lines = []
+    for metric in _metrics:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+def reset_metrics() -> None:
+    """
+    Drop every recorded observation
+    """
+    for metric in _metrics:
+        metric.clear()
+
+_metrics_server: Optional[ThreadingHTTPServer] = None
+_metrics_lock = threading.Lock()
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serve /metrics on a background thread. Safe to call on every Streamlit rerun.
+    """
+    global _metrics_server
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+
+            body = render_metrics().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    with _metrics_lock:
+        if _metrics_server is None:
+            _metrics_server = ThreadingHTTPServer((host, port), Handler)
+            threading.Thread(target=_metrics_server.serve_forever, name="jetzy-metrics", daemon=True).start()
+            logger.info(f"Serving metrics on http://{host}:{_metrics_server.server_address[1]}/metrics")
+
+    return _metrics_server